@@ -0,0 +1,185 @@
+"""
+Converter Benchmarks
+Times each conversion phase and measures peak memory for the real papers
+and a synthetic scale corpus, failing when results regress past a stored
+baseline (or when no baseline is stored, unless that is explicitly allowed)
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from conversion_metrics import start_metrics, stop_metrics
+from html_document_model import parse_document
+from html_to_word_converter import render_docx
+from html_to_pptx_converter import render_pptx
+from synthetic_corpus import write_corpus
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPTS_DIR)
+DEFAULT_BASELINE = os.path.join(SCRIPTS_DIR, 'benchmarks', 'baseline.json')
+
+RENDERERS = {
+    'docx': render_docx,
+    'pptx': render_pptx,
+}
+
+# Differences below these floors are treated as noise
+MIN_SECONDS_DELTA = 0.05
+MIN_MEMORY_DELTA_MB = 1.0
+
+def real_documents():
+    """Return the HTML documents shipped with the project"""
+    return sorted(
+        glob.glob(os.path.join(PROJECT_DIR, 'papers', '*.html')) +
+        glob.glob(os.path.join(PROJECT_DIR, 'Algorithm_Documentation', '*.html'))
+    )
+
+def run_phases(html_file, fmt, parser=None):
+    """Convert one file to a temporary output, returning the seconds spent in each phase
+    
+    The output goes through the same renderer as convert_html, so the render,
+    optimize and save phases are the stages it records along the way.
+    """
+    phases = {}
+    
+    start = time.perf_counter()
+    with open(html_file, 'r', encoding='utf-8') as f:
+        html_content = f.read()
+    phases['read'] = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    document = parse_document(html_content, parser)
+    phases['parse'] = time.perf_counter() - start
+    
+    with tempfile.TemporaryDirectory() as output_dir:
+        output_file = os.path.join(output_dir, f"output.{fmt}")
+        start_metrics(html_file)
+        try:
+            RENDERERS[fmt](document, output_file)
+        finally:
+            stages = stop_metrics()['stages']
+        for name in ('render', 'optimize', 'save'):
+            phases[name] = stages[f"{name}.{fmt}"]
+        return phases, os.path.getsize(output_file)
+
+def benchmark_case(html_file, fmt, repeat=3, parser=None):
+    """Benchmark one file and format: best-of-N phase times plus traced peak memory"""
+    best = None
+    for _ in range(repeat):
+        phases, output_bytes = run_phases(html_file, fmt, parser)
+        if best is None or sum(phases.values()) < sum(best.values()):
+            best = phases
+    
+    # Measure memory in a separate run, since tracing slows everything down
+    tracemalloc.start()
+    try:
+        run_phases(html_file, fmt, parser)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    
+    return {
+        'seconds': round(sum(best.values()), 4),
+        'phases': {name: round(seconds, 4) for name, seconds in best.items()},
+        'peak_mb': round(peak / (1024 * 1024), 2),
+        'input_bytes': os.path.getsize(html_file),
+        'output_bytes': output_bytes,
+    }
+
+def compare(results, baseline, threshold):
+    """List the cases whose time or memory grew past the threshold over the baseline"""
+    regressions = []
+    for case, formats in results.items():
+        for fmt, current in formats.items():
+            previous = baseline.get(case, {}).get(fmt)
+            if not previous or previous['input_bytes'] != current['input_bytes']:
+                continue  # New case, or the synthetic corpus was generated at another scale
+            
+            limit = previous['seconds'] * (1 + threshold)
+            if current['seconds'] > limit and current['seconds'] - previous['seconds'] > MIN_SECONDS_DELTA:
+                regressions.append(f"{case} [{fmt}] time {previous['seconds']:.3f}s → {current['seconds']:.3f}s")
+            
+            limit = previous['peak_mb'] * (1 + threshold)
+            if current['peak_mb'] > limit and current['peak_mb'] - previous['peak_mb'] > MIN_MEMORY_DELTA_MB:
+                regressions.append(f"{case} [{fmt}] memory {previous['peak_mb']:.1f} MB → {current['peak_mb']:.1f} MB")
+    
+    return regressions
+
+def main():
+    """Run the benchmark suite"""
+    arg_parser = argparse.ArgumentParser(description="Benchmark the HTML to Word/PowerPoint converters")
+    arg_parser.add_argument('--formats', nargs='+', choices=sorted(RENDERERS), default=sorted(RENDERERS))
+    arg_parser.add_argument('--repeat', type=int, default=3, help="Timed runs per case (best is kept)")
+    arg_parser.add_argument('--scale', type=float, default=1.0, help="Size multiplier for the synthetic corpus")
+    arg_parser.add_argument('--no-synthetic', action='store_true', help="Only benchmark the real documents")
+    arg_parser.add_argument('--only', help="Only run cases whose name contains this text")
+    arg_parser.add_argument('--parser', help="HTML parser backend to benchmark")
+    arg_parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline results to compare against")
+    arg_parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baseline")
+    arg_parser.add_argument('--allow-missing-baseline', action='store_true',
+                            help="Pass when there is no baseline to compare against instead of failing")
+    arg_parser.add_argument('--threshold', type=float, default=0.25,
+                            help="Allowed fractional slowdown or memory growth (default: 0.25)")
+    arg_parser.add_argument('--json', help="Write the results to this JSON file")
+    args = arg_parser.parse_args()
+    
+    # Without a baseline nothing can regress, so the gate would pass unnoticed
+    has_baseline = os.path.exists(args.baseline)
+    if not has_baseline and not args.save_baseline and not args.allow_missing_baseline:
+        print(f"✗ No baseline at {args.baseline}; run with --save-baseline to create one "
+              f"(or --allow-missing-baseline to only report timings)")
+        return 1
+    
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        html_files = real_documents()
+        if not args.no_synthetic:
+            html_files += write_corpus(corpus_dir, args.scale)
+        
+        results = {}
+        for html_file in html_files:
+            case = os.path.splitext(os.path.basename(html_file))[0]
+            if args.only and args.only not in case:
+                continue
+            results[case] = {}
+            for fmt in args.formats:
+                result = benchmark_case(html_file, fmt, args.repeat, args.parser)
+                results[case][fmt] = result
+                phases = ' '.join(f"{name}={seconds:.3f}" for name, seconds in result['phases'].items())
+                print(f"{case:40} {fmt}  {result['seconds']:8.3f}s  {result['peak_mb']:8.1f} MB  ({phases})")
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+    
+    if not has_baseline:
+        print("No baseline found; run with --save-baseline to create one")
+        return 0
+    
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"✗ {len(regressions)} regression(s) past {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    
+    print(f"✓ No regressions past {args.threshold:.0%}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
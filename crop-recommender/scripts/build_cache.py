@@ -0,0 +1,175 @@
+"""
+Incremental Build Cache
+Tracks which conversion outputs are up to date with a manifest keyed on the
+input content hash and a fingerprint of the converter code and options
+"""
+
+from functools import lru_cache
+import hashlib
+import json
+import os
+import time
+
+# Bump to invalidate every manifest entry
+CACHE_VERSION = 1
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPTS_DIR)
+CACHE_DIR = os.path.join(PROJECT_DIR, '.cache', 'convert')
+DEFAULT_MANIFEST = os.path.join(CACHE_DIR, 'manifest.json')
+
+# Temporary files this old were left behind by a cache writer that died
+STALE_TEMP_SECONDS = 3600
+
+# Modules whose source code affects the rendered output
+CONVERTER_SOURCES = [
+    'html_parsers.py',
+    'html_document_model.py',
+    'html_to_word_converter.py',
+    'html_to_pptx_converter.py',
+    'document_cache.py',
+    'media_cache.py',
+    'native_charts.py',
+    'package_optimizer.py',
+    'text_layout.py',
+]
+
+def hash_bytes(data):
+    """Return the hex SHA-256 digest of some bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """Return the hex SHA-256 digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def hash_inputs(path, dependencies=()):
+    """Hash an input file together with the files it loads, so editing any of them changes the hash
+    
+    Missing dependencies hash as None, so adding one later counts as a change.
+    Without dependencies this is the file's own hash.
+    """
+    if not dependencies:
+        return hash_file(path)
+    payload = [hash_file(path)]
+    for dependency in dependencies:
+        payload.append([dependency, hash_file(dependency) if os.path.isfile(dependency) else None])
+    return hash_bytes(json.dumps(payload).encode('utf-8'))
+
+@lru_cache(maxsize=None)
+def source_fingerprint(names=tuple(CONVERTER_SOURCES)):
+    """Hash source files (the converter's by default) once per process"""
+    digest = hashlib.sha256()
+    for name in names:
+        with open(os.path.join(SCRIPTS_DIR, name), 'rb') as f:
+            digest.update(name.encode('utf-8'))
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def converter_fingerprint(fmt, options=None):
+    """Fingerprint the converter version, output format and render options"""
+    payload = json.dumps({
+        'version': CACHE_VERSION,
+        'format': fmt,
+        'sources': source_fingerprint(),
+        'options': options or {},
+    }, sort_keys=True)
+    return hash_bytes(payload.encode('utf-8'))
+
+def manifest_key(output_file):
+    """Normalize an output path into a manifest key"""
+    return os.path.normcase(os.path.abspath(output_file))
+
+def output_stamp(output_file):
+    """Return the size and modification time of an output, or None if it is missing"""
+    try:
+        stat = os.stat(output_file)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+def load_manifest(path=DEFAULT_MANIFEST):
+    """Load the build manifest, starting fresh if it is missing or unreadable"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get('version') != CACHE_VERSION:
+        return {}
+    return manifest.get('outputs', {})
+
+def save_manifest(entries, path=DEFAULT_MANIFEST):
+    """Atomically write the build manifest"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': CACHE_VERSION, 'outputs': entries}, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def rebuild_reason(entry, output_file, input_hash, fingerprint, force=False):
+    """Return why an output must be rebuilt, or None if it is up to date"""
+    if force:
+        return "forced rebuild"
+    if entry is None:
+        return "not in build manifest"
+    stamp = output_stamp(output_file)
+    if stamp is None:
+        return "output file is missing"
+    if entry['input_hash'] != input_hash:
+        return "input content changed"
+    if entry['fingerprint'] != fingerprint:
+        return "converter code or options changed"
+    if entry['stamp'] != stamp:
+        return "output file was modified outside the build"
+    return None
+
+def make_entry(html_file, output_file, input_hash, fingerprint):
+    """Record a freshly built output for the manifest"""
+    return {
+        'input': os.path.abspath(html_file),
+        'input_hash': input_hash,
+        'fingerprint': fingerprint,
+        'stamp': output_stamp(output_file),
+    }
+
+def remove_file(path):
+    """Delete a cache file, returning its size, or 0 if another process got to it first"""
+    try:
+        size = os.path.getsize(path)
+        os.remove(path)
+    except OSError:
+        return 0
+    return size
+
+def prune_files(directory, max_bytes):
+    """Delete the least recently used files of a cache directory past max_bytes
+    
+    Temporary files abandoned by a dead writer go too. Readers refresh the
+    modification time of the files they use. Returns the number of bytes freed.
+    """
+    entries = []
+    freed = 0
+    now = time.time()
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if not name.endswith('.tmp'):
+                entries.append((stat.st_mtime, stat.st_size, path))
+            elif now - stat.st_mtime > STALE_TEMP_SECONDS:
+                freed += remove_file(path)
+    
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        total -= size
+        freed += remove_file(path)
+    return freed
@@ -0,0 +1,54 @@
+"""
+Conversion Metrics
+Per-stage timings and counters for a conversion (read, parse, extract,
+render, save), written out as JSON lines
+"""
+
+from contextlib import contextmanager
+import json
+import time
+
+# Metrics of the conversion being measured in this process, or None when off
+ACTIVE = None
+
+def start_metrics(html_file):
+    """Start collecting metrics for the conversion of one file"""
+    global ACTIVE
+    ACTIVE = {'file': html_file, 'stages': {}, 'counters': {}}
+    return ACTIVE
+
+def stop_metrics():
+    """Stop collecting and return what was collected, or None if collection was off"""
+    global ACTIVE
+    metrics, ACTIVE = ACTIVE, None
+    return metrics
+
+def metrics_enabled():
+    """Check whether metrics are being collected in this process"""
+    return ACTIVE is not None
+
+@contextmanager
+def stage(name):
+    """Time a conversion stage; repeated stages add up"""
+    if ACTIVE is None:
+        yield
+        return
+    
+    stages = ACTIVE['stages']
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages[name] = round(stages.get(name, 0.0) + time.perf_counter() - start, 6)
+
+def count(name, amount=1):
+    """Add to a counter of the running conversion"""
+    if ACTIVE is not None:
+        counters = ACTIVE['counters']
+        counters[name] = counters.get(name, 0) + amount
+
+def write_metrics(records, path):
+    """Append metric records to a JSON lines file"""
+    with open(path, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, sort_keys=True) + '\n')
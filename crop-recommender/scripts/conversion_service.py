@@ -0,0 +1,343 @@
+"""
+HTML Conversion Service
+Long-running local HTTP service that converts HTML to Word/PowerPoint in
+warm worker processes, so callers such as the Express backend skip the
+interpreter and library startup on every request
+
+    POST /convert?format=docx|pptx[&parser=NAME]   body: HTML bytes
+    GET  /health
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import parse_qs, urlsplit
+import argparse
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import sys
+
+from docx import Document
+from pptx import Presentation
+
+from html_document_model import parse_document
+from html_parsers import select_parser
+from html_to_word_converter import build_docx
+from html_to_pptx_converter import build_pptx
+from package_optimizer import optimize_docx, optimize_pptx, save_package
+
+BUILDERS = {
+    'docx': build_docx,
+    'pptx': build_pptx,
+}
+
+OPTIMIZERS = {
+    'docx': optimize_docx,
+    'pptx': optimize_pptx,
+}
+
+CONTENT_TYPES = {
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+}
+
+STATUS_TEXT = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    411: 'Length Required',
+    413: 'Payload Too Large',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable',
+    504: 'Gateway Timeout',
+}
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+class ServiceError(Exception):
+    """An HTTP error response for the current request"""
+    
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def warm_worker():
+    """Import the converter libraries and open each default template once in a worker process
+    
+    This takes the import and first-load cost off the worker's first request;
+    every request still builds its documents from fresh templates.
+    """
+    Document()
+    Presentation()
+    select_parser()
+
+def convert_text(html, fmt, parser=None):
+    """Convert HTML text to the bytes of a .docx/.pptx package"""
+    document = parse_document(html, parser)
+    package = OPTIMIZERS[fmt](BUILDERS[fmt](document))
+    buffer = io.BytesIO()
+    save_package(package, buffer)
+    return buffer.getvalue()
+
+def make_executor(workers):
+    """Create the worker pool, warming each worker as it starts"""
+    # Forked workers would inherit open client sockets and keep them from closing
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(max_workers=workers, initializer=warm_worker,
+                               mp_context=multiprocessing.get_context(method))
+
+def make_service(workers=None, queue_size=None, timeout=None, max_body_mb=64):
+    """Create the service state: a warm worker pool plus its admission limits"""
+    workers = workers or os.cpu_count() or 1
+    return {
+        'executor': make_executor(workers),
+        'slots': asyncio.Semaphore(workers),
+        'workers': workers,
+        'queue_size': workers * 4 if queue_size is None else queue_size,
+        'timeout': timeout,
+        'max_body': max_body_mb * 1024 * 1024,
+        'admitted': 0,
+        'served': 0,
+        'rejected': 0,
+        'failed': 0,
+        'restarts': 0,
+        'warming': None,
+    }
+
+def start_workers(service):
+    """Start every worker of the pool now, returning a future that is done once all are warm"""
+    loop = asyncio.get_running_loop()
+    return asyncio.gather(*[loop.run_in_executor(service['executor'], warm_worker)
+                            for _ in range(service['workers'])])
+
+def restart_workers(service, broken):
+    """Replace a pool that lost a worker (say to the OOM killer) with a fresh, warming one
+    
+    Every job of the broken pool fails, so only the first to notice replaces it.
+    """
+    if service['executor'] is not broken:
+        return
+    broken.shutdown(wait=False, cancel_futures=True)
+    service['executor'] = make_executor(service['workers'])
+    service['restarts'] += 1
+    service['warming'] = start_workers(service)
+
+async def read_request(reader, max_body):
+    """Read one HTTP request, returning (method, target, headers, body) or None at end of stream"""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        raise ServiceError(400, "Request headers too large")
+    
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, _ = lines[0].split(' ', 2)
+    except ValueError:
+        raise ServiceError(400, "Malformed request line")
+    
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    
+    body = b''
+    if method == 'POST':
+        if 'content-length' not in headers:
+            raise ServiceError(411, "Content-Length is required")
+        try:
+            length = int(headers['content-length'])
+        except ValueError:
+            raise ServiceError(400, "Invalid Content-Length")
+        if length > max_body:
+            raise ServiceError(413, f"Body exceeds {max_body // (1024 * 1024)} MB")
+        body = await reader.readexactly(length)
+    
+    return method, target, headers, body
+
+def write_response(writer, status, body, content_type='application/json', headers=None):
+    """Write an HTTP/1.1 response"""
+    lines = [
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+        f"Content-Type: {content_type}",
+        f"Content-Length: {len(body)}",
+    ]
+    for name, value in (headers or {}).items():
+        lines.append(f"{name}: {value}")
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+
+def json_body(data):
+    """Encode a JSON response body"""
+    return json.dumps(data).encode('utf-8')
+
+async def convert_request(service, query, body):
+    """Run one conversion in the worker pool, applying backpressure and the time limit"""
+    fmt = query.get('format', ['docx'])[0]
+    if fmt not in BUILDERS:
+        raise ServiceError(400, f"Unknown format '{fmt}' (choose from {', '.join(BUILDERS)})")
+    parser = query.get('parser', [None])[0]
+    try:
+        parser = select_parser(parser)
+    except ValueError as e:
+        raise ServiceError(400, str(e))
+    # Decode here, so a bad upload is the caller's error and never takes a worker
+    try:
+        html = body.decode('utf-8')
+    except UnicodeDecodeError as e:
+        raise ServiceError(400, f"Request body must be UTF-8 encoded HTML ({e.reason} at byte {e.start})")
+    
+    # Running plus waiting requests are capped; beyond that callers must retry
+    if service['admitted'] >= service['workers'] + service['queue_size']:
+        service['rejected'] += 1
+        raise ServiceError(503, "Conversion queue is full")
+    
+    service['admitted'] += 1
+    try:
+        await service['slots'].acquire()
+    except asyncio.CancelledError:
+        service['admitted'] -= 1  # The caller went away while queued
+        raise
+    loop = asyncio.get_running_loop()
+    executor = service['executor']
+    try:
+        job = loop.run_in_executor(executor, convert_text, html, fmt, parser)
+    except BrokenProcessPool as e:
+        # The pool noticed a dead worker before this job went in
+        job = loop.create_future()
+        job.set_exception(e)
+    
+    # A timed-out job keeps its worker busy, so its slot is only freed once it ends
+    def release(_):
+        service['admitted'] -= 1
+        service['slots'].release()
+    job.add_done_callback(release)
+    
+    try:
+        output = await asyncio.wait_for(asyncio.shield(job), service['timeout'])
+    except asyncio.TimeoutError:
+        raise ServiceError(504, f"Conversion timed out after {service['timeout']}s")
+    except BrokenProcessPool:
+        service['failed'] += 1
+        restart_workers(service, executor)
+        raise ServiceError(503, "A conversion worker died; the workers are restarting")
+    except Exception as e:
+        service['failed'] += 1
+        raise ServiceError(500, f"Conversion failed: {e}")
+    
+    service['served'] += 1
+    return fmt, output
+
+async def handle_request(service, method, target, body):
+    """Route one request, returning (status, body, content_type, headers)"""
+    url = urlsplit(target)
+    
+    if url.path == '/health':
+        if method != 'GET':
+            raise ServiceError(405, "Use GET")
+        running = min(service['admitted'], service['workers'])
+        return 200, json_body({
+            'status': 'ok',
+            'workers': service['workers'],
+            'running': running,
+            'queued': service['admitted'] - running,
+            'queue_size': service['queue_size'],
+            'served': service['served'],
+            'rejected': service['rejected'],
+            'failed': service['failed'],
+            'restarts': service['restarts'],
+        }), 'application/json', {}
+    
+    if url.path == '/convert':
+        if method != 'POST':
+            raise ServiceError(405, "Use POST with the HTML as the request body")
+        fmt, output = await convert_request(service, parse_qs(url.query), body)
+        return 200, output, CONTENT_TYPES[fmt], {}
+    
+    raise ServiceError(404, f"No route for {url.path}")
+
+async def handle_connection(service, reader, writer):
+    """Serve the requests on one keep-alive connection"""
+    try:
+        while True:
+            keep_alive = True
+            try:
+                request = await read_request(reader, service['max_body'])
+                if request is None:
+                    break
+                method, target, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                status, payload, content_type, extra = await handle_request(service, method, target, body)
+            except ServiceError as e:
+                status, payload, content_type = e.status, json_body({'error': str(e)}), 'application/json'
+                extra = {'Retry-After': '1'} if e.status == 503 else {}
+                # The unread body of a rejected upload makes the stream unusable
+                keep_alive = keep_alive and e.status not in (400, 411, 413)
+            
+            if not keep_alive:
+                extra = dict(extra, Connection='close')
+            write_response(writer, status, payload, content_type, extra)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+async def start_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None):
+    """Start listening on a TCP port, or on a Unix socket when a path is given"""
+    def on_connection(reader, writer):
+        return handle_connection(service, reader, writer)
+    
+    if socket_path:
+        return await asyncio.start_unix_server(on_connection, path=socket_path)
+    return await asyncio.start_server(on_connection, host, port)
+
+async def run_service(args):
+    """Run the service until interrupted"""
+    service = make_service(args.workers, args.queue_size, args.timeout, args.max_body_mb)
+    
+    # Start every worker now so the first requests do not pay for it
+    await start_workers(service)
+    
+    server = await start_server(service, args.host, args.port, args.socket)
+    where = args.socket or f"http://{args.host}:{args.port}"
+    print(f"✓ Listening on {where} with {service['workers']} warm workers "
+          f"(queue of {service['queue_size']})")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service['executor'].shutdown(cancel_futures=True)
+
+def main():
+    """Run the conversion service"""
+    arg_parser = argparse.ArgumentParser(description="Serve HTML to Word/PowerPoint conversions over HTTP")
+    arg_parser.add_argument('--host', default=DEFAULT_HOST, help=f"Address to bind (default: {DEFAULT_HOST})")
+    arg_parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"Port to bind (default: {DEFAULT_PORT})")
+    arg_parser.add_argument('--socket', help="Listen on this Unix socket path instead of TCP")
+    arg_parser.add_argument('--workers', type=int, help="Warm worker processes (default: CPU count)")
+    arg_parser.add_argument('--queue-size', type=int,
+                            help="Requests allowed to wait for a worker before new ones get 503 (default: 4 per worker)")
+    arg_parser.add_argument('--timeout', type=float, help="Per-request conversion time limit in seconds")
+    arg_parser.add_argument('--max-body-mb', type=int, default=64, help="Largest accepted HTML upload (default: 64)")
+    args = arg_parser.parse_args()
+    
+    print("=" * 60)
+    print("HTML Conversion Service")
+    print("=" * 60)
+    
+    try:
+        asyncio.run(run_service(args))
+    except KeyboardInterrupt:
+        print("Stopped")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,471 @@
+"""
+HTML Document Converter
+Parses each HTML document once and renders it to Word and PowerPoint,
+converting whole directory trees in parallel worker processes
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import signal
+import sys
+import time
+import traceback
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+import build_cache
+from conversion_metrics import stage, start_metrics, stop_metrics, write_metrics
+from package_optimizer import COMPRESSION_STRATEGIES, DEFAULT_COMPRESSION
+from parallel_render import resolve_jobs
+from html_document_model import load_document, stream_document
+from html_parsers import PARSER_BACKENDS, select_parser
+from html_to_word_converter import render_docx
+from html_to_pptx_converter import render_pptx
+from media_cache import local_images
+
+# Output renderers keyed by file extension
+RENDERERS = {
+    'docx': render_docx,
+    'pptx': render_pptx,
+}
+
+# Directories searched for HTML when no paths are given
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ROOTS = [
+    os.path.join(PROJECT_DIR, 'papers'),
+    os.path.join(PROJECT_DIR, 'Algorithm_Documentation'),
+]
+
+class ConversionTimeout(Exception):
+    """Raised inside a worker when a conversion runs past its time limit"""
+
+def on_timeout(signum, frame):
+    """Signal handler that aborts the running conversion"""
+    raise ConversionTimeout()
+
+def discover_html(paths):
+    """Collect HTML files from the given files and directory trees, in sorted order"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    if filename.lower().endswith(('.html', '.htm')):
+                        found.append(os.path.join(dirpath, filename))
+        else:
+            found.append(path)
+    return found
+
+def output_path(html_file, fmt, output_dir=None):
+    """Return where the rendering of an HTML file in a format is written"""
+    base_name = os.path.splitext(os.path.basename(html_file))[0]
+    return os.path.join(output_dir or os.path.dirname(html_file), f"{base_name}.{fmt}")
+
+def convert_html(html_file, formats=('docx', 'pptx'), output_dir=None, document=None, parser=None,
+                 stream=False, section_caches=None, compression=None, render_jobs=1):
+    """Convert an HTML file to every requested format from a single parse
+    
+    With stream=True the file is instead read incrementally, once per format,
+    so memory stays bounded on very large inputs. section_caches maps a format
+    to the section cache its renderer reuses unchanged sections from, and
+    compression sets the zip level and strategy of the output packages.
+    render_jobs is the number of processes a large document's sections are
+    rendered in.
+    """
+    if document is None and not stream:
+        document = load_document(html_file, parser)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    
+    outputs = []
+    for fmt in formats:
+        output_file = output_path(html_file, fmt, output_dir)
+        section_cache = section_caches.setdefault(fmt, {}) if section_caches is not None else None
+        RENDERERS[fmt](stream_document(html_file) if stream else document, output_file, section_cache,
+                       compression, jobs=render_jobs)
+        outputs.append(output_file)
+    
+    return outputs
+
+def convert_incremental(html_file, formats, output_dir, cache_entries, force, result, parser=None,
+                        stream=False, compression=None, render_jobs=1):
+    """Rebuild only the outputs whose inputs (the HTML and its local images) or converter fingerprint changed"""
+    with stage('hash'):
+        input_hash = build_cache.hash_inputs(html_file, local_images(html_file))
+    # Streaming always reads with lxml, so the parser choice does not apply
+    options = {'stream': True} if stream else {'parser': select_parser(parser)}
+    options['compression'] = dict(DEFAULT_COMPRESSION, **(compression or {}))
+    
+    stale = []
+    for fmt in formats:
+        output_file = output_path(html_file, fmt, output_dir)
+        key = build_cache.manifest_key(output_file)
+        fingerprint = build_cache.converter_fingerprint(fmt, options)
+        reason = build_cache.rebuild_reason(cache_entries.get(key), output_file,
+                                            input_hash, fingerprint, force)
+        if reason is None:
+            result['skipped'].append(output_file)
+            result['reasons'][output_file] = "up to date"
+        else:
+            stale.append((fmt, output_file, key, fingerprint))
+            result['reasons'][output_file] = reason
+    
+    if not stale:
+        return
+    
+    # Parse once for every stale output
+    result['outputs'] = convert_html(html_file, [fmt for fmt, _, _, _ in stale], output_dir,
+                                     parser=options.get('parser'), stream=stream, compression=compression,
+                                     render_jobs=render_jobs)
+    for fmt, output_file, key, fingerprint in stale:
+        result['entries'][key] = build_cache.make_entry(html_file, output_file, input_hash, fingerprint)
+
+def convert_job(html_file, formats, output_dir=None, timeout=None, memory_limit_mb=None,
+                cache_entries=None, force=False, parser=None, stream=False, metrics=False, compression=None,
+                render_jobs=1):
+    """Convert one file under a time and memory limit, returning a result record
+    
+    When cache_entries (the manifest entries for this file's outputs) is given,
+    outputs that are already up to date are skipped. With metrics=True the
+    record also carries per-stage timings and counters.
+    """
+    result = {
+        'file': html_file,
+        'status': 'ok',
+        'outputs': [],
+        'skipped': [],
+        'reasons': {},
+        'entries': {},
+        'seconds': 0.0,
+        'error': None,
+        'traceback': None,
+        'metrics': None,
+    }
+    
+    # Cap the address space of this worker (POSIX only); the old cap is put back
+    # afterwards, since with one job the worker is the calling process
+    previous_limit = None
+    if memory_limit_mb and resource is not None:
+        previous_limit = resource.getrlimit(resource.RLIMIT_AS)
+        limit = memory_limit_mb * 1024 * 1024
+        hard = previous_limit[1]
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    
+    # Abort the conversion with SIGALRM once the timeout expires (POSIX only)
+    use_alarm = bool(timeout) and hasattr(signal, 'SIGALRM')
+    if use_alarm:
+        signal.signal(signal.SIGALRM, on_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    
+    if metrics:
+        start_metrics(html_file)
+    
+    start = time.perf_counter()
+    try:
+        if cache_entries is None:
+            result['outputs'] = convert_html(html_file, formats, output_dir, parser=parser, stream=stream,
+                                             compression=compression, render_jobs=render_jobs)
+        else:
+            convert_incremental(html_file, formats, output_dir, cache_entries, force, result, parser, stream,
+                                compression, render_jobs)
+    except ConversionTimeout:
+        result['status'] = 'timeout'
+        result['error'] = f"Timed out after {timeout}s"
+    except MemoryError:
+        result['status'] = 'memory'
+        result['error'] = f"Exceeded memory limit of {memory_limit_mb} MB"
+    except FileNotFoundError as e:
+        result['status'] = 'missing'
+        result['error'] = str(e)
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = str(e)
+        result['traceback'] = traceback.format_exc()
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        if previous_limit is not None:
+            resource.setrlimit(resource.RLIMIT_AS, previous_limit)
+    
+    result['seconds'] = round(time.perf_counter() - start, 4)
+    result['metrics'] = stop_metrics()
+    return result
+
+def convert_batch(html_files, formats=('docx', 'pptx'), output_dir=None, jobs=None,
+                  timeout=None, memory_limit_mb=None, manifest=None, force=False, parser=None, stream=False,
+                  metrics=False, compression=None):
+    """Convert many files in parallel worker processes, yielding results in input order
+    
+    Pass the loaded build manifest to skip outputs that are already up to date;
+    each result's 'entries' should then be merged back into it. A single file
+    without a time or memory limit is converted in this process instead, with
+    its sections rendered in the worker processes; the limits are meant for a
+    worker, so a limited file still gets one.
+    """
+    job_args = []
+    for html_file in html_files:
+        cache_entries = None
+        if manifest is not None:
+            keys = [build_cache.manifest_key(output_path(html_file, fmt, output_dir)) for fmt in formats]
+            cache_entries = {key: manifest[key] for key in keys if key in manifest}
+        job_args.append((html_file, formats, output_dir, timeout, memory_limit_mb, cache_entries, force, parser, stream, metrics,
+                         compression))
+    
+    if jobs == 1:
+        for args in job_args:
+            yield convert_job(*args)
+        return
+    
+    if len(job_args) == 1 and timeout is None and not memory_limit_mb:
+        yield convert_job(*job_args[0], render_jobs=resolve_jobs(jobs))
+        return
+    
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(convert_job, *args) for args in job_args]
+        for future, args in zip(futures, job_args):
+            try:
+                yield future.result()
+            except Exception as e:
+                # The worker itself died (e.g. killed by the OS)
+                yield {
+                    'file': args[0],
+                    'status': 'crashed',
+                    'outputs': [],
+                    'skipped': [],
+                    'reasons': {},
+                    'entries': {},
+                    'seconds': 0.0,
+                    'error': str(e) or type(e).__name__,
+                    'traceback': traceback.format_exc(),
+                    'metrics': None,
+                }
+
+def profile_conversion(html_file, formats, output_dir, parser=None, stream=False, stats_file=None, limit=25):
+    """Convert one file under cProfile, saving the stats and printing the hottest calls"""
+    if stats_file is None:
+        base_name = os.path.splitext(os.path.basename(html_file))[0]
+        stats_file = os.path.join(build_cache.CACHE_DIR, 'profiles', f"{base_name}.prof")
+    
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        outputs = convert_html(html_file, formats, output_dir, parser=parser, stream=stream)
+    finally:
+        profiler.disable()
+    
+    os.makedirs(os.path.dirname(os.path.abspath(stats_file)), exist_ok=True)
+    profiler.dump_stats(stats_file)
+    pstats.Stats(profiler).sort_stats('cumulative').print_stats(limit)
+    return outputs, stats_file
+
+def input_mtimes(paths):
+    """Return the modification time of every HTML file under the given paths"""
+    mtimes = {}
+    for html_file in discover_html(paths):
+        try:
+            mtimes[html_file] = os.stat(html_file).st_mtime_ns
+        except OSError:
+            pass  # Removed between listing and stat
+    return mtimes
+
+def trim_cache(cache, limit):
+    """Drop the least recently used entries of a section cache beyond the limit"""
+    while len(cache) > limit:
+        del cache[next(iter(cache))]
+
+def rebuild_watched(html_file, formats, output_dir, parser, stream, section_caches, cache_limit):
+    """Rebuild one watched file in-process, reusing the rendered sections that did not change"""
+    start = time.perf_counter()
+    start_metrics(html_file)
+    try:
+        convert_html(html_file, formats, output_dir, parser=parser, stream=stream,
+                     section_caches=section_caches)
+    except Exception as e:
+        stop_metrics()
+        print(f"✗ {html_file}: {e}")
+        return False
+    counters = stop_metrics()['counters']
+    for cache in section_caches.values():
+        trim_cache(cache, cache_limit)
+    
+    rendered = counters.get('sections.rendered', 0)
+    total = rendered + counters.get('sections.reused', 0)
+    print(f"✓ {html_file} ({time.perf_counter() - start:.2f}s, "
+          f"{rendered}/{total} sections re-rendered)")
+    return True
+
+def watch_html(paths, formats, output_dir=None, parser=None, stream=False, interval=0.2, debounce=0.1,
+               cache_limit=1000):
+    """Rebuild HTML files whenever they change, until interrupted
+    
+    Files are polled for modification time changes. A burst of saves is
+    debounced: rebuilding waits until no file has changed for the debounce
+    period. Each file keeps a per-format cache of its rendered sections, so
+    only the sections that were edited are rendered again.
+    """
+    caches = {}
+    mtimes = input_mtimes(paths)
+    for html_file in mtimes:
+        rebuild_watched(html_file, formats, output_dir, parser, stream,
+                        caches.setdefault(html_file, {}), cache_limit)
+    print(f"Watching {len(mtimes)} files for changes (Ctrl+C to stop)")
+    
+    while True:
+        time.sleep(interval)
+        current = input_mtimes(paths)
+        if current == mtimes:
+            continue
+        
+        # Wait for the writes to settle
+        settled = current
+        while True:
+            time.sleep(debounce)
+            current = input_mtimes(paths)
+            if current == settled:
+                break
+            settled = current
+        
+        changed = [html_file for html_file, mtime in current.items() if mtimes.get(html_file) != mtime]
+        for html_file in set(mtimes) - set(current):
+            caches.pop(html_file, None)
+        mtimes = current
+        for html_file in changed:
+            rebuild_watched(html_file, formats, output_dir, parser, stream,
+                            caches.setdefault(html_file, {}), cache_limit)
+
+def main():
+    """Main conversion function"""
+    arg_parser = argparse.ArgumentParser(description="Convert HTML documents to Word and PowerPoint")
+    arg_parser.add_argument('paths', nargs='*', default=DEFAULT_ROOTS,
+                        help="HTML files or directories to search (default: papers/ and Algorithm_Documentation/)")
+    arg_parser.add_argument('--formats', nargs='+', choices=sorted(RENDERERS), default=sorted(RENDERERS),
+                        help="Output formats to render")
+    arg_parser.add_argument('--output-dir', help="Directory for output files (defaults to next to each input)")
+    arg_parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes; a single file's sections are rendered in them "
+                             "(default: CPU count)")
+    arg_parser.add_argument('--timeout', type=float, help="Per-file time limit in seconds")
+    arg_parser.add_argument('--memory-limit', type=int, metavar='MB', help="Per-worker memory cap in megabytes")
+    arg_parser.add_argument('--parser', choices=sorted(PARSER_BACKENDS),
+                        help="HTML parser backend (default: lxml when installed, else html.parser)")
+    arg_parser.add_argument('--stream', action='store_true',
+                        help="Read each HTML file incrementally to bound memory on very large inputs (needs lxml)")
+    arg_parser.add_argument('--compression-level', type=int, choices=range(10), metavar='0-9',
+                        default=DEFAULT_COMPRESSION['level'],
+                        help=f"Zip compression level of the outputs (default: {DEFAULT_COMPRESSION['level']})")
+    arg_parser.add_argument('--zip-strategy', choices=sorted(COMPRESSION_STRATEGIES),
+                        default=DEFAULT_COMPRESSION['strategy'],
+                        help="; ".join(f"{name}: {text}" for name, text in COMPRESSION_STRATEGIES.items()) +
+                             f" (default: {DEFAULT_COMPRESSION['strategy']})")
+    arg_parser.add_argument('--report', help="Write per-file results to this JSON file")
+    arg_parser.add_argument('--metrics', metavar='FILE',
+                        help="Append per-file stage timings and counters to this JSON lines file")
+    arg_parser.add_argument('--profile', metavar='HTML_FILE',
+                        help="Convert only this file under cProfile and print the hottest calls")
+    arg_parser.add_argument('--profile-output', metavar='FILE',
+                        help="Where to save the pstats data (default: .cache/convert/profiles/<name>.prof)")
+    arg_parser.add_argument('--watch', action='store_true',
+                        help="Keep running and rebuild files as they change, re-rendering only edited sections")
+    arg_parser.add_argument('--watch-interval', type=float, default=0.2, metavar='SECONDS',
+                        help="How often to check the watched files for changes (default: 0.2)")
+    arg_parser.add_argument('--debounce', type=float, default=0.1, metavar='SECONDS',
+                        help="Quiet period to wait for after a change before rebuilding (default: 0.1)")
+    arg_parser.add_argument('--manifest', default=build_cache.DEFAULT_MANIFEST,
+                        help="Build manifest used to skip up-to-date outputs")
+    arg_parser.add_argument('--no-cache', action='store_true', help="Ignore the build manifest and rebuild everything")
+    arg_parser.add_argument('--force', action='store_true', help="Rebuild every output and refresh the manifest")
+    arg_parser.add_argument('--explain', action='store_true', help="Show why each output was rebuilt or skipped")
+    args = arg_parser.parse_args()
+    
+    if args.parser:
+        try:
+            select_parser(args.parser)
+        except ValueError as e:
+            arg_parser.error(str(e))
+    if args.stream:
+        if args.parser:
+            arg_parser.error("--stream always parses with lxml; drop --parser")
+        if not PARSER_BACKENDS['lxml-tree']['available']:
+            arg_parser.error("--stream needs lxml; install lxml")
+    
+    if args.profile:
+        outputs, stats_file = profile_conversion(args.profile, args.formats, args.output_dir, args.parser,
+                                                 args.stream, args.profile_output)
+        for output_file in outputs:
+            print(f"  → {output_file}")
+        print(f"Saved profile to {stats_file} (inspect with: python -m pstats {stats_file})")
+        return 0
+    
+    if args.watch:
+        print("=" * 60)
+        print("HTML Document Converter (watch mode)")
+        print("=" * 60)
+        try:
+            watch_html(args.paths, args.formats, args.output_dir, args.parser, args.stream,
+                       args.watch_interval, args.debounce)
+        except KeyboardInterrupt:
+            print("Stopped watching")
+        return 0
+    
+    html_files = discover_html(args.paths)
+    compression = {'level': args.compression_level, 'strategy': args.zip_strategy}
+    manifest = None if args.no_cache else build_cache.load_manifest(args.manifest)
+    
+    print("=" * 60)
+    print("HTML Document Converter")
+    print("=" * 60)
+    
+    results = []
+    for result in convert_batch(html_files, args.formats, args.output_dir, args.jobs,
+                                args.timeout, args.memory_limit, manifest, args.force, args.parser,
+                                args.stream, bool(args.metrics), compression):
+        results.append(result)
+        if manifest is not None:
+            manifest.update(result['entries'])
+        
+        if result['status'] == 'ok':
+            state = "up to date" if not result['outputs'] else f"{result['seconds']:.2f}s"
+            print(f"✓ {result['file']} ({state})")
+            for output_file in result['outputs']:
+                print(f"  → {output_file}")
+            if args.explain:
+                for output_file, reason in result['reasons'].items():
+                    print(f"    {os.path.basename(output_file)}: {reason}")
+        else:
+            print(f"✗ {result['file']}: [{result['status']}] {result['error']}")
+            if result['traceback']:
+                print(result['traceback'])
+    
+    if manifest is not None:
+        build_cache.save_manifest(manifest, args.manifest)
+    
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    
+    if args.metrics:
+        write_metrics([
+            dict(result['metrics'] or {'file': result['file'], 'stages': {}, 'counters': {}},
+                 status=result['status'], seconds=result['seconds'])
+            for result in results
+        ], args.metrics)
+    
+    failed = sum(1 for result in results if result['status'] != 'ok')
+    print("=" * 60)
+    print(f"Conversion complete! {len(results) - failed} succeeded, {failed} failed")
+    print("=" * 60)
+    
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""
+Dataset Report
+Aggregates the crop production dataset in one streaming pass and renders the
+statistics straight to Word and PowerPoint, with tables and native charts
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from conversion_metrics import count, stage, start_metrics, stop_metrics, write_metrics
+from html_document_model import index_nodes
+from html_to_word_converter import render_docx
+from html_to_pptx_converter import render_pptx
+from native_charts import chart_node
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATASET = os.path.join(PROJECT_DIR, 'src', 'data', 'crop_dataset.csv')
+
+# Output renderers keyed by file extension
+RENDERERS = {
+    'docx': render_docx,
+    'pptx': render_pptx,
+}
+
+# Dataset columns by position; the header names the first four all 'Crop'
+CROP, YEAR, SEASON, STATE, AREA, PRODUCTION, RAINFALL, FERTILIZER, PESTICIDE, YIELD = range(10)
+COLUMN_COUNT = 10
+
+# Columns summed per group, in the order of the totals lists
+MEASURES = (AREA, PRODUCTION, FERTILIZER, PESTICIDE)
+
+# Groupings reported on, with the column each one keys on
+GROUPINGS = {'state': STATE, 'season': SEASON, 'crop': CROP, 'year': YEAR}
+
+# Bytes of the dataset read at a time; each chunk is converted column by column
+CHUNK_BYTES = 4 * 1024 * 1024
+
+# Groups shown in the ranking charts
+TOP_GROUPS = 10
+
+def read_chunks(dataset_file, chunk_bytes=CHUNK_BYTES):
+    """Stream the tab-separated dataset as lists of rows, skipping the header and malformed rows
+    
+    The dataset has no quoted fields, so lines are split on tabs directly,
+    which is about twice as fast as the csv module.
+    """
+    with open(dataset_file, 'r', encoding='utf-8') as f:
+        f.readline()
+        while True:
+            lines = f.readlines(chunk_bytes)
+            if not lines:
+                return
+            chunk = [line.rstrip('\r\n').split('\t') for line in lines]
+            rows = [row for row in chunk if len(row) == COLUMN_COUNT]
+            count('dataset.rows_skipped', sum(1 for row in chunk if len(row) != COLUMN_COUNT and row != ['']))
+            if rows:
+                yield rows
+
+def is_numeric_row(row):
+    """Check whether every measure of a row is a number"""
+    try:
+        for column in MEASURES:
+            float(row[column])
+    except ValueError:
+        return False
+    return True
+
+def chunk_columns(rows):
+    """Transpose a chunk into its columns, with the measures converted to floats
+    
+    Returns (columns, measures). Rows with an unreadable measure are dropped;
+    if none are left both are None.
+    """
+    columns = list(zip(*rows))
+    try:
+        return columns, [list(map(float, columns[column])) for column in MEASURES]
+    except ValueError:
+        kept = [row for row in rows if is_numeric_row(row)]
+        count('dataset.rows_skipped', len(rows) - len(kept))
+        return chunk_columns(kept) if kept else (None, None)
+
+def accumulate(totals, keys, measures):
+    """Add a chunk's measures into per-key totals of [area, production, fertilizer, pesticide, rows]"""
+    for key, area, production, fertilizer, pesticide in zip(keys, *measures):
+        group = totals.get(key)
+        if group is None:
+            group = totals[key] = [0.0, 0.0, 0.0, 0.0, 0]
+        group[0] += area
+        group[1] += production
+        group[2] += fertilizer
+        group[3] += pesticide
+        group[4] += 1
+
+def aggregate_dataset(dataset_file):
+    """Aggregate the dataset in one streaming pass
+    
+    Returns {'rows': n, 'groups': {grouping: {key: totals}}} with the totals
+    of each state, season, crop and year as [area, production, fertilizer,
+    pesticide, rows]. Memory grows with the number of groups, not rows.
+    """
+    groups = {name: {} for name in GROUPINGS}
+    rows_read = 0
+    for rows in read_chunks(dataset_file):
+        columns, measures = chunk_columns(rows)
+        if columns is None:
+            continue
+        rows_read += len(measures[0])
+        for name, column in GROUPINGS.items():
+            accumulate(groups[name], map(str.strip, columns[column]), measures)
+    count('dataset.rows', rows_read)
+    return {'rows': rows_read, 'groups': groups}
+
+def per_hectare(amount, area):
+    """Divide a total by the area it was measured over, or 0 for no area"""
+    return amount / area if area else 0.0
+
+def change(current, previous):
+    """Format the relative change from one year to the next"""
+    if not previous:
+        return '—'
+    return f"{(current - previous) / previous:+.1%}"
+
+def heading(text):
+    """Create a section heading node"""
+    return {'tag': 'h2', 'type': 'heading', 'classes': [], 'children': [], 'level': 2, 'text': text}
+
+def paragraph(text):
+    """Create a plain paragraph node"""
+    return {'tag': 'p', 'type': 'paragraph', 'classes': [], 'children': [], 'text': text,
+            'bold': False, 'italic': False}
+
+def table(headers, rows):
+    """Create a table node with one header row"""
+    return {'tag': 'table', 'type': 'table', 'classes': [], 'children': [], 'headers': headers,
+            'rows': rows, 'header_grid': [headers], 'merges': []}
+
+def ranking_blocks(label, totals, chart_kind='column'):
+    """Build the table and production chart of one grouping, largest producers first"""
+    ranked = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)
+    rows = [
+        [key, f"{area:,.0f}", f"{production:,.0f}", f"{per_hectare(production, area):,.2f}",
+         f"{per_hectare(fertilizer, area):,.1f}", f"{per_hectare(pesticide, area):,.2f}"]
+        for key, (area, production, fertilizer, pesticide, _) in ranked
+    ]
+    headers = [label, 'Area (ha)', 'Production', 'Yield (per ha)', 'Fertilizer (kg/ha)', 'Pesticide (kg/ha)']
+    top = ranked[:TOP_GROUPS]
+    chart = chart_node(chart_kind, f"Production by {label.lower()}" if len(top) == len(ranked)
+                       else f"Top {len(top)} {label.lower()}s by production",
+                       [key for key, _ in top], [('Production', [group[1] for _, group in top])])
+    return [table(headers, rows), chart]
+
+def trend_blocks(years):
+    """Build the year-over-year table and trend charts"""
+    ordered = sorted(years.items(), key=lambda item: int(item[0]) if item[0].isdigit() else item[0])
+    rows = []
+    previous = None
+    for year, (area, production, fertilizer, pesticide, _) in ordered:
+        crop_yield = per_hectare(production, area)
+        rows.append([year, f"{production:,.0f}", change(production, previous and previous[0]),
+                     f"{crop_yield:,.2f}", change(crop_yield, previous and previous[1]),
+                     f"{per_hectare(fertilizer, area):,.1f}", f"{per_hectare(pesticide, area):,.2f}"])
+        previous = (production, crop_yield)
+    
+    headers = ['Year', 'Production', 'Change', 'Yield (per ha)', 'Change', 'Fertilizer (kg/ha)',
+               'Pesticide (kg/ha)']
+    labels = [year for year, _ in ordered]
+    return [
+        table(headers, rows),
+        chart_node('line', "Production by year", labels,
+                   [('Production', [group[1] for _, group in ordered])]),
+        chart_node('line', "Input use per hectare by year", labels, [
+            ('Fertilizer (kg/ha)', [per_hectare(group[2], group[0]) for _, group in ordered]),
+            ('Pesticide (kg/ha)', [per_hectare(group[3], group[0]) for _, group in ordered]),
+        ], number_format='#,##0.0'),
+    ]
+
+def build_report(dataset_file, summary):
+    """Build a document model of the dataset statistics, ready for the Word and PowerPoint renderers"""
+    groups = summary['groups']
+    area, production, fertilizer, pesticide = (sum(group[i] for group in groups['year'].values())
+                                               for i in range(4))
+    years = sorted(groups['year'])
+    top_state = max(groups['state'].items(), key=lambda item: item[1][1], default=('—', None))[0]
+    top_crop = max(groups['crop'].items(), key=lambda item: item[1][1], default=('—', None))[0]
+    
+    blocks = [
+        heading('Overview'),
+        paragraph(f"{summary['rows']:,} records from {years[0] if years else '—'} to "
+                  f"{years[-1] if years else '—'} covering {len(groups['state'])} states, "
+                  f"{len(groups['crop'])} crops and {len(groups['season'])} seasons."),
+        paragraph(f"Total production of {production:,.0f} from {area:,.0f} ha, an average yield of "
+                  f"{per_hectare(production, area):,.2f} per hectare."),
+        paragraph(f"Fertilizer use averaged {per_hectare(fertilizer, area):,.1f} kg/ha and pesticide use "
+                  f"{per_hectare(pesticide, area):,.2f} kg/ha."),
+        paragraph(f"The largest producing state is {top_state} and the largest crop is {top_crop}."),
+        heading('Production by State'),
+        *ranking_blocks('State', groups['state']),
+        heading('Production by Season'),
+        *ranking_blocks('Season', groups['season']),
+        heading('Production by Crop'),
+        *ranking_blocks('Crop', groups['crop']),
+        heading('Year-over-Year Trends'),
+        *trend_blocks(groups['year']),
+    ]
+    return {
+        'title': 'Crop Production Report',
+        'meta': f"Source: {os.path.basename(dataset_file)}",
+        'abstract': None,
+        'base_dir': None,
+        'css': [],
+        'blocks': blocks,
+        'index': index_nodes(blocks),
+    }
+
+def generate_report(dataset_file, formats, output_dir, compression=None):
+    """Aggregate a dataset and render its report in each format, returning the output paths"""
+    with stage('aggregate'):
+        summary = aggregate_dataset(dataset_file)
+    document = build_report(dataset_file, summary)
+    
+    name = os.path.splitext(os.path.basename(dataset_file))[0]
+    outputs = []
+    for fmt in formats:
+        output_file = os.path.join(output_dir, f"{name}_report.{fmt}")
+        RENDERERS[fmt](document, output_file, compression=compression)
+        outputs.append(output_file)
+    return outputs
+
+def main():
+    """Generate the dataset report"""
+    arg_parser = argparse.ArgumentParser(description="Render crop dataset statistics to Word and PowerPoint")
+    arg_parser.add_argument('dataset', nargs='?', default=DEFAULT_DATASET,
+                            help="Tab-separated crop dataset (default: src/data/crop_dataset.csv)")
+    arg_parser.add_argument('--formats', nargs='+', choices=sorted(RENDERERS), default=sorted(RENDERERS),
+                            help="Output formats to render")
+    arg_parser.add_argument('--output-dir', default='.', help="Directory for output files (default: current)")
+    arg_parser.add_argument('--metrics', metavar='FILE',
+                            help="Append stage timings and counters to this JSON lines file")
+    args = arg_parser.parse_args()
+    
+    print("=" * 60)
+    print("Dataset Report")
+    print("=" * 60)
+    
+    if args.metrics:
+        start_metrics(args.dataset)
+    start = time.perf_counter()
+    try:
+        os.makedirs(args.output_dir, exist_ok=True)
+        outputs = generate_report(args.dataset, args.formats, args.output_dir)
+    except FileNotFoundError:
+        print(f"✗ File not found: {args.dataset}")
+        return 1
+    finally:
+        metrics = stop_metrics()
+    if metrics is not None:
+        write_metrics([metrics], args.metrics)
+    
+    print(f"✓ {args.dataset} ({time.perf_counter() - start:.2f}s)")
+    for output_file in outputs:
+        print(f"  → {output_file}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Document Cache
+Keeps the document model extracted from each HTML file on disk, keyed by the
+source content hash, so rendering an unchanged file again (in another format
+or with other output options) starts from the model instead of re-parsing.
+Models sit in one directory per version of the model code, and every write
+prunes the cache back to its size limit.
+"""
+
+import gc
+import json
+import mmap
+import os
+import pickle
+import shutil
+
+import build_cache
+
+# Bump to invalidate every cached document
+DOCUMENT_VERSION = 1
+
+DOCUMENT_DIR = os.path.join(build_cache.CACHE_DIR, 'documents')
+
+# Modules whose source code decides the extracted model
+MODEL_SOURCES = ('html_parsers.py', 'html_document_model.py')
+
+# Past this total size the least recently used models are deleted
+MAX_BYTES = 512 * 1024 * 1024
+
+class ModelPickler(pickle.Pickler):
+    """Pickler that stores the parser backends' list and string subclasses as plain lists and strings"""
+    
+    def reducer_override(self, obj):
+        if isinstance(obj, list) and type(obj) is not list:
+            return list, (list(obj),)
+        if isinstance(obj, str) and type(obj) is not str:
+            return str, (str(obj),)
+        return NotImplemented
+
+def document_key(html_hash, parser, rules):
+    """Key a cached model on the source hash, the parser backend and the rules it was extracted with"""
+    return build_cache.hash_bytes(json.dumps([
+        DOCUMENT_VERSION, html_hash, parser, build_cache.source_fingerprint(MODEL_SOURCES), rules,
+    ]).encode('utf-8'))
+
+def model_dir():
+    """Return the directory of the models extracted by the current model code"""
+    return os.path.join(DOCUMENT_DIR, build_cache.source_fingerprint(MODEL_SOURCES)[:16])
+
+def read_cached(key):
+    """Return a cached document model, without its index and base directory, or None
+    
+    The file is memory-mapped and unpickled straight from the mapping, so it
+    is never copied into one large bytes object first. The garbage collector
+    is paused meanwhile: the model is acyclic, and the collections its
+    allocations would trigger cost more than the unpickling itself.
+    """
+    path = os.path.join(model_dir(), f"{key}.pickle")
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            model = pickle.loads(data)
+    except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+        return None  # Missing, empty or truncated; the caller parses instead
+    finally:
+        if collecting:
+            gc.enable()
+    
+    # Mark the model as recently used, so pruning keeps it
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return model
+
+def write_cached(key, document):
+    """Store a document model in the on-disk cache
+    
+    The index refers to nodes by identity and the base directory belongs to
+    the file's location, not its content, so neither is stored.
+    """
+    directory = model_dir()
+    os.makedirs(directory, exist_ok=True)
+    model = {field: value for field, value in document.items() if field not in ('index', 'base_dir')}
+    path = os.path.join(directory, f"{key}.pickle")
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        ModelPickler(f, protocol=pickle.HIGHEST_PROTOCOL).dump(model)
+    os.replace(temp_path, path)
+    prune_cached()
+
+def prune_cached(max_bytes=None):
+    """Delete the models no current load can use, then the least recently used past max_bytes
+    
+    Models of older model code (and anything else beside the current model
+    directory) can never be read again, and neither can abandoned temporary
+    files. Returns the number of bytes freed.
+    """
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    current = model_dir()
+    freed = 0
+    try:
+        names = os.listdir(DOCUMENT_DIR)
+    except OSError:
+        return freed
+    for name in names:
+        path = os.path.join(DOCUMENT_DIR, name)
+        if path == current:
+            continue
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                freed += sum(build_cache.remove_file(os.path.join(root, file)) for file in files)
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            freed += build_cache.remove_file(path)
+    
+    return freed + build_cache.prune_files(current, max_bytes)
@@ -0,0 +1,545 @@
+"""
+HTML Document Model
+Parses an HTML document once into a format-neutral block tree that the
+Word and PowerPoint renderers both consume
+"""
+
+from html_parsers import PARSER_BACKENDS, LXML_TREE, iterparse_html, select_parser, strip_markup
+from conversion_metrics import count, stage
+from bisect import bisect_left, bisect_right
+import build_cache
+import document_cache
+import hashlib
+import json
+import os
+import re
+
+# Tags that become blocks in the document model
+HEADING_TAGS = {'h1': 1, 'h2': 2, 'h3': 3}
+LIST_TAGS = {'ul', 'ol'}
+
+# Elements no renderer reads, cut out of the markup (with comments) before it is parsed.
+# <style> is only read for the stylesheets of inline SVG, so it goes too when there is none.
+UNUSED_TAGS = {'script'}
+INLINE_SVG = re.compile(r'<svg\b', re.IGNORECASE)
+
+# What classes mean to the document model; add entries to teach the converters new markup.
+#   'role': the element becomes a container with that role (only on 'tags', when given)
+#   'document': (field, 'text' or 'node') fills a document field from the first such element
+#   'fills': (role, field) fills a field of the enclosing container with that role
+# Elements with a 'role' or 'document' rule are always containers.
+CLASS_RULES = {
+    'paper-summary': {'role': 'paper', 'tags': {'div'}},
+    'paper-entry': {'role': 'paper', 'tags': {'div'}},
+    'section-box': {'role': 'box'},
+    'key-findings': {'role': 'box'},
+    'results-box': {'role': 'box'},
+    'meta-info': {'document': ('meta', 'text')},
+    'author-info': {'document': ('meta', 'text')},
+    'document-header': {'document': ('meta', 'text')},
+    'abstract': {'document': ('abstract', 'node')},
+    'executive-summary': {'document': ('abstract', 'node')},
+    'paper-title': {'fills': ('paper', 'title')},
+    'paper-authors': {'fills': ('paper', 'meta')},
+    'paper-meta': {'fills': ('paper', 'meta')},
+    'section-title': {'fills': ('box', 'title')},
+}
+
+# Container roles, in order of precedence, with the fields their 'fills' rules set
+ROLE_FIELDS = {
+    'paper': ('title', 'meta'),
+    'box': ('title',),
+}
+
+WHITESPACE = re.compile(r'\s+')
+
+def clean_text(text):
+    """Clean and normalize text"""
+    if not text:
+        return ""
+    # Remove extra whitespace
+    text = WHITESPACE.sub(' ', text)
+    return text.strip()
+
+def index_text(root, tree):
+    """Normalize the text of every element under root in one post-order pass
+    
+    Each text node has its whitespace collapsed once, and an element's text is
+    joined from its children's, so nested elements are never re-read. Returns
+    a function giving an element's text as clean_text() would.
+    """
+    content_of = tree['content']
+    collapsed = {}  # Element id -> (element, text); holding the element keeps lxml proxy ids unique
+    text_nodes = 0
+    
+    stack = [(root, None)]
+    while stack:
+        element, content = stack.pop()
+        if content is None:
+            content = content_of(element)
+            stack.append((element, content))
+            stack.extend((child, None) for child in content if not isinstance(child, str))
+            continue
+        
+        parts = []
+        trailing_space = False
+        for item in content:
+            if isinstance(item, str):
+                piece = WHITESPACE.sub(' ', item)
+                text_nodes += 1
+            else:
+                piece = collapsed[id(item)][1]
+            if trailing_space and piece.startswith(' '):
+                piece = piece[1:]
+            if piece:
+                parts.append(piece)
+                trailing_space = piece.endswith(' ')
+        collapsed[id(element)] = (element, ''.join(parts))
+    
+    count('text_nodes', text_nodes)
+    
+    def text_of(element):
+        return collapsed[id(element)][1].strip(' ')
+    return text_of
+
+def parse_span(value, limit):
+    """Parse a rowspan/colspan attribute, clamped to 1..limit"""
+    try:
+        span = int(value)
+    except (TypeError, ValueError):
+        return 1
+    return max(1, min(span, limit))
+
+def table_rows(table_element, tree):
+    """Return the table's own rows as (tr, in_thead) pairs, skipping nested tables"""
+    name_of, children_of = tree['name'], tree['children']
+    rows = []
+    for child in children_of(table_element):
+        name = name_of(child)
+        if name == 'tr':
+            rows.append((child, False))
+        elif name in ('thead', 'tbody', 'tfoot'):
+            rows.extend((tr, name == 'thead') for tr in children_of(child) if name_of(tr) == 'tr')
+    return rows
+
+def extract_table(table_element, tree):
+    """Extract an HTML table into header and body text grids plus its merged cells
+    
+    Rows from <thead> are header rows. Without a <thead>, a first row holding
+    any <th> is the header, along with any following rows made only of <th>.
+    Every grid row is padded to the full column count, with '' in the slots
+    covered by a rowspan/colspan. Merges are (row, col, rowspan, colspan) in
+    the combined header-then-body grid.
+    """
+    name_of, children_of, text, attr = tree['name'], tree['children'], tree['clean_text'], tree['attr']
+    rows = table_rows(table_element, tree)
+    
+    grid = []
+    merges = []
+    covered = set()
+    header_count = 0
+    in_header = True
+    for tr, in_thead in rows:
+        cells = [cell for cell in children_of(tr) if name_of(cell) in ('th', 'td')]
+        if not cells:
+            continue
+        
+        if in_header and not in_thead:
+            is_header = [name_of(cell) == 'th' for cell in cells]
+            in_header = any(is_header) if not grid else all(is_header)
+        
+        r = len(grid)
+        row = {}
+        c = 0
+        for cell in cells:
+            while (r, c) in covered:
+                c += 1
+            rowspan = parse_span(attr(cell, 'rowspan'), len(rows) - r)
+            colspan = parse_span(attr(cell, 'colspan'), 1000)
+            row[c] = text(cell)
+            if rowspan > 1 or colspan > 1:
+                merges.append((r, c, rowspan, colspan))
+                for dr in range(rowspan):
+                    for dc in range(colspan):
+                        covered.add((r + dr, c + dc))
+            c += colspan
+        
+        grid.append(row)
+        if in_header:
+            header_count += 1
+    
+    # Pad every row to the full width of the table
+    width = max([max(row) + 1 for row in grid if row] + [c + 1 for _, c in covered] + [0])
+    grid = [[row.get(c, '') for c in range(width)] for row in grid]
+    
+    # One flat header per column; a merged header cell labels every column it spans
+    header_grid = [list(row) for row in grid[:header_count]]
+    for r, c, rowspan, colspan in merges:
+        for dr in range(rowspan):
+            for dc in range(colspan):
+                if r + dr < header_count:
+                    header_grid[r + dr][c + dc] = grid[r][c]
+    headers = []
+    for c in range(width):
+        labels = []
+        for row in header_grid:
+            if row[c] and row[c] not in labels:
+                labels.append(row[c])
+        headers.append(' / '.join(labels))
+    
+    return {
+        'headers': headers,
+        'rows': grid[header_count:],
+        'header_grid': grid[:header_count],
+        'merges': merges,
+    }
+
+def class_rules(classes):
+    """Return the CLASS_RULES entries of an element's classes"""
+    return [CLASS_RULES[name] for name in classes if name in CLASS_RULES]
+
+def is_container_rule(rule):
+    """Check whether a class rule makes its elements containers"""
+    return 'role' in rule or 'document' in rule
+
+def is_front_matter(node):
+    """Check whether a node's own classes mark it as document meta info or abstract"""
+    return any('document' in rule for rule in class_rules(node['classes']))
+
+def make_node(element, name, classes, in_list, tree, rules=()):
+    """Create the model node for an element, or None if it is transparent
+    
+    rules are the element's class rules, from class_rules().
+    """
+    node = {'tag': name, 'classes': classes, 'children': []}
+    
+    if name in HEADING_TAGS:
+        node['type'] = 'heading'
+        node['level'] = HEADING_TAGS[name]
+        node['text'] = tree['clean_text'](element)
+    
+    elif name == 'p':
+        node['type'] = 'paragraph'
+        node['text'] = tree['clean_text'](element)
+        node['bold'] = tree['contains'](element, ('strong', 'b'))
+        node['italic'] = tree['contains'](element, ('em', 'i'))
+    
+    elif name in LIST_TAGS:
+        node['type'] = 'list'
+        node['ordered'] = name == 'ol'
+    
+    elif name == 'li' and in_list:
+        node['type'] = 'item'
+        node['text'] = tree['clean_text'](element)
+    
+    elif name == 'table':
+        node['type'] = 'table'
+        node.update(extract_table(element, tree))
+    
+    elif name == 'img':
+        node['type'] = 'image'
+        node['src'] = tree['attr'](element, 'src')
+        node['alt'] = clean_text(tree['attr'](element, 'alt'))
+        node['width'] = tree['attr'](element, 'width')
+        node['height'] = tree['attr'](element, 'height')
+    
+    elif name == 'svg':
+        node['type'] = 'image'
+        node['svg'] = tree['markup'](element)
+        node['alt'] = clean_text(tree['attr'](element, 'aria-label'))
+        node['width'] = tree['attr'](element, 'width')
+        node['height'] = tree['attr'](element, 'height')
+    
+    elif name == 'div' or any(is_container_rule(rule) for rule in rules):
+        node['type'] = 'container'
+        roles = {rule['role'] for rule in rules if 'role' in rule and name in rule.get('tags', (name,))}
+        node['role'] = next((role for role in ROLE_FIELDS if role in roles), None)
+        for field in ROLE_FIELDS.get(node['role'], ()):
+            node[field] = None
+    
+    else:
+        return None
+    
+    return node
+
+def build_document(root, tree, base_dir=None):
+    """Build the document model from a parsed HTML tree, read through a parser backend's accessors
+    
+    base_dir is the directory relative image paths are read from; without it
+    only embedded (data URI and inline SVG) images are loaded.
+    """
+    title = tree['title'](root)
+    document = {
+        'title': clean_text(title) if title is not None else None,
+        'meta': None,
+        'abstract': None,
+        'base_dir': base_dir,
+        'css': [],
+        'blocks': [],
+        'index': None,
+    }
+    add_blocks(document, root, tree, document['blocks'])
+    document['index'] = index_nodes(document['blocks'])
+    return document
+
+def add_blocks(document, element, tree, blocks):
+    """Append the model nodes of an element's subtree to blocks
+    
+    The document's meta and abstract are filled in from the first elements
+    that carry them, and every stylesheet is collected for inline SVG.
+    """
+    tree = dict(tree, clean_text=index_text(element, tree))
+    name_of, classes_of, children_of = tree['name'], tree['classes'], tree['children']
+    
+    # Walk the tree once in document order with an explicit stack. Each entry
+    # carries the model children list it attaches to, whether it sits directly
+    # inside a list, and the paper/box nodes that enclose it.
+    stack = [(element, {'children': blocks}, False, ())]
+    visited = 0
+    while stack:
+        element, parent, in_list, scopes = stack.pop()
+        visited += 1
+        
+        name = name_of(element)
+        classes = classes_of(element)
+        rules = class_rules(classes) if classes else ()
+        node = make_node(element, name, classes, in_list, tree, rules)
+        
+        # First matching element in document order fills each scope and document field
+        for rule in rules:
+            if 'fills' in rule and scopes:
+                role, field = rule['fills']
+                for scope in scopes:
+                    if scope['role'] == role and field in scope and scope[field] is None:
+                        scope[field] = tree['clean_text'](element)
+            if 'document' in rule:
+                field, source = rule['document']
+                if document.get(field) is None and (source == 'text' or node is not None):
+                    document[field] = tree['clean_text'](element) if source == 'text' else node
+        
+        if name == 'style':
+            document['css'].append(tree['source_text'](element))
+        
+        if node is not None:
+            parent['children'].append(node)
+            parent = node
+            if node.get('role') in ROLE_FIELDS:
+                scopes = scopes + (node,)
+        
+        if name == 'svg':
+            continue  # Kept whole as markup; its shapes are not content
+        
+        child_in_list = name in LIST_TAGS
+        stack.extend(reversed([
+            (child, parent, child_in_list, scopes)
+            for child in children_of(element)
+        ]))
+    
+    count('nodes_visited', visited)
+
+def is_stream_block(name, classes):
+    """Check whether an element is read whole as one top-level block when streaming"""
+    if name in HEADING_TAGS or name in LIST_TAGS or name in ('p', 'table', 'img', 'svg'):
+        return True
+    return any(is_container_rule(rule) for rule in class_rules(classes))
+
+def stream_blocks(events, document, tree):
+    """Yield the top-level blocks of an incremental parse, freeing each one once it is built"""
+    block = None
+    for event, element in events:
+        if event == 'start':
+            if block is None and is_stream_block(element.tag, tree['classes'](element)):
+                block = element
+            continue
+        
+        if element is block:
+            blocks = []
+            add_blocks(document, element, tree, blocks)
+            block = None
+            yield from blocks
+        
+        if block is None:
+            # Nothing open needs this element or the siblings before it any more
+            element.clear()
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+
+def unused_tags(html_content):
+    """Return the tags parse_document() cuts out of some markup before parsing it"""
+    if INLINE_SVG.search(html_content) is None:
+        return UNUSED_TAGS | {'style'}
+    return UNUSED_TAGS
+
+def parse_document(html_content, parser=None, base_dir=None):
+    """Parse HTML markup into the document model with the chosen (or fastest) parser backend
+    
+    Comments and the elements no renderer reads are dropped from the markup
+    first, so the parser never builds their subtrees.
+    """
+    backend = PARSER_BACKENDS[select_parser(parser)]
+    with stage('parse'):
+        markup = strip_markup(html_content, unused_tags(html_content))
+        count('bytes_skipped', len(html_content) - len(markup))
+        root = backend['parse'](markup)
+    with stage('extract'):
+        return build_document(root, backend['tree'], base_dir)
+
+def stream_document(html_file):
+    """Parse an HTML file incrementally into a document whose blocks arrive as they close
+    
+    Only the block being read is held in memory, so memory stays bounded on
+    very large files. Plain containers are flattened into their blocks, since
+    the renderers only descend through them. The blocks are a one-shot
+    iterator, and the document's meta and abstract are filled in as the
+    blocks holding them are read.
+    """
+    tree = LXML_TREE
+    document = {
+        'title': None,
+        'meta': None,
+        'abstract': None,
+        'base_dir': os.path.dirname(os.path.abspath(html_file)),
+        'css': [],
+        'blocks': None,
+        'index': None,  # Indexing would keep every streamed block in memory
+    }
+    
+    # Read the <head> first so the title and stylesheets are known before any block
+    events = iter(iterparse_html(html_file))
+    for event, element in events:
+        if event == 'start' and element.tag == 'body':
+            break
+        if event == 'end' and element.tag == 'title' and document['title'] is None:
+            document['title'] = clean_text(tree['text'](element))
+        if event == 'end' and element.tag == 'style':
+            document['css'].append(tree['source_text'](element))
+    
+    document['blocks'] = stream_blocks(events, document, tree)
+    return document
+
+def rules_fingerprint():
+    """Serialize the class rules, which extensions may change at run time, for cache keys"""
+    return json.dumps(CLASS_RULES, sort_keys=True, default=sorted)
+
+def load_document(html_file, parser=None, cache=True):
+    """Read and parse an HTML file into the document model
+    
+    With cache=True the extracted model is kept on disk by the file's content
+    hash (see document_cache), so loading an unchanged file again only reads
+    the cached model back and rebuilds its index.
+    """
+    base_dir = os.path.dirname(os.path.abspath(html_file))
+    if cache:
+        with stage('hash'):
+            key = document_cache.document_key(build_cache.hash_file(html_file), select_parser(parser),
+                                              rules_fingerprint())
+        with stage('read'):
+            document = document_cache.read_cached(key)
+        if document is not None:
+            count('documents.reused')
+            with stage('extract'):
+                document['index'] = index_nodes(document['blocks'])
+            document['base_dir'] = base_dir
+            return document
+    
+    with stage('read'):
+        with open(html_file, 'r', encoding='utf-8') as f:
+            html_content = f.read()
+    
+    document = parse_document(html_content, parser, base_dir)
+    if cache:
+        count('documents.parsed')
+        with stage('save.model'):
+            document_cache.write_cached(key, document)
+    return document
+
+def iter_nodes(nodes):
+    """Yield nodes and all their descendants in document order"""
+    stack = list(reversed(nodes))
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(node['children']))
+
+def index_keys(node):
+    """Yield the keys a node is indexed under: its tag, type, role and each class"""
+    yield ('tag', node['tag'])
+    yield ('type', node['type'])
+    if node.get('role') is not None:
+        yield ('role', node['role'])
+    for name in set(node['classes']):
+        yield ('class', name)
+
+def index_nodes(nodes):
+    """Index model nodes by tag, type, role and class, in document order
+    
+    Each node gets a pre-order position, so the descendants of a node are
+    the positions after its own up to the end of its subtree, and find_nodes
+    answers subtree queries by bisecting a key's position list. The index
+    refers to nodes by identity; rebuild it after copying or unpickling them.
+    """
+    spans = {}  # Node id -> (start, end, node); holding the node keeps ids unique
+    keys = {}  # Key -> ([positions], [nodes])
+    position = 0
+    stack = [(node, False) for node in reversed(nodes)]
+    while stack:
+        node, closing = stack.pop()
+        if closing:
+            spans[id(node)] = (spans[id(node)][0], position, node)
+            continue
+        spans[id(node)] = (position, None, node)
+        for key in index_keys(node):
+            positions, found = keys.setdefault(key, ([], []))
+            positions.append(position)
+            found.append(node)
+        position += 1
+        stack.append((node, True))
+        stack.extend((child, False) for child in reversed(node['children']))
+    return {'spans': spans, 'keys': keys}
+
+def node_matches(node, classes=None, node_type=None, role=None):
+    """Check a node against find_nodes filters"""
+    if node_type is not None and node['type'] != node_type:
+        return False
+    if role is not None and node.get('role') != role:
+        return False
+    if classes is not None and not classes.intersection(node['classes']):
+        return False
+    return True
+
+def find_nodes(node, classes=None, node_type=None, role=None, index=None):
+    """Find descendants of a node by class, node type and/or role, in document order
+    
+    With an index from index_nodes() that covers the node, the matches are
+    looked up by position range instead of walking the subtree.
+    """
+    span = index['spans'].get(id(node)) if index is not None else None
+    if span is None or span[2] is not node or (classes, node_type, role) == (None, None, None):
+        for descendant in iter_nodes(node['children']):
+            if node_matches(descendant, classes, node_type, role):
+                yield descendant
+        return
+    
+    if classes is not None:
+        keys = [('class', name) for name in classes]
+    elif node_type is not None:
+        keys = [('type', node_type)]
+    else:
+        keys = [('role', role)]
+    
+    start, end, _ = span
+    matches = {}
+    for key in keys:
+        positions, found = index['keys'].get(key, ((), ()))
+        low, high = bisect_right(positions, start), bisect_left(positions, end)
+        matches.update(zip(positions[low:high], found[low:high]))
+    for position in sorted(matches):
+        if node_matches(matches[position], classes, node_type, role):
+            yield matches[position]
+
+def node_key(nodes):
+    """Fingerprint a list of model nodes by their content"""
+    payload = json.dumps(nodes, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
@@ -0,0 +1,239 @@
+"""
+HTML Parser Backends
+Pluggable HTML parsers for the document model, with automatic selection of
+the fastest backend that is installed
+"""
+
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+from bs4.builder import builder_registry
+import re
+
+try:
+    import lxml.html
+    import lxml.etree
+except ImportError:  # Fall back to the pure-Python parser
+    lxml = None
+
+# Backends tried in order when none is requested
+PARSER_PREFERENCE = ['lxml', 'html.parser']
+
+# Raw-text elements, and inline SVG (which the model keeps whole as markup), whose
+# content strip_markup() never looks for tags in
+RAW_TEXT_TAGS = ('script', 'style', 'title', 'textarea', 'xmp', 'svg')
+
+# Where a comment or one of those elements starts, and where each one ends
+RAW_START = re.compile(r'<(?:!--|(' + '|'.join(RAW_TEXT_TAGS) + r')\b[^>]*>)', re.IGNORECASE)
+RAW_END = {name: re.compile(rf'</{name}\s*>', re.IGNORECASE) for name in RAW_TEXT_TAGS}
+RAW_END['--'] = re.compile('-->')
+
+def strip_markup(html_content, tags):
+    """Cut comments and the raw-text elements named in tags out of HTML markup, before parsing
+    
+    Raw-text elements and SVG not in tags are kept verbatim and never searched,
+    so a '<script>' or '<!--' inside a <style> block or a <title> stays put.
+    An unterminated comment or element ends the search, leaving the rest for
+    the parser to recover.
+    """
+    kept = []
+    start = position = 0
+    while True:
+        match = RAW_START.search(html_content, position)
+        if match is None:
+            break
+        name = (match.group(1) or '--').lower()
+        end = RAW_END[name].search(html_content, match.end())
+        if end is None:
+            break
+        if name == '--' or name in tags:
+            kept.append(html_content[start:match.start()])
+            start = end.end()
+        position = end.end()
+    
+    if not kept:
+        return html_content
+    kept.append(html_content[start:])
+    return ''.join(kept)
+
+# BeautifulSoup trees (html.parser and lxml builders)
+
+# String types that get_text() reads; comments and <script>/<style> strings are skipped
+BS4_TEXT_TYPES = (NavigableString, CData)
+
+def bs4_name(element):
+    """Return the tag name of a BeautifulSoup element"""
+    return element.name
+
+def bs4_classes(element):
+    """Return the class list of a BeautifulSoup element"""
+    return element.get('class', [])
+
+def bs4_children(element):
+    """Return the child tags of a BeautifulSoup element"""
+    return [child for child in element.contents if isinstance(child, Tag)]
+
+def bs4_attr(element, name):
+    """Return an attribute of a BeautifulSoup element, or None"""
+    return element.get(name)
+
+def bs4_text(element):
+    """Return the text content of a BeautifulSoup element"""
+    return element.get_text()
+
+def bs4_content(element):
+    """Return the direct text strings and child tags of a BeautifulSoup element, in order"""
+    return [child for child in element.contents
+            if isinstance(child, Tag) or type(child) in BS4_TEXT_TYPES]
+
+def bs4_source_text(element):
+    """Return the raw text of a BeautifulSoup <style>/<script> element"""
+    return ''.join(element.strings)
+
+def bs4_markup(element):
+    """Serialize a BeautifulSoup element and its subtree"""
+    return str(element)
+
+def bs4_contains(element, tags):
+    """Check whether a BeautifulSoup element has a descendant with one of the tags"""
+    return element.find(tags) is not None
+
+def bs4_title(root):
+    """Return the text of the <title> tag, or None if there is none"""
+    title_tag = root.find('title')
+    return title_tag.text if title_tag else None
+
+BS4_TREE = {
+    'name': bs4_name,
+    'classes': bs4_classes,
+    'children': bs4_children,
+    'attr': bs4_attr,
+    'text': bs4_text,
+    'content': bs4_content,
+    'source_text': bs4_source_text,
+    'markup': bs4_markup,
+    'contains': bs4_contains,
+    'title': bs4_title,
+}
+
+def parse_html_parser(html_content):
+    """Parse with BeautifulSoup and the standard library html.parser"""
+    return BeautifulSoup(html_content, 'html.parser')
+
+def parse_bs4_lxml(html_content):
+    """Parse with BeautifulSoup on top of the lxml builder"""
+    return BeautifulSoup(html_content, 'lxml')
+
+# Bare lxml.html element trees (no BeautifulSoup wrapper)
+
+if lxml is not None:
+    # Text nodes outside <script>/<style>, matching BeautifulSoup's get_text()
+    LXML_TEXT = lxml.etree.XPath(
+        'descendant-or-self::text()[not(ancestor::script) and not(ancestor::style)]')
+
+def lxml_name(element):
+    """Return the tag name of an lxml element"""
+    return element.tag
+
+def lxml_classes(element):
+    """Return the class list of an lxml element"""
+    return element.get('class', '').split()
+
+def lxml_children(element):
+    """Return the child elements of an lxml element, skipping comments"""
+    return [child for child in element if isinstance(child.tag, str)]
+
+def lxml_attr(element, name):
+    """Return an attribute of an lxml element, or None"""
+    return element.get(name)
+
+def lxml_text(element):
+    """Return the text content of an lxml element"""
+    return ''.join(LXML_TEXT(element))
+
+def lxml_content(element):
+    """Return the direct text strings and child elements of an lxml element, in order"""
+    if element.tag in ('script', 'style'):
+        return []
+    content = [element.text] if element.text else []
+    for child in element:
+        if isinstance(child.tag, str):
+            content.append(child)
+        if child.tail:
+            content.append(child.tail)
+    return content
+
+def lxml_source_text(element):
+    """Return the raw text of an lxml <style>/<script> element"""
+    return element.text or ''
+
+def lxml_markup(element):
+    """Serialize an lxml element and its subtree as XML"""
+    return lxml.etree.tostring(element, encoding='unicode', method='xml', with_tail=False)
+
+def lxml_contains(element, tags):
+    """Check whether an lxml element has a descendant with one of the tags"""
+    for _ in element.iterdescendants(*tags):
+        return True
+    return False
+
+def lxml_title(root):
+    """Return the text of the <title> element, or None if there is none"""
+    title_tag = root.find('.//title')
+    return lxml_text(title_tag) if title_tag is not None else None
+
+LXML_TREE = {
+    'name': lxml_name,
+    'classes': lxml_classes,
+    'children': lxml_children,
+    'attr': lxml_attr,
+    'text': lxml_text,
+    'content': lxml_content,
+    'source_text': lxml_source_text,
+    'markup': lxml_markup,
+    'contains': lxml_contains,
+    'title': lxml_title,
+}
+
+def parse_lxml_tree(html_content):
+    """Parse straight into an lxml.html element tree"""
+    return lxml.html.document_fromstring(html_content)
+
+def iterparse_html(html_file):
+    """Parse an HTML file incrementally with lxml, yielding (event, element) pairs"""
+    if lxml is None:
+        raise ValueError("Streaming HTML needs lxml; install lxml")
+    return lxml.etree.iterparse(html_file, events=('start', 'end'), html=True, recover=True,
+                                huge_tree=True, encoding='utf-8', remove_comments=True, remove_pis=True)
+
+# Backend registry
+
+PARSER_BACKENDS = {
+    'lxml': {
+        'parse': parse_bs4_lxml,
+        'tree': BS4_TREE,
+        'available': builder_registry.lookup('lxml') is not None,
+    },
+    'lxml-tree': {
+        'parse': parse_lxml_tree,
+        'tree': LXML_TREE,
+        'available': lxml is not None,
+    },
+    'html.parser': {
+        'parse': parse_html_parser,
+        'tree': BS4_TREE,
+        'available': True,
+    },
+}
+
+def available_parsers():
+    """List the names of the parser backends that can run here"""
+    return [name for name, backend in PARSER_BACKENDS.items() if backend['available']]
+
+def select_parser(name=None):
+    """Resolve a parser backend name, picking the fastest available one by default"""
+    if name is None:
+        return next(name for name in PARSER_PREFERENCE if PARSER_BACKENDS[name]['available'])
+    if name not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown HTML parser '{name}' (choose from {', '.join(PARSER_BACKENDS)})")
+    if not PARSER_BACKENDS[name]['available']:
+        raise ValueError(f"HTML parser '{name}' is not available; install lxml")
+    return name
@@ -4,326 +4,627 @@ Converts HTML documents to PowerPoint presentations
 """
 
 from pptx import Presentation
-from pptx.util import Inches, Pt
+from pptx.util import Emu, Inches
 from pptx.enum.text import PP_ALIGN
-from pptx.dml.color import RGBColor
-from bs4 import BeautifulSoup
+from pptx.opc.constants import CONTENT_TYPE as CT, RELATIONSHIP_TYPE as RT
+from pptx.opc.packuri import PackURI
+from pptx.oxml import parse_xml
+from pptx.parts.slide import SlidePart
+from xml.sax.saxutils import escape
+from functools import partial
+from lxml import etree
+from html_document_model import load_document, index_nodes, iter_nodes, find_nodes, node_key
+from conversion_metrics import count, metrics_enabled, stage
+from media_cache import load_image
+from native_charts import CHART_TYPES, chart_data, style_chart
+from package_optimizer import optimize_pptx, save_package
+from parallel_render import render_parallel, resolve_jobs
+from text_layout import frame_area, pack_paragraphs, text_width
+import io
+import os
 import re
 
-def clean_text(text):
-    """Clean and normalize text"""
-    if not text:
-        return ""
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text)
-    return text.strip()
+# Data rows per table slide; longer tables continue on further slides
+TABLE_ROWS_PER_SLIDE = 10
+
+# Table area below the title text box, in inches, and python-pptx's default table style
+TABLE_LEFT, TABLE_TOP, TABLE_WIDTH, TABLE_HEIGHT = 0.5, 1.5, 9, 4.5
+TABLE_STYLE_ID = '{5C22544A-7EE6-4342-B048-85BDC9FD1C3A}'
+TABLE_TITLE_PROPS = '<a:pPr><a:defRPr sz="2800" b="1"/></a:pPr>'
+
+# Empty text, and the comment marking where text and shapes go in a compiled layout
+EMPTY_PARAGRAPH_XML = '<a:p/>'
+EMPTY_TEXT_XML = '<a:lstStyle/><a:p/>'
+SLOT_MARK = 'slot'
+
+# Smallest slide ID PowerPoint allows
+MIN_SLIDE_ID = 256
+
+# Bullet text: the body placeholder of the content layout, and the two text columns
+CONTENT_FONT_SIZE = 18
+CONTENT_INDENT = Emu(342900)  # The template's hanging indent for first-level bullets
+CONTENT_SPACE_BEFORE = 0.2  # The template's space before each bullet, in lines
+COLUMN_FONT_SIZE = 14
+COLUMN_LEFTS, COLUMN_TOP, COLUMN_WIDTH, COLUMN_HEIGHT = (0.5, 5.5), 1.5, 4.5, 5.0
+
+# Content items whose slides refer to parts of the deck, so their sections are never cached
+PART_ITEM_TYPES = {'image', 'chart'}
+
+# Area below the slide title that images and charts are fitted into, in inches
+IMAGE_LEFT, IMAGE_TOP, IMAGE_WIDTH, IMAGE_HEIGHT = 0.5, 1.5, 9.0, 5.5
+
+# Characters that are not allowed in DrawingML text
+INVALID_XML_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+# Table cell formatting: white bold 12pt on dark blue headers, 10pt data
+HEADER_CELL_XML = (
+    '<a:tc><a:txBody><a:bodyPr/><a:lstStyle/><a:p><a:pPr>'
+    '<a:defRPr b="1" sz="1200"><a:solidFill><a:srgbClr val="FFFFFF"/></a:solidFill></a:defRPr>'
+    '</a:pPr>{run}</a:p></a:txBody>'
+    '<a:tcPr><a:solidFill><a:srgbClr val="34495E"/></a:solidFill></a:tcPr></a:tc>'
+)
+DATA_CELL_XML = (
+    '<a:tc><a:txBody><a:bodyPr/><a:lstStyle/><a:p><a:pPr><a:defRPr sz="1000"/></a:pPr>{run}</a:p>'
+    '</a:txBody><a:tcPr/></a:tc>'
+)
 
 def hex_to_rgb(hex_color):
     """Convert hex color to RGB"""
     hex_color = hex_color.lstrip('#')
     return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
 
-def add_title_slide(prs, title, subtitle=""):
+def run_xml(text):
+    """Build a DrawingML run of plain text, or nothing for empty text"""
+    if not text:
+        return ''
+    return f'<a:r><a:t>{escape(INVALID_XML_CHARS.sub("", text))}</a:t></a:r>'
+
+def paragraph_xml(text, props=''):
+    """Build a DrawingML paragraph of plain text, with optional <a:pPr> XML"""
+    content = props + run_xml(text)
+    return f'<a:p>{content}</a:p>' if content else EMPTY_PARAGRAPH_XML
+
+def text_body_xml(paragraphs, size=None):
+    """Build the list style and paragraphs of a text body, one paragraph per string
+    
+    size gives every paragraph a default font size through the list style.
+    """
+    lst_style = (f'<a:lstStyle><a:lvl1pPr><a:defRPr sz="{size * 100}"/></a:lvl1pPr></a:lstStyle>' if size
+                 else '<a:lstStyle/>')
+    return lst_style + (''.join(paragraph_xml(text) for text in paragraphs) or EMPTY_PARAGRAPH_XML)
+
+def textbox_xml(shape_id, left, top, width, height, text_xml, word_wrap=False):
+    """Build a text box shape, as python-pptx's add_textbox() would, around a text body"""
+    return (
+        f'<p:sp><p:nvSpPr><p:cNvPr id="{shape_id}" name="TextBox {shape_id - 1}"/><p:cNvSpPr txBox="1"/>'
+        f'<p:nvPr/></p:nvSpPr><p:spPr><a:xfrm><a:off x="{left}" y="{top}"/><a:ext cx="{width}" cy="{height}"/>'
+        f'</a:xfrm><a:prstGeom prst="rect"><a:avLst/></a:prstGeom><a:noFill/></p:spPr>'
+        f'<p:txBody><a:bodyPr wrap="{"square" if word_wrap else "none"}"><a:spAutoFit/></a:bodyPr>'
+        f'{text_xml}</p:txBody></p:sp>'
+    )
+
+def compile_layout(prs, layout):
+    """Compile a slide layout into the XML skeleton its slides are stamped out from
+    
+    python-pptx clones the layout's placeholders onto a scratch slide, which
+    is never added to the deck, and its XML is split where each
+    placeholder's text and the slide's own shapes go. Returns the 'pieces'
+    of XML between those slots, the placeholder 'slots' (by idx) in order
+    and the 'next_id' of the first added shape.
+    """
+    slide = SlidePart.new(PackURI('/ppt/slides/skeleton.xml'), prs.part.package, layout.part).slide
+    slide.shapes.clone_layout_placeholders(layout)
+    
+    slots = []
+    for placeholder in slide.placeholders:
+        tx_body = placeholder._element.txBody
+        if tx_body is None:
+            continue
+        for child in tx_body[1:]:
+            tx_body.remove(child)
+        tx_body.append(etree.Comment(SLOT_MARK))
+        slots.append(placeholder.placeholder_format.idx)
+    sp_tree = slide.shapes._spTree
+    next_id = sp_tree.max_shape_id + 1
+    sp_tree.append(etree.Comment(SLOT_MARK))
+    
+    pieces = etree.tostring(slide._element, encoding='unicode').split(f'<!--{SLOT_MARK}-->')
+    return {'pieces': pieces, 'slots': slots, 'next_id': next_id}
+
+def deck_writer(prs):
+    """Start adding slides to a presentation in bulk
+    
+    Slides are stamped out from layout skeletons as XML, and their parts are
+    queued until flush_slides() registers them all with the presentation.
+    A deck whose 'recorded' is a list only collects the slides' XML there
+    (see render_section_slides).
+    """
+    sld_id_lst = prs._element.get_or_add_sldIdLst()
+    return {
+        'prs': prs,
+        'layouts': list(prs.slide_layouts),
+        'skeletons': {},
+        'pending': [],
+        'slide_count': len(sld_id_lst),
+        'next_slide_id': max([MIN_SLIDE_ID - 1] + [int(sld_id.get('id')) for sld_id in sld_id_lst]) + 1,
+        'content_frame': content_frame(prs),
+        'recorded': None,
+    }
+
+def stamp_slide(deck, layout_index, xml):
+    """Create a slide part of a layout from its complete XML and queue it for registration
+    
+    A recording deck keeps the layout index and XML instead, and returns None.
+    """
+    if deck['recorded'] is not None:
+        deck['recorded'].append((layout_index, xml))
+        return None
+    
+    deck['slide_count'] += 1
+    prs = deck['prs']
+    slide_part = SlidePart(PackURI(f"/ppt/slides/slide{deck['slide_count']}.xml"), CT.PML_SLIDE,
+                           prs.part.package, parse_xml(xml))
+    slide_part.relate_to(deck['layouts'][layout_index].part, RT.SLIDE_LAYOUT)
+    deck['pending'].append((layout_index, slide_part))
+    return slide_part.slide
+
+def new_slide(deck, layout_index, texts=None, shapes=()):
+    """Add a slide of a layout, filling its placeholders and adding shapes
+    
+    texts maps placeholder idx (0 is the title) to the text body XML from
+    text_body_xml(); placeholders without an entry are left empty. shapes is
+    a sequence of functions that each build one shape's XML given its shape
+    ID, such as partials of textbox_xml() and table_xml().
+    """
+    skeleton = deck['skeletons'].get(layout_index)
+    if skeleton is None:
+        skeleton = deck['skeletons'][layout_index] = compile_layout(deck['prs'], deck['layouts'][layout_index])
+    
+    texts = texts or {}
+    pieces = skeleton['pieces']
+    xml = [pieces[0]]
+    for idx, piece in zip(skeleton['slots'], pieces[1:]):
+        xml.append(texts.get(idx, EMPTY_TEXT_XML))
+        xml.append(piece)
+    xml.extend(shape(shape_id) for shape_id, shape in enumerate(shapes, skeleton['next_id']))
+    xml.append(pieces[-1])
+    return stamp_slide(deck, layout_index, ''.join(xml))
+
+def flush_slides(deck):
+    """Register the queued slide parts with the presentation in one batch
+    
+    python-pptx's add_slide() looks for an existing relationship and the
+    largest slide ID on every call, which makes building a deck quadratic;
+    here the slide IDs are counted on from the deck writer's and each
+    relationship is added without a search.
+    """
+    pending, deck['pending'] = deck['pending'], []
+    prs = deck['prs']
+    sld_id_lst = prs._element.get_or_add_sldIdLst()
+    rels = prs.part.rels
+    for slide_id, (_, slide_part) in enumerate(pending, deck['next_slide_id']):
+        sld_id_lst._add_sldId(id=slide_id, rId=rels._add_relationship(RT.SLIDE, slide_part))
+    deck['next_slide_id'] += len(pending)
+
+def add_title_slide(deck, title, subtitle=""):
     """Add a title slide"""
-    slide = prs.slides.add_slide(prs.slide_layouts[0])  # Title slide layout
-    
-    title_shape = slide.shapes.title
-    title_shape.text = title
-    
-    if subtitle and len(slide.placeholders) > 1:
-        subtitle_shape = slide.placeholders[1]
-        subtitle_shape.text = subtitle
-    
-    return slide
+    texts = {0: text_body_xml([title])}  # Title slide layout
+    if subtitle:
+        texts[1] = text_body_xml([subtitle])
+    return new_slide(deck, 0, texts)
 
-def add_content_slide(prs, title, content_items, layout_type='bullet'):
+def add_content_slide(deck, title, content_items, layout_type='bullet'):
     """Add a content slide with title and bullet points or content"""
-    slide = prs.slides.add_slide(prs.slide_layouts[1])  # Title and content layout
-    
-    title_shape = slide.shapes.title
-    title_shape.text = title
-    
-    # Add content
-    if len(slide.placeholders) > 1:
-        content_shape = slide.placeholders[1]
-        text_frame = content_shape.text_frame
-        text_frame.clear()
-        
-        for i, item in enumerate(content_items):
-            if i == 0:
-                p = text_frame.paragraphs[0]
-            else:
-                p = text_frame.add_paragraph()
-            
-            p.text = item
-            p.level = 0
-            p.font.size = Pt(18)
-    
-    return slide
+    return new_slide(deck, 1, {  # Title and content layout
+        0: text_body_xml([title]),
+        1: text_body_xml(content_items, CONTENT_FONT_SIZE),
+    })
 
-def add_two_column_slide(prs, title, left_items, right_items):
+def add_two_column_slide(deck, title, left_items, right_items):
     """Add a slide with two columns"""
-    slide = prs.slides.add_slide(prs.slide_layouts[1])
-    
-    title_shape = slide.shapes.title
-    title_shape.text = title
-    
-    # Left column
-    left_box = slide.shapes.add_textbox(Inches(0.5), Inches(1.5), Inches(4.5), Inches(5))
-    text_frame = left_box.text_frame
-    for i, item in enumerate(left_items):
-        if i == 0:
-            p = text_frame.paragraphs[0]
-        else:
-            p = text_frame.add_paragraph()
-        p.text = f"• {item}"
-        p.font.size = Pt(14)
-    
-    # Right column
-    right_box = slide.shapes.add_textbox(Inches(5.5), Inches(1.5), Inches(4.5), Inches(5))
-    text_frame = right_box.text_frame
-    for i, item in enumerate(right_items):
-        if i == 0:
-            p = text_frame.paragraphs[0]
-        else:
-            p = text_frame.add_paragraph()
-        p.text = f"• {item}"
-        p.font.size = Pt(14)
-    
-    return slide
+    columns = [
+        partial(textbox_xml, left=Inches(left), top=Inches(COLUMN_TOP), width=Inches(COLUMN_WIDTH),
+                height=Inches(COLUMN_HEIGHT), word_wrap=True,
+                text_xml=text_body_xml([f"• {item}" for item in items], COLUMN_FONT_SIZE))
+        for left, items in zip(COLUMN_LEFTS, (left_items, right_items))
+    ]
+    return new_slide(deck, 1, {0: text_body_xml([title])}, columns)
 
-def add_table_slide(prs, title, headers, rows):
-    """Add a slide with a table"""
-    slide = prs.slides.add_slide(prs.slide_layouts[5])  # Blank layout
-    
-    # Add title
-    title_box = slide.shapes.add_textbox(Inches(0.5), Inches(0.3), Inches(9), Inches(0.8))
-    title_frame = title_box.text_frame
-    title_frame.text = title
-    title_frame.paragraphs[0].font.size = Pt(28)
-    title_frame.paragraphs[0].font.bold = True
+def content_frame(prs):
+    """Return the text area of the content layout's body placeholder for pack_paragraphs"""
+    width, height = frame_area(prs.slide_layouts[1].placeholders[1], CONTENT_INDENT)
+    return {'width': width, 'height': height, 'size': CONTENT_FONT_SIZE, 'space_before': CONTENT_SPACE_BEFORE}
+
+def column_frame():
+    """Return the text area of one column of a two-column slide for pack_paragraphs"""
+    margins = 0.2, 0.1  # Default text box insets, left + right and top + bottom
+    bullet = text_width("• ", COLUMN_FONT_SIZE)
+    return {'width': COLUMN_WIDTH - margins[0] - bullet, 'height': COLUMN_HEIGHT - margins[1],
+            'size': COLUMN_FONT_SIZE, 'space_before': 0}
+
+def add_content_slides(deck, title, content_items):
+    """Add as many content slides as the bullets need to fit, continuing on further slides"""
+    slides = []
+    for i, page in enumerate(pack_paragraphs(content_items, deck['content_frame'])):
+        slide_title = title if i == 0 else f"{title} (cont.)"
+        slides.append(add_content_slide(deck, slide_title, page))
+    return slides
+
+def add_two_column_slides(deck, title, items):
+    """Add as many two-column slides as the bullets need, filling the left column first"""
+    pages = pack_paragraphs(items, column_frame())
+    slides = []
+    for i in range(0, len(pages), 2):
+        slide_title = title if i == 0 else f"{title} (cont.)"
+        right_items = pages[i + 1] if i + 1 < len(pages) else []
+        slides.append(add_two_column_slide(deck, slide_title, pages[i], right_items))
+    return slides
+
+def table_xml(shape_id, headers, rows):
+    """Build a table graphic frame, as python-pptx's add_table() would, with every cell filled and styled
     
-    # Add table
-    rows_count = len(rows) + 1  # +1 for header
+    The table spans the area below the title; the rows share its height,
+    with the last one taking up any rounding.
+    """
     cols_count = len(headers)
+    rows_count = len(rows) + 1  # +1 for header
+    height = Inches(TABLE_HEIGHT)
+    row_height = height // rows_count
+    heights = [row_height] * (rows_count - 1) + [height - (rows_count - 1) * row_height]
+    col_width = Inches(TABLE_WIDTH / cols_count)
+    grid_xml = f'<a:gridCol w="{col_width}"/>' * cols_count
+    
+    rows_xml = [table_row_xml(headers, cols_count, heights[0], HEADER_CELL_XML)]
+    for row_data, row_height in zip(rows, heights[1:]):
+        rows_xml.append(table_row_xml(row_data, cols_count, row_height, DATA_CELL_XML))
+    return (
+        f'<p:graphicFrame><p:nvGraphicFramePr><p:cNvPr id="{shape_id}" name="Table {shape_id - 1}"/>'
+        f'<p:cNvGraphicFramePr><a:graphicFrameLocks noGrp="1"/></p:cNvGraphicFramePr><p:nvPr/>'
+        f'</p:nvGraphicFramePr><p:xfrm><a:off x="{Inches(TABLE_LEFT)}" y="{Inches(TABLE_TOP)}"/>'
+        f'<a:ext cx="{col_width * cols_count}" cy="{height}"/></p:xfrm><a:graphic>'
+        f'<a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/table"><a:tbl>'
+        f'<a:tblPr firstRow="1" bandRow="1"><a:tableStyleId>{TABLE_STYLE_ID}</a:tableStyleId></a:tblPr>'
+        f'<a:tblGrid>{grid_xml}</a:tblGrid>{"".join(rows_xml)}</a:tbl>'
+        f'</a:graphicData></a:graphic></p:graphicFrame>'
+    )
+
+def add_table_slide(deck, title, headers, rows):
+    """Add a slide with a table"""
+    return new_slide(deck, 5, shapes=[  # Title only layout, titled by a text box of its own
+        partial(textbox_xml, left=Inches(0.5), top=Inches(0.3), width=Inches(9), height=Inches(0.8),
+                text_xml='<a:lstStyle/>' + paragraph_xml(title, TABLE_TITLE_PROPS)),
+        partial(table_xml, headers=headers, rows=rows),
+    ])
+
+def add_image_slide(deck, title, image):
+    """Add a slide with one picture centered below the title
+    
+    The slide is registered first, so the picture's part is named among the deck's parts.
+    """
+    slide = new_slide(deck, 5, {0: text_body_xml([title])})  # Title only layout
+    flush_slides(deck)
+    
+    left = IMAGE_LEFT + (IMAGE_WIDTH - image['width']) / 2
+    top = IMAGE_TOP + (IMAGE_HEIGHT - image['height']) / 2
+    slide.shapes.add_picture(io.BytesIO(image['data']), Inches(left), Inches(top),
+                             Inches(image['width']), Inches(image['height']))
+    return slide
+
+def add_chart_slide(deck, title, chart):
+    """Add a slide with a native chart filling the area below the title
     
-    table = slide.shapes.add_table(rows_count, cols_count, Inches(0.5), Inches(1.5), Inches(9), Inches(4.5)).table
+    The slide is registered first, so the chart's parts are named among the deck's parts.
+    """
+    slide = new_slide(deck, 5, {0: text_body_xml([title])})  # Title only layout
+    flush_slides(deck)
     
-    # Set column widths
+    graphic_frame = slide.shapes.add_chart(CHART_TYPES[chart['kind']], Inches(IMAGE_LEFT), Inches(IMAGE_TOP),
+                                           Inches(IMAGE_WIDTH), Inches(IMAGE_HEIGHT), chart_data(chart))
+    style_chart(graphic_frame.chart, chart)
+    return slide
+
+def table_row_xml(cells, cols_count, row_height, cell_xml):
+    """Build the DrawingML for one table row, padded or cut to the column count"""
+    parts = []
     for col_idx in range(cols_count):
-        table.columns[col_idx].width = Inches(9 / cols_count)
-    
-    # Add headers
-    for col_idx, header in enumerate(headers):
-        cell = table.cell(0, col_idx)
-        cell.text = header
-        cell.fill.solid()
-        cell.fill.fore_color.rgb = RGBColor(52, 73, 94)
+        text = str(cells[col_idx]) if col_idx < len(cells) else ''
+        parts.append(cell_xml.format(run=run_xml(text)))
+    return f'<a:tr h="{row_height}">{"".join(parts)}</a:tr>'
+
+def add_table_slides(deck, title, headers, rows):
+    """Add as many table slides as the rows need, repeating the header on each"""
+    slides = []
+    for i in range(0, max(len(rows), 1), TABLE_ROWS_PER_SLIDE):
+        slide_title = title if i == 0 else f"{title} (cont.)"
+        slides.append(add_table_slide(deck, slide_title, headers, rows[i:i + TABLE_ROWS_PER_SLIDE]))
+    return slides
+
+def add_paper_points(content, node, index):
+    """Add a paper summary's title and the key points of its boxes to a section"""
+    if node['title'] is not None:
+        content.append({
+            'type': 'text',
+            'text': node['title']
+        })
+    
+    # Get key points from the boxes (every class with a 'box' rule)
+    for box in find_nodes(node, role='box', index=index):
+        if box.get('title') is not None:
+            content.append({
+                'type': 'subtitle',
+                'text': box['title']
+            })
         
-        paragraph = cell.text_frame.paragraphs[0]
-        paragraph.font.bold = True
-        paragraph.font.size = Pt(12)
-        paragraph.font.color.rgb = RGBColor(255, 255, 255)
-    
-    # Add data rows
-    for row_idx, row_data in enumerate(rows):
-        for col_idx, cell_data in enumerate(row_data):
-            cell = table.cell(row_idx + 1, col_idx)
-            cell.text = str(cell_data)
-            
-            paragraph = cell.text_frame.paragraphs[0]
-            paragraph.font.size = Pt(10)
-    
-    return slide
+        # Get bullet points
+        for li in find_nodes(box, node_type='item', index=index):
+            content.append({
+                'type': 'bullet',
+                'text': li['text']
+            })
 
-def parse_html_to_pptx(html_file, output_file):
-    """Convert HTML file to PowerPoint presentation"""
+def extract_sections(document):
+    """Group the document model into titled sections of slide content
+    
+    A single walk builds two candidate groupings side by side: a structured
+    one that pulls the key points out of paper summaries, and a plain one
+    that takes every paragraph, list, table, chart and image. The plain one
+    is used when the structured one finds fewer than three sections.
+    """
+    structured = []
+    plain = []
+    
+    for node in iter_nodes(document['blocks']):
+        tag = node['tag']
+        
+        # Every h1/h2 header starts a section in both groupings
+        if tag in ('h1', 'h2'):
+            structured.append({
+                'title': node['text'],
+                'content': [],
+                'level': tag
+            })
+            plain.append({
+                'title': node['text'],
+                'content': []
+            })
+            continue
+        
+        if not structured:
+            continue
+        structured_content = structured[-1]['content']
+        plain_content = plain[-1]['content']
+        
+        if tag == 'h3':
+            # Add as sub-item
+            structured_content.append({
+                'type': 'subtitle',
+                'text': node['text']
+            })
+            plain_content.append(node['text'])
+        
+        elif tag == 'p':
+            text = node['text']
+            if text and len(text) > 10:  # Skip very short texts
+                plain_content.append(text)
+        
+        elif node['type'] == 'list':
+            for li in node['children']:
+                if li['type'] == 'item' and li['text']:
+                    plain_content.append(f"• {li['text']}")
+        
+        elif node['type'] == 'image':
+            structured_content.append({
+                'type': 'image',
+                'image': node
+            })
+            plain_content.append({
+                'type': 'image',
+                'image': node
+            })
+        
+        elif tag == 'table':
+            if node['headers'] and node['rows']:
+                plain_content.append({
+                    'type': 'table',
+                    'headers': node['headers'],
+                    'rows': node['rows']
+                })
+        
+        elif node['type'] == 'chart':
+            plain_content.append({
+                'type': 'chart',
+                'chart': node
+            })
+        
+        elif tag == 'div' and node['role'] == 'paper':
+            # This is a paper summary
+            add_paper_points(structured_content, node, document['index'])
     
-    print(f"Converting {html_file} to {output_file}...")
+    # Keep the sections that found content; fall back to the plain grouping
+    content_sections = [section for section in structured if section['content']]
+    if len(content_sections) < 3:
+        content_sections = [section for section in plain if section['content']]
     
-    # Read HTML file
-    with open(html_file, 'r', encoding='utf-8') as f:
-        html_content = f.read()
+    return content_sections
+
+def add_slides_for_section(deck, section, media=None):
+    """Add the slides for one content section
+    
+    Charts and images get a slide each; images are only added when media
+    (the document's base_dir and css) is given.
+    """
+    title = section['title']
+    
+    content_items = []
+    tables = []
+    charts = []
+    images = []
+    
+    for item in section['content']:
+        if isinstance(item, dict):
+            if item['type'] == 'table':
+                tables.append(item)
+            elif item['type'] == 'chart':
+                charts.append(item['chart'])
+            elif item['type'] == 'image':
+                images.append(item['image'])
+            else:
+                content_items.append(item.get('text', ''))
+        else:
+            content_items.append(item)
+    
+    # Add slides
+    if tables:
+        # Create table slides, continuing long tables over as many slides as needed
+        for table_data in tables:
+            add_table_slides(deck, title, table_data['headers'], table_data['rows'])
+    elif len(content_items) > 0:
+        # Create content slides, as many as the bullets need to fit
+        add_content_slides(deck, title, content_items)
+    
+    for chart in charts:
+        add_chart_slide(deck, title, chart)
+    
+    for node in images if media is not None else []:
+        image = load_image(node, media['base_dir'], IMAGE_WIDTH, IMAGE_HEIGHT, media['css'])
+        if image is not None:
+            add_image_slide(deck, title, image)
+
+def add_section_slides(deck, section, section_cache=None, media=None):
+    """Add the slides for one content section, reusing its cached slides when it is unchanged
+    
+    section_cache maps a fingerprint of the section to its slides, kept as
+    (layout index, slide XML) pairs. Reused entries move to the end, so the
+    oldest entries are the least recently used. Sections with images or
+    charts are always rendered, since their shapes refer to parts of this deck.
+    """
+    if section_cache is None or has_part_items(section):
+        add_slides_for_section(deck, section, media)
+        return
+    
+    key = node_key([section])
+    cached = section_cache.pop(key, None)
+    if cached is not None:
+        for layout_index, xml in cached:
+            stamp_slide(deck, layout_index, xml)
+        count('sections.reused')
+    else:
+        start = len(deck['pending'])
+        add_slides_for_section(deck, section, media)
+        cached = [(layout_index, etree.tostring(slide_part._element, encoding='unicode'))
+                  for layout_index, slide_part in deck['pending'][start:]]
+        count('sections.rendered')
+    section_cache[key] = cached
+
+def has_part_items(section):
+    """Check whether a content section has images or charts, which add parts to the deck"""
+    return any(isinstance(item, dict) and item['type'] in PART_ITEM_TYPES for item in section['content'])
+
+def render_section_slides(deck, section):
+    """Render one content section, which must need no parts, to its slides' (layout index, XML) pairs"""
+    recorder = dict(deck, recorded=[])
+    add_slides_for_section(recorder, section)
+    return recorder['recorded']
+
+def render_sections(deck, sections, jobs):
+    """Render the content sections that need no parts in worker processes
+    
+    Returns the (layout index, slide XML) pairs of each section, with None
+    for sections with images or charts, which the deck adds itself since
+    their parts are numbered as they are added. Returns None when
+    render_parallel() declines.
+    """
+    plain = [section for section in sections if not has_part_items(section)]
+    rendered = render_parallel(partial(render_section_slides, deck), plain, jobs)
+    if rendered is None:
+        return None
+    count('sections.parallel', len(plain))
+    slides = dict(zip(map(id, plain), rendered))
+    return [slides.get(id(section)) for section in sections]
+
+def build_pptx(document, section_cache=None, jobs=1):
+    """Build a PowerPoint presentation from a parsed document model
+    
+    Slides are stamped out from compiled layouts and registered in one batch
+    (see deck_writer). Pass a section_cache dict (kept between builds) to
+    reuse the slides of sections that have not changed since an earlier build.
+    Otherwise, with jobs > 1 the slides of a large document's sections are
+    rendered in that many worker processes.
+    """
     
-    # Parse HTML
-    soup = BeautifulSoup(html_content, 'html.parser')
+    # Sections are grouped over the whole document, so read streamed blocks first
+    if not isinstance(document['blocks'], list):
+        blocks = list(document['blocks'])
+        document = dict(document, blocks=blocks, index=index_nodes(blocks))
     
     # Create presentation
     prs = Presentation()
     prs.slide_width = Inches(10)
     prs.slide_height = Inches(7.5)
+    deck = deck_writer(prs)
     
     # Get title
-    title_tag = soup.find('title')
-    main_title = title_tag.text if title_tag else "Presentation"
+    main_title = document['title'] if document['title'] is not None else "Presentation"
     
     # Get subtitle from meta info or first p in header
     subtitle = ""
-    meta_info = soup.find(class_=['meta-info', 'author-info', 'document-header'])
-    if meta_info:
-        subtitle = clean_text(meta_info.get_text())[:200]
+    if document['meta'] is not None:
+        subtitle = document['meta'][:200]
     
     # Add title slide
-    add_title_slide(prs, main_title, subtitle)
+    add_title_slide(deck, main_title, subtitle)
     
     # Process content
-    content_sections = []
-    current_section = None
+    content_sections = extract_sections(document)
+    
+    # Create slides from sections, stamping out those rendered in workers
+    rendered = None
+    if jobs > 1 and section_cache is None:
+        rendered = render_sections(deck, content_sections, jobs)
+    media = {'base_dir': document['base_dir'], 'css': document['css']}
+    for section, slides in zip(content_sections, rendered or [None] * len(content_sections)):
+        if slides is None:
+            add_section_slides(deck, section, section_cache, media)
+            continue
+        for layout_index, xml in slides:
+            stamp_slide(deck, layout_index, xml)
     
-    # Find all h1, h2, h3 headers and their content
-    for element in soup.find_all(['h1', 'h2', 'h3', 'div']):
-        
-        if element.name in ['h1', 'h2']:
-            # Save previous section
-            if current_section and current_section['content']:
-                content_sections.append(current_section)
-            
-            # Start new section
-            current_section = {
-                'title': clean_text(element.get_text()),
-                'content': [],
-                'level': element.name
-            }
-        
-        elif element.name == 'h3' and current_section:
-            # Add as sub-item
-            current_section['content'].append({
-                'type': 'subtitle',
-                'text': clean_text(element.get_text())
-            })
-        
-        elif element.name == 'div' and current_section:
-            # Check for special divs (paper-entry, section-box, etc.)
-            if 'paper-summary' in element.get('class', []) or 'paper-entry' in element.get('class', []):
-                # This is a paper summary
-                paper_title = element.find(class_=['paper-title'])
-                if paper_title:
-                    current_section['content'].append({
-                        'type': 'text',
-                        'text': clean_text(paper_title.get_text())
-                    })
-                
-                # Get key points from various boxes
-                for box in element.find_all(class_=['section-box', 'key-findings', 'results-box']):
-                    box_title = box.find(class_='section-title')
-                    if box_title:
-                        current_section['content'].append({
-                            'type': 'subtitle',
-                            'text': clean_text(box_title.get_text())
-                        })
-                    
-                    # Get bullet points
-                    for li in box.find_all('li'):
-                        current_section['content'].append({
-                            'type': 'bullet',
-                            'text': clean_text(li.get_text())
-                        })
-    
-    # Add last section
-    if current_section and current_section['content']:
-        content_sections.append(current_section)
-    
-    # If no sections found, try a simpler approach
-    if len(content_sections) < 3:
-        content_sections = []
-        current_section = None
-        
-        for element in soup.find_all(['h1', 'h2', 'h3', 'p', 'ul', 'ol', 'table']):
-            if element.name in ['h1', 'h2']:
-                # Save previous section
-                if current_section and current_section['content']:
-                    content_sections.append(current_section)
-                
-                # Start new section
-                current_section = {
-                    'title': clean_text(element.get_text()),
-                    'content': []
-                }
-            
-            elif current_section:
-                if element.name == 'h3':
-                    current_section['content'].append(clean_text(element.get_text()))
-                
-                elif element.name == 'p':
-                    text = clean_text(element.get_text())
-                    if text and len(text) > 10:  # Skip very short texts
-                        current_section['content'].append(text)
-                
-                elif element.name in ['ul', 'ol']:
-                    for li in element.find_all('li', recursive=False):
-                        text = clean_text(li.get_text())
-                        if text:
-                            current_section['content'].append(f"• {text}")
-                
-                elif element.name == 'table':
-                    # Extract table data
-                    headers = [clean_text(th.get_text()) for th in element.find_all('th')]
-                    rows = []
-                    for tr in element.find_all('tr')[1:]:  # Skip header row
-                        row = [clean_text(td.get_text()) for td in tr.find_all('td')]
-                        if row:
-                            rows.append(row)
-                    
-                    if headers and rows:
-                        current_section['content'].append({
-                            'type': 'table',
-                            'headers': headers,
-                            'rows': rows
-                        })
-        
-        # Add last section
-        if current_section and current_section['content']:
-            content_sections.append(current_section)
+    # Add final slide
+    add_title_slide(deck, "Thank You", "Questions & Discussion")
     
-    # Create slides from sections
-    for section in content_sections[:30]:  # Limit to 30 slides
-        title = section['title']
-        
-        # Split content into chunks if too long
-        content_items = []
-        table_data = None
-        
-        for item in section['content']:
-            if isinstance(item, dict):
-                if item['type'] == 'table':
-                    table_data = item
-                else:
-                    text = item.get('text', '')
-                    if len(text) <= 150:
-                        content_items.append(text)
-                    else:
-                        # Split long text
-                        words = text.split()
-                        chunk = []
-                        for word in words:
-                            chunk.append(word)
-                            if len(' '.join(chunk)) > 120:
-                                content_items.append(' '.join(chunk))
-                                chunk = []
-                        if chunk:
-                            content_items.append(' '.join(chunk))
-            else:
-                if len(item) <= 150:
-                    content_items.append(item)
-                else:
-                    # Truncate long items
-                    content_items.append(item[:147] + "...")
-        
-        # Add slides
-        if table_data:
-            # Create table slide
-            add_table_slide(prs, title, table_data['headers'], table_data['rows'][:10])
-        elif len(content_items) > 0:
-            # Create content slides (max 7 items per slide)
-            for i in range(0, len(content_items), 7):
-                slide_title = title if i == 0 else f"{title} (cont.)"
-                add_content_slide(prs, slide_title, content_items[i:i+7])
+    flush_slides(deck)
+    return prs
+
+def render_pptx(document, output_file, section_cache=None, compression=None, jobs=1):
+    """Render a parsed document model to a PowerPoint presentation file
+    
+    compression sets the zip level and strategy (see package_optimizer), and
+    jobs the number of processes the slides are rendered in (see build_pptx).
+    """
+    with stage('render.pptx'):
+        prs = build_pptx(document, section_cache, jobs)
+    with stage('optimize.pptx'):
+        optimize_pptx(prs)
+    with stage('save.pptx'):
+        save_package(prs, output_file, compression)
+    
+    if metrics_enabled():
+        count('pptx.slides', len(prs.slides))
+        for slide in prs.slides:
+            count('pptx.paragraphs', len(slide.shapes._spTree.xpath('.//a:p')))
+            count('pptx.tables', len(slide.shapes._spTree.xpath('.//a:tbl')))
+        count('pptx.bytes', os.path.getsize(output_file))
+    return prs
+
+def parse_html_to_pptx(html_file, output_file, jobs=None):
+    """Convert HTML file to PowerPoint presentation, rendering large documents on every core (or jobs processes)"""
     
-    # Add final slide
-    add_title_slide(prs, "Thank You", "Questions & Discussion")
+    print(f"Converting {html_file} to {output_file}...")
+    
+    # Read and parse HTML
+    document = load_document(html_file)
     
-    # Save presentation
-    prs.save(output_file)
+    prs = render_pptx(document, output_file, jobs=resolve_jobs(jobs))
     print(f"✓ Successfully created {output_file}")
     print(f"  Total slides: {len(prs.slides)}")
 
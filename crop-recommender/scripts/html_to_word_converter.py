@@ -4,22 +4,81 @@ Converts HTML documents to Word (.docx) format
 """
 
 from docx import Document
-from docx.shared import Inches, Pt, RGBColor
+from docx.shared import Emu, Inches, Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.style import WD_STYLE_TYPE
-from bs4 import BeautifulSoup
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+from docx.oxml.shape import CT_Inline
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.opc.oxml import serialize_part_xml
+from docx.opc.part import Part
+from xml.sax.saxutils import escape
+from html_document_model import load_document, find_nodes, is_front_matter, iter_nodes, node_key
+from conversion_metrics import count, metrics_enabled, stage
+from media_cache import load_image
+from native_charts import chart_space, workbook_blob
+from package_optimizer import (optimize_docx, open_package, referenced_style_ids, resolve_compression,
+                               write_package)
+from parallel_render import render_parallel, resolve_jobs
+from functools import partial
+from lxml import etree
+import io
+import itertools
+import os
 import re
 
-def clean_text(text):
-    """Clean and normalize text"""
-    if not text:
-        return ""
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text)
-    return text.strip()
+# Tags the main content walk dispatches on
+CONTENT_TAGS = {'h1', 'h2', 'h3', 'p', 'ul', 'ol', 'table', 'div', 'img', 'svg', 'chart'}
+
+# Node types whose XML refers to parts of the document, so their sections are never cached
+PART_NODE_TYPES = {'image', 'chart'}
+
+# Height of a chart, which spans the text width, in inches
+CHART_HEIGHT = 3.5
+CHART_CT = 'application/vnd.openxmlformats-officedocument.drawingml.chart+xml'
+XLSX_CT = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Characters that are not allowed in WordprocessingML text
+INVALID_XML_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+# Main document part, which render_docx writes straight into the zip as the body is rendered
+DOCUMENT_PART = 'word/document.xml'
+
+# Body XML that needs no content of its own
+EMPTY_PARAGRAPH_XML = '<w:p/>'
+PAGE_BREAK_XML = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+
+# Table style and the tblLook python-docx gives new tables
+TABLE_STYLE = 'Light Grid Accent 1'
+TABLE_LOOK_XML = ('<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0"'
+                  ' w:noHBand="0" w:noVBand="1" w:val="04A0"/>')
+
+# Paragraph styles added to every document, so no run needs its own formatting
+CUSTOM_STYLES = {
+    'Table Header': {'font_size': 11, 'bold': True, 'alignment': WD_ALIGN_PARAGRAPH.LEFT},
+    'Table Text': {'font_size': 10, 'alignment': WD_ALIGN_PARAGRAPH.LEFT},
+    'Document Meta': {'font_size': 11, 'italic': True, 'alignment': WD_ALIGN_PARAGRAPH.CENTER},
+    'Paper Meta': {'font_size': 10, 'italic': True, 'alignment': WD_ALIGN_PARAGRAPH.LEFT},
+    'Bold Text': {'bold': True},
+    'Italic Text': {'italic': True},
+    'Bold Italic Text': {'bold': True, 'italic': True},
+    'Figure': {'alignment': WD_ALIGN_PARAGRAPH.CENTER},
+}
+
+# Built-in styles the converter uses, looked up once per document
+BUILTIN_STYLES = ['Title', 'Heading 1', 'Heading 2', 'Heading 3', 'List Bullet', 'List Number']
+
+# Body paragraph style for each (bold, italic) combination
+BODY_STYLES = {
+    (False, False): 'Normal',
+    (True, False): 'Bold Text',
+    (False, True): 'Italic Text',
+    (True, True): 'Bold Italic Text',
+}
 
 def set_document_styles(doc):
-    """Set up custom styles for the document"""
+    """Set up custom styles for the document and return their style IDs by name"""
     styles = doc.styles
     
     # Heading 1 style
@@ -48,254 +107,585 @@ def set_document_styles(doc):
         h3_style.font.color.rgb = RGBColor(52, 73, 94)
     except:
         pass
+    
+    # Body text is justified by default, so plain paragraphs need no properties;
+    # the other styles built on Normal keep their own alignment
+    styles['Normal'].paragraph_format.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
+    for name in BUILTIN_STYLES:
+        centered = name == 'Title'
+        styles[name].paragraph_format.alignment = WD_ALIGN_PARAGRAPH.CENTER if centered else WD_ALIGN_PARAGRAPH.LEFT
+    
+    for name, formatting in CUSTOM_STYLES.items():
+        add_paragraph_style(doc, name, **formatting)
+    
+    # Resolve every style name once; paragraphs are then tagged by ID directly
+    registry = {name: styles[name].style_id for name in BUILTIN_STYLES + list(CUSTOM_STYLES) + [TABLE_STYLE]}
+    registry['Normal'] = None  # The default style needs no tag
+    return registry
 
-def add_paragraph_with_style(doc, text, style=None, bold=False, italic=False, font_size=None):
-    """Add a paragraph with specific styling"""
-    if not text:
-        return
+def add_paragraph_style(doc, name, font_size=None, bold=None, italic=None, alignment=None):
+    """Add a paragraph style based on Normal, or return it if it already exists"""
+    styles = doc.styles
+    if name in [style.name for style in styles]:
+        return styles[name]
     
-    p = doc.add_paragraph(text, style=style)
+    style = styles.add_style(name, WD_STYLE_TYPE.PARAGRAPH)
+    style.base_style = styles['Normal']
+    if font_size:
+        style.font.size = Pt(font_size)
+    if bold is not None:
+        style.font.bold = bold
+    if italic is not None:
+        style.font.italic = italic
+    if alignment is not None:
+        style.paragraph_format.alignment = alignment
+    return style
+
+def paragraph_xml(text, style_id=None):
+    """Build the WordprocessingML for a paragraph of plain text tagged with an already resolved style ID"""
+    props = f'<w:pPr><w:pStyle w:val="{style_id}"/></w:pPr>' if style_id else ''
+    if not text:
+        return f'<w:p>{props}</w:p>' if props else EMPTY_PARAGRAPH_XML
     
-    if bold or italic or font_size:
-        run = p.runs[0] if p.runs else None
-        if run:
-            if bold:
-                run.bold = bold
-            if italic:
-                run.italic = italic
-            if font_size:
-                run.font.size = Pt(font_size)
+    space = ' xml:space="preserve"' if text[0].isspace() or text[-1].isspace() else ''
+    text = escape(INVALID_XML_CHARS.sub('', text))
+    return f'<w:p>{props}<w:r><w:t{space}>{text}</w:t></w:r></w:p>'
+
+def add_styled_paragraph(body, text, style_id):
+    """Add a paragraph tagged with an already resolved style ID"""
+    body['xml'].append(paragraph_xml(text, style_id))
+
+def add_drawing(body, inline_xml, style_id):
+    """Add a <wp:inline> drawing in a paragraph of its own"""
+    body['xml'].append(f'<w:p><w:pPr><w:pStyle w:val="{style_id}"/></w:pPr>'
+                       f'<w:r><w:drawing>{inline_xml}</w:drawing></w:r></w:p>')
+
+def table_cell_xml(text, width, style_id, grid_span=1, v_merge=None):
+    """Build the WordprocessingML for one table cell"""
+    props = f'<w:tcW w:type="dxa" w:w="{width}"/>'
+    if grid_span > 1:
+        props += f'<w:gridSpan w:val="{grid_span}"/>'
+    if v_merge == 'restart':
+        props += '<w:vMerge w:val="restart"/>'
+    elif v_merge == 'continue':
+        props += '<w:vMerge/>'
     
-    return p
+    run = ''
+    if text:
+        text = escape(INVALID_XML_CHARS.sub('', text))
+        run = f'<w:r><w:t xml:space="preserve">{text}</w:t></w:r>'
+    return (f'<w:tc><w:tcPr>{props}</w:tcPr>'
+            f'<w:p><w:pPr><w:pStyle w:val="{style_id}"/></w:pPr>{run}</w:p></w:tc>')
 
-def add_table_from_html(doc, table_element):
-    """Convert HTML table to Word table"""
-    # Extract headers
-    headers = [clean_text(th.get_text()) for th in table_element.find_all('th')]
+def add_table_from_html(body, table_node, styles):
+    """Convert an extracted HTML table to a Word table
     
-    # Extract rows
-    rows_data = []
-    for tr in table_element.find_all('tr')[1:]:  # Skip header row
-        row = [clean_text(td.get_text()) for td in tr.find_all('td')]
-        if row:
-            rows_data.append(row)
+    The table is generated as one XML fragment, so building it is linear in
+    its size. Columns share the text width equally. Header and cell text take
+    their formatting from the Table Header / Table Text paragraph styles, and
+    header rows repeat at the top of each page.
+    """
+    headers = table_node['headers']
+    rows_data = table_node['rows']
     
     if not headers or not rows_data:
         return
     
-    # Create Word table
-    table = doc.add_table(rows=1 + len(rows_data), cols=len(headers))
-    table.style = 'Light Grid Accent 1'
-    
-    # Add headers
-    header_cells = table.rows[0].cells
-    for i, header in enumerate(headers):
-        cell = header_cells[i]
-        cell.text = header
-        # Make header bold
-        for paragraph in cell.paragraphs:
-            for run in paragraph.runs:
-                run.font.bold = True
-                run.font.size = Pt(11)
-    
-    # Add data rows
-    for row_idx, row_data in enumerate(rows_data):
-        row_cells = table.rows[row_idx + 1].cells
-        for col_idx, cell_data in enumerate(row_data):
-            if col_idx < len(row_cells):
-                row_cells[col_idx].text = str(cell_data)
-                # Set font size for data
-                for paragraph in row_cells[col_idx].paragraphs:
-                    for run in paragraph.runs:
-                        run.font.size = Pt(10)
+    grid = table_node['header_grid'] + rows_data
+    header_count = len(table_node['header_grid'])
+    cols = len(headers)
+    
+    col_width = Emu(body['width'] // cols).twips
+    grid_xml = f'<w:gridCol w:w="{col_width}"/>' * cols
+    
+    header_style = styles['Table Header']
+    text_style = styles['Table Text']
+    
+    # Map merged regions: origin -> (rowspan, colspan), covered slot -> origin
+    spans = {}
+    covered = {}
+    for r, c, rowspan, colspan in table_node['merges']:
+        spans[(r, c)] = (rowspan, colspan)
+        for dr in range(rowspan):
+            for dc in range(colspan):
+                if dr or dc:
+                    covered[(r + dr, c + dc)] = (r, c)
+    
+    rows_xml = []
+    for r, row in enumerate(grid):
+        style_id = header_style if r < header_count else text_style
+        cells = []
+        c = 0
+        while c < cols:
+            if (r, c) in covered:
+                origin = covered[(r, c)]
+                rowspan, colspan = spans[origin]
+                if origin[0] == r:
+                    c += 1  # Covered by a colspan already emitted in this row
+                    continue
+                # Continuation of a rowspan from an earlier row
+                cells.append(table_cell_xml('', col_width * colspan, style_id, colspan, 'continue'))
+                c += colspan
+                continue
+            
+            rowspan, colspan = spans.get((r, c), (1, 1))
+            colspan = min(colspan, cols - c)
+            cells.append(table_cell_xml(row[c], col_width * colspan, style_id, colspan,
+                                        'restart' if rowspan > 1 else None))
+            c += colspan
+        
+        row_props = '<w:trPr><w:tblHeader/></w:trPr>' if r < header_count else ''
+        rows_xml.append(f'<w:tr>{row_props}{"".join(cells)}</w:tr>')
+    
+    body['xml'].append(
+        f'<w:tbl><w:tblPr><w:tblStyle w:val="{styles[TABLE_STYLE]}"/><w:tblW w:type="auto" w:w="0"/>'
+        f'{TABLE_LOOK_XML}</w:tblPr><w:tblGrid>{grid_xml}</w:tblGrid>'
+        f'{"".join(rows_xml)}</w:tbl>'
+    )
     
     # Add spacing after table
-    doc.add_paragraph()
+    body['xml'].append(EMPTY_PARAGRAPH_XML)
 
-def parse_html_to_docx(html_file, output_file):
-    """Convert HTML file to Word document"""
+def is_content_node(node, title_text):
+    """Check whether a node is rendered as one unit, so its subtree needs no further walk"""
+    # Skip meta info and abstract (already processed)
+    if node['classes'] and is_front_matter(node):
+        return False
     
-    print(f"Converting {html_file} to {output_file}...")
+    tag = node['tag']
+    text = node.get('text')
+    if tag == 'h1':
+        return bool(text) and text != title_text  # Skip duplicate title
+    if tag in ('h2', 'h3'):
+        return bool(text)
+    if tag == 'p':
+        return bool(text) and len(text) > 10  # Skip very short texts
+    if node['type'] in ('list', 'image', 'chart') or tag == 'table':
+        return True
+    if tag == 'div':
+        return node['role'] == 'paper'
+    return False
+
+def text_area(doc):
+    """Return the (width, height) in inches of the page area inside the margins"""
+    section = doc.sections[0]
+    return (Emu(section.page_width - section.left_margin - section.right_margin).inches,
+            Emu(section.page_height - section.top_margin - section.bottom_margin).inches)
+
+def image_media(doc, document):
+    """Return where a document's images are read from and the largest size, in inches, they are shown at"""
+    width, height = text_area(doc)
+    return {
+        'base_dir': document['base_dir'],
+        'css': document['css'],
+        'width': width,
+        'height': height,
+    }
+
+def body_writer(doc, emit):
+    """Start writing the body of a document
     
-    # Read HTML file
-    with open(html_file, 'r', encoding='utf-8') as f:
-        html_content = f.read()
+    The body is built as WordprocessingML strings, one per block element,
+    and each finished section's strings are passed to emit. doc holds the
+    styles and the parts that images and charts are added to. 'rendered'
+    holds sections already rendered by workers (see render_sections).
+    """
+    section = doc.sections[0]
+    return {
+        'doc': doc,
+        'emit': emit,
+        'xml': [],
+        'width': Emu(section.page_width - section.left_margin - section.right_margin),
+        'shape_ids': itertools.count(1),
+        'rendered': {},
+    }
+
+def flush_body(body):
+    """Pass the block elements added since the last flush on to the writer's emit"""
+    if body['xml']:
+        body['emit'](body['xml'])
+        body['xml'] = []
+
+def add_image(body, node, styles, media):
+    """Add an image in a centered paragraph of its own, if it can be loaded"""
+    image = load_image(node, media['base_dir'], media['width'], media['height'], media['css'])
+    if image is None:
+        return
+    rId, picture = body['doc'].part.get_or_add_image(io.BytesIO(image['data']))
+    width, height = picture.scaled_dimensions(Inches(image['width']), Inches(image['height']))
+    inline = CT_Inline.new_pic_inline(next(body['shape_ids']), rId, picture.filename, width, height)
+    if node['alt']:
+        inline.docPr.set('descr', node['alt'])
+    add_drawing(body, etree.tostring(inline, encoding='unicode'), styles['Figure'])
+
+def add_chart(body, node, styles):
+    """Add a native chart, with its data in an embedded workbook, in a centered paragraph of its own"""
+    doc = body['doc']
+    package = doc.part.package
+    workbook_part = Part(package.next_partname('/word/embeddings/Microsoft_Excel_Sheet%d.xlsx'),
+                         XLSX_CT, workbook_blob(node), package)
+    chart_part = Part(package.next_partname('/word/charts/chart%d.xml'), CHART_CT, b'', package)
+    element = chart_space(node)
+    element._add_externalData().rId = chart_part.relate_to(workbook_part, RT.PACKAGE)
+    chart_part._blob = etree.tostring(element, xml_declaration=True, encoding='UTF-8', standalone=True)
     
-    # Parse HTML
-    soup = BeautifulSoup(html_content, 'html.parser')
+    rId = doc.part.relate_to(chart_part, RT.CHART)
+    shape_id = next(body['shape_ids'])
+    add_drawing(body, (
+        f'<wp:inline {nsdecls("wp", "a", "c", "r")} distT="0" distB="0" distL="0" distR="0">'
+        f'<wp:extent cx="{body["width"]}" cy="{Inches(CHART_HEIGHT)}"/>'
+        f'<wp:docPr id="{shape_id}" name="Chart {shape_id}" descr="{escape(node["title"], {chr(34): "&quot;"})}"/>'
+        f'<a:graphic><a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/chart">'
+        f'<c:chart r:id="{rId}"/></a:graphicData></a:graphic></wp:inline>'
+    ), styles['Figure'])
+
+def add_content_node(body, node, title_text, styles, media=None, index=None):
+    """Add a content node to the document body, returning True if its subtree was handled
     
-    # Create Word document
-    doc = Document()
+    Images are only added when media (from image_media) is given. index is
+    the document's node index, used to find the parts of paper summaries.
+    """
+    if not is_content_node(node, title_text):
+        return False
     
-    # Set up styles
-    set_document_styles(doc)
+    # Process headings
+    if node['type'] == 'heading':
+        add_styled_paragraph(body, node['text'], styles[f"Heading {node['level']}"])
     
-    # Get and add title
-    title_tag = soup.find('title')
-    if title_tag:
-        title_text = clean_text(title_tag.text)
-        title = doc.add_heading(title_text, level=0)
-        title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    # Process paragraphs, followed by any images inside them
+    elif node['tag'] == 'p':
+        add_styled_paragraph(body, node['text'], styles[BODY_STYLES[(node['bold'], node['italic'])]])
+        if media is not None:
+            for image in find_nodes(node, node_type='image', index=index):
+                add_image(body, image, styles, media)
     
-    # Add meta info / author info
-    meta_info = soup.find(class_=['meta-info', 'author-info', 'document-header'])
-    if meta_info:
-        meta_text = clean_text(meta_info.get_text())
-        if meta_text:
-            p = doc.add_paragraph(meta_text)
-            p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            for run in p.runs:
-                run.italic = True
-                run.font.size = Pt(11)
-            doc.add_paragraph()  # Add spacing
+    # Process images
+    elif node['type'] == 'image':
+        if media is not None:
+            add_image(body, node, styles, media)
     
-    # Process abstract if present
-    abstract = soup.find(class_=['abstract', 'executive-summary'])
-    if abstract:
-        # Add abstract heading
-        abstract_heading = abstract.find(['h2', 'h3'])
-        if abstract_heading:
-            doc.add_heading(clean_text(abstract_heading.get_text()), level=2)
-        
-        # Add abstract paragraphs
-        for p in abstract.find_all('p'):
-            text = clean_text(p.get_text())
-            if text:
-                para = doc.add_paragraph(text)
-                para.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
-        
-        doc.add_paragraph()  # Add spacing
+    # Process charts
+    elif node['type'] == 'chart':
+        add_chart(body, node, styles)
+    
+    # Process lists
+    elif node['type'] == 'list':
+        style_id = styles['List Number' if node['ordered'] else 'List Bullet']
+        for item in node['children']:
+            if item['type'] == 'item' and item['text']:
+                add_styled_paragraph(body, item['text'], style_id)
     
-    # Process main content
-    processed_elements = set()
+    # Process tables
+    elif node['tag'] == 'table':
+        add_table_from_html(body, node, styles)
     
-    for element in soup.find_all(['h1', 'h2', 'h3', 'p', 'ul', 'ol', 'table', 'div']):
+    # Paper summary boxes
+    elif node['role'] == 'paper':
+        body['xml'].append(PAGE_BREAK_XML)
         
-        # Skip if already processed (e.g., inside abstract)
-        if element in processed_elements or any(parent in processed_elements for parent in element.parents):
-            continue
+        # Paper title
+        if node['title']:
+            add_styled_paragraph(body, node['title'], styles['Heading 2'])
         
-        # Skip style and script tags
-        if element.name in ['style', 'script']:
-            continue
+        # Paper authors/meta
+        if node['meta']:
+            add_styled_paragraph(body, node['meta'], styles['Paper Meta'])
         
-        # Skip meta info and abstract (already processed)
-        if 'meta-info' in element.get('class', []) or 'author-info' in element.get('class', []):
-            continue
-        if 'abstract' in element.get('class', []) or 'executive-summary' in element.get('class', []):
+        # Process section boxes within paper
+        for box in find_nodes(node, classes={'section-box'}, index=index):
+            if box.get('title'):
+                add_styled_paragraph(body, box['title'], styles['Heading 3'])
+            
+            # Add box content
+            for p in find_nodes(box, node_type='paragraph', index=index):
+                if p['text']:
+                    add_styled_paragraph(body, p['text'], None)
+            
+            # Add lists in box
+            for ul in find_nodes(box, node_type='list', index=index):
+                for item in ul['children']:
+                    if item['type'] == 'item' and item['text']:
+                        add_styled_paragraph(body, item['text'], styles['List Bullet'])
+    
+    return True
+
+def iter_content_nodes(block, title_text):
+    """Yield the nodes of a block that are rendered as units, in document order
+    
+    Once a node is yielded its subtree is pruned, so every node is visited at
+    most once.
+    """
+    stack = [block]
+    while stack:
+        node = stack.pop()
+        if node['tag'] in CONTENT_TAGS and is_content_node(node, title_text):
+            yield node
             continue
+        stack.extend(reversed(node['children']))
+
+def add_section(body, nodes, title_text, styles, section_cache=None, media=None, index=None):
+    """Add the content nodes of one section, reusing its cached XML when it is unchanged, and flush it
+    
+    section_cache maps a fingerprint of the section's nodes to the XML
+    strings they rendered to. Reused entries move to the end, so the oldest
+    entries are the least recently used. Sections with images or charts are
+    always rendered, since their XML refers to parts of this document.
+    Sections the writer already has from workers are added as they are.
+    """
+    rendered = body['rendered'].pop(section_key(nodes), None) if body['rendered'] else None
+    if rendered is not None:
+        body['xml'].extend(rendered)
+    
+    elif nodes and (section_cache is None or has_parts(nodes)):
+        for node in nodes:
+            add_content_node(body, node, title_text, styles, media, index)
+    
+    elif nodes:
+        key = node_key(nodes)
+        cached = section_cache.pop(key, None)
+        if cached is not None:
+            body['xml'].extend(cached)
+            count('sections.reused')
+        else:
+            start = len(body['xml'])
+            for node in nodes:
+                add_content_node(body, node, title_text, styles, media, index)
+            cached = body['xml'][start:]
+            count('sections.rendered')
+        section_cache[key] = cached
+    
+    flush_body(body)
+
+def starts_section(node):
+    """Check whether a content node opens a new section: an h1/h2 heading or a paper summary"""
+    return node['tag'] in ('h1', 'h2') or node.get('role') == 'paper'
+
+def has_parts(nodes):
+    """Check whether any of some nodes renders to an image or chart, which adds parts to the document"""
+    return any(node['type'] in PART_NODE_TYPES for node in iter_nodes(nodes))
+
+def section_key(nodes):
+    """Identify a section of a document being rendered by the nodes it is made of"""
+    return tuple(map(id, nodes))
+
+def split_sections(document, title_text):
+    """Group the content nodes of a parsed document into the sections write_body() adds"""
+    sections = [[]]
+    for block in document['blocks']:
+        for node in iter_content_nodes(block, title_text):
+            if starts_section(node):
+                sections.append([])
+            sections[-1].append(node)
+    return [nodes for nodes in sections if nodes]
+
+def render_section(doc, styles, title_text, index, nodes):
+    """Render the nodes of one section, which must need no parts, to their XML strings"""
+    body = body_writer(doc, None)
+    for node in nodes:
+        add_content_node(body, node, title_text, styles, index=index)
+    return body['xml']
+
+def render_sections(doc, document, styles, jobs):
+    """Render the sections of a parsed document that need no parts in worker processes
+    
+    Returns {section_key(nodes): XML strings} for add_section to stitch in, in
+    document order. Sections with images or charts are left to the writer,
+    since their parts are numbered as they are added; so is everything when
+    render_parallel() declines.
+    """
+    title_text = document['title']
+    sections = [nodes for nodes in split_sections(document, title_text) if not has_parts(nodes)]
+    rendered = render_parallel(partial(render_section, doc, styles, title_text, document['index']),
+                               sections, jobs)
+    if rendered is None:
+        return {}
+    count('sections.parallel', len(sections))
+    return {section_key(nodes): xml for nodes, xml in zip(sections, rendered)}
+
+def add_front_matter(body, document, styles, added):
+    """Add the document's meta info and abstract, each once, when they are known"""
+    
+    # Add meta info / author info
+    meta_text = document['meta']
+    if meta_text is not None and 'meta' not in added:
+        added.add('meta')
+        if meta_text:
+            add_styled_paragraph(body, meta_text, styles['Document Meta'])
+            body['xml'].append(EMPTY_PARAGRAPH_XML)  # Add spacing
+    
+    # Process abstract if present
+    abstract = document['abstract']
+    if abstract and 'abstract' not in added:
+        added.add('abstract')
         
-        # Process headings
-        if element.name == 'h1':
-            text = clean_text(element.get_text())
-            if text and text != title_text:  # Skip duplicate title
-                doc.add_heading(text, level=1)
-                processed_elements.add(element)
-        
-        elif element.name == 'h2':
-            text = clean_text(element.get_text())
-            if text:
-                doc.add_heading(text, level=2)
-                processed_elements.add(element)
-        
-        elif element.name == 'h3':
-            text = clean_text(element.get_text())
-            if text:
-                doc.add_heading(text, level=3)
-                processed_elements.add(element)
-        
-        # Process paragraphs
-        elif element.name == 'p':
-            text = clean_text(element.get_text())
-            if text and len(text) > 10:  # Skip very short texts
-                para = doc.add_paragraph(text)
-                para.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
-                
-                # Check for bold/italic
-                if element.find('strong') or element.find('b'):
-                    for run in para.runs:
-                        run.bold = True
-                if element.find('em') or element.find('i'):
-                    for run in para.runs:
-                        run.italic = True
-                
-                processed_elements.add(element)
-        
-        # Process lists
-        elif element.name in ['ul', 'ol']:
-            for li in element.find_all('li', recursive=False):
-                text = clean_text(li.get_text())
-                if text:
-                    doc.add_paragraph(text, style='List Bullet' if element.name == 'ul' else 'List Number')
-            processed_elements.add(element)
+        # Add abstract heading
+        for heading in find_nodes(abstract, node_type='heading', index=document['index']):
+            if heading['level'] in (2, 3):
+                add_styled_paragraph(body, heading['text'], styles['Heading 2'])
+                break
         
-        # Process tables
-        elif element.name == 'table':
-            add_table_from_html(doc, element)
-            processed_elements.add(element)
+        # Add abstract paragraphs
+        for p in find_nodes(abstract, node_type='paragraph', index=document['index']):
+            if p['text']:
+                add_styled_paragraph(body, p['text'], None)
         
-        # Process special divs (paper summaries, boxes, etc.)
-        elif element.name == 'div':
-            classes = element.get('class', [])
-            
-            # Paper summary boxes
-            if 'paper-summary' in classes or 'paper-entry' in classes:
-                doc.add_page_break()
-                
-                # Paper title
-                paper_title = element.find(class_='paper-title')
-                if paper_title:
-                    text = clean_text(paper_title.get_text())
-                    if text:
-                        doc.add_heading(text, level=2)
-                
-                # Paper authors/meta
-                paper_meta = element.find(class_=['paper-authors', 'paper-meta'])
-                if paper_meta:
-                    text = clean_text(paper_meta.get_text())
-                    if text:
-                        p = doc.add_paragraph(text)
-                        for run in p.runs:
-                            run.italic = True
-                            run.font.size = Pt(10)
-                
-                # Process section boxes within paper
-                for box in element.find_all(class_='section-box'):
-                    box_title = box.find(class_='section-title')
-                    if box_title:
-                        text = clean_text(box_title.get_text())
-                        if text:
-                            doc.add_heading(text, level=3)
-                    
-                    # Add box content
-                    for p in box.find_all('p'):
-                        text = clean_text(p.get_text())
-                        if text:
-                            para = doc.add_paragraph(text)
-                            para.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
-                    
-                    # Add lists in box
-                    for ul in box.find_all(['ul', 'ol']):
-                        for li in ul.find_all('li', recursive=False):
-                            text = clean_text(li.get_text())
-                            if text:
-                                doc.add_paragraph(text, style='List Bullet')
-                
-                processed_elements.add(element)
+        body['xml'].append(EMPTY_PARAGRAPH_XML)  # Add spacing
+
+def front_matter_pending(document, added):
+    """Check whether meta info or an abstract is known but not yet added"""
+    return (document['meta'] is not None and 'meta' not in added) or \
+        (bool(document['abstract']) and 'abstract' not in added)
+
+def group_leading_headings(blocks):
+    """Yield blocks in lists: the leading headings with the first other block, then one at a time
+    
+    A streamed document only learns its meta info and abstract as the block
+    holding them is read. They often follow the page heading, while the
+    front matter goes in ahead of it, so those headings wait for that block.
+    """
+    blocks = iter(blocks)
+    group = []
+    for block in blocks:
+        group.append(block)
+        if block['type'] != 'heading':
+            break
+    if group:
+        yield group
+    for block in blocks:
+        yield [block]
+
+def new_document():
+    """Create a Word document with the converter's styles and page-numbered footer
+    
+    Returns (doc, styles) with the style IDs from set_document_styles().
+    """
+    doc = Document()
+    styles = set_document_styles(doc)
     
     # Add page numbers
-    section = doc.sections[0]
-    footer = section.footer
-    footer_para = footer.paragraphs[0]
+    footer_para = doc.sections[0].footer.paragraphs[0]
     footer_para.text = "Page "
     footer_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    return doc, styles
+
+def write_body(doc, document, styles, emit, section_cache=None, jobs=1):
+    """Render the body of a parsed document model, passing each section's XML strings to emit
     
-    # Save document
-    doc.save(output_file)
-    print(f"✓ Successfully created {output_file}")
+    Pass a section_cache dict (kept between builds) to reuse the rendered XML
+    of sections that have not changed since an earlier build. Otherwise, with
+    jobs > 1 the sections of a large parsed document are rendered in that
+    many worker processes.
+    """
+    body = body_writer(doc, emit)
+    if jobs > 1 and section_cache is None and isinstance(document['blocks'], list):
+        body['rendered'] = render_sections(doc, document, styles, jobs)
+    media = image_media(doc, document)
+    index = document['index']
+    
+    # Add title
+    title_text = document['title']
+    if title_text is not None:
+        add_styled_paragraph(body, title_text, styles['Title'])
+    
+    # Process main content in a single document-order walk, one section at a
+    # time. Blocks may be streamed, so the meta info and abstract go in as
+    # soon as they are known, ahead of the block that holds them (and of the
+    # headings leading up to it).
+    added = set()
+    section = []
+    for group in group_leading_headings(document['blocks']):
+        if front_matter_pending(document, added):
+            add_section(body, section, title_text, styles, section_cache, media, index)
+            section = []
+            add_front_matter(body, document, styles, added)
+        
+        for block in group:
+            for node in iter_content_nodes(block, title_text):
+                if starts_section(node):
+                    add_section(body, section, title_text, styles, section_cache, media, index)
+                    section = []
+                section.append(node)
+    add_section(body, section, title_text, styles, section_cache, media, index)
+    add_front_matter(body, document, styles, added)
+    flush_body(body)
+
+def append_body_xml(doc, fragments):
+    """Parse body XML strings into the block elements of an in-memory document"""
+    parsed = parse_xml(f'<w:body {nsdecls("w")}>{"".join(fragments)}</w:body>')
+    sectPr = doc.element.body.sectPr
+    for element in list(parsed):
+        sectPr.addprevious(element)
+
+def build_docx(document, section_cache=None, jobs=1):
+    """Build an in-memory Word document from a parsed document model
     
-    # Count pages (approximate)
-    total_paragraphs = len(doc.paragraphs)
+    The body is rendered by the same writer render_docx streams to a file,
+    so both give the same document.
+    """
+    doc, styles = new_document()
+    write_body(doc, document, styles, lambda fragments: append_body_xml(doc, fragments), section_cache, jobs)
+    return doc
+
+def document_part_frame(doc):
+    """Split the serialized main document part of an empty document around the point its body goes
+    
+    Returns (head, tail) as bytes; the tail starts at the body's section properties.
+    """
+    xml = serialize_part_xml(doc.element)
+    head, sectPr, tail = xml.partition(b'<w:sectPr')
+    return head, sectPr + tail
+
+def render_docx(document, output_file, section_cache=None, compression=None, jobs=1):
+    """Render a parsed document model straight to a Word document file
+    
+    The body is written into the package zip section by section as it is
+    rendered, so it is never built as an in-memory tree; the other parts
+    come from the python-docx template as usual. compression sets the zip
+    level and strategy (see package_optimizer), and jobs the number of
+    processes the sections are rendered in (see write_body). Returns the
+    number of paragraphs in the body.
+    """
+    compression = resolve_compression(compression)
+    written = {'paragraphs': 0, 'styles': set()}
+    collect_metrics = metrics_enabled()
+    
+    def write(fragments):
+        xml = ''.join(fragments)
+        stream.write(xml.encode('utf-8'))
+        written['styles'].update(referenced_style_ids(xml))
+        written['paragraphs'] += sum(fragment.startswith('<w:p') for fragment in fragments)
+        if collect_metrics:
+            count('docx.paragraphs', xml.count('<w:p>') + xml.count('<w:p/>'))
+            count('docx.runs', xml.count('<w:r>'))
+            count('docx.tables', xml.count('<w:tbl>'))
+    
+    with open_package(output_file, compression) as package:
+        with stage('render.docx'):
+            doc, styles = new_document()
+            head, tail = document_part_frame(doc)
+            with package.open(DOCUMENT_PART, 'w') as stream:
+                stream.write(head)
+                write_body(doc, document, styles, write, section_cache, jobs)
+                stream.write(tail)
+        with stage('optimize.docx'):
+            optimize_docx(doc, written['styles'])
+        with stage('save.docx'):
+            write_package(doc, package, compression, skip={DOCUMENT_PART})
+    
+    if collect_metrics:
+        count('docx.bytes', os.path.getsize(output_file))
+    return written['paragraphs']
+
+def parse_html_to_docx(html_file, output_file, jobs=None):
+    """Convert HTML file to Word document, rendering large documents on every core (or jobs processes)"""
+    
+    print(f"Converting {html_file} to {output_file}...")
+    
+    # Read and parse HTML
+    document = load_document(html_file)
+    
+    total_paragraphs = render_docx(document, output_file, jobs=resolve_jobs(jobs))
+    print(f"✓ Successfully created {output_file}")
     print(f"  Total paragraphs: {total_paragraphs}")
 
 def main():
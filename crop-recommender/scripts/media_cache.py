@@ -0,0 +1,278 @@
+"""
+Media Cache
+Loads <img> and inline <svg> images for the renderers, rasterizing SVG and
+downscaling each image to the DPI of the slot it fills, with the results
+kept on disk by content hash so repeat builds reuse them
+"""
+
+from urllib.parse import unquote, unquote_to_bytes, urlsplit
+from xml.etree import ElementTree
+import base64
+import html
+import io
+import json
+import os
+import re
+
+from PIL import Image
+
+import build_cache
+from conversion_metrics import count
+
+try:
+    import cairosvg
+except (ImportError, OSError):  # cairosvg also needs the system cairo library
+    cairosvg = None
+
+# Bump to invalidate every cached image
+MEDIA_VERSION = 1
+
+MEDIA_DIR = os.path.join(build_cache.CACHE_DIR, 'media')
+
+# Past this total size the least recently used images are deleted
+MAX_BYTES = 256 * 1024 * 1024
+
+# Resolution images are rendered at for the size they are shown at
+IMAGE_DPI = 150
+CSS_PX_PER_INCH = 96
+
+# Images kept in memory for repeat builds in one process (batch and watch mode)
+MEMORY_LIMIT = 64
+MEMORY = {}
+
+# Raster formats both Word and PowerPoint embed as they are
+EMBEDDABLE_FORMATS = {'PNG': 'png', 'JPEG': 'jpg', 'GIF': 'gif', 'BMP': 'bmp'}
+
+DATA_URI = re.compile(r'data:([^;,]*)((?:;[^;,]*)*),(.*)', re.DOTALL)
+
+IMG_SRC = re.compile(rb"""<img\b[^>]*?\ssrc\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.IGNORECASE)
+
+# HTML parsers lowercase every name, but SVG names are case-sensitive
+SVG_NAMES = [
+    'viewBox', 'preserveAspectRatio', 'markerWidth', 'markerHeight', 'markerUnits', 'refX', 'refY',
+    'gradientUnits', 'gradientTransform', 'patternUnits', 'patternContentUnits', 'patternTransform',
+    'clipPathUnits', 'maskUnits', 'maskContentUnits', 'textLength', 'lengthAdjust', 'startOffset',
+    'spreadMethod', 'pathLength', 'stdDeviation', 'baseFrequency', 'numOctaves', 'filterUnits',
+    'primitiveUnits', 'stitchTiles', 'tableValues', 'kernelMatrix', 'surfaceScale',
+    'linearGradient', 'radialGradient', 'clipPath', 'textPath', 'foreignObject',
+    'feBlend', 'feColorMatrix', 'feComposite', 'feFlood', 'feGaussianBlur', 'feImage', 'feMerge',
+    'feMergeNode', 'feMorphology', 'feOffset', 'feTile', 'feTurbulence', 'feDropShadow',
+]
+SVG_CASE = {name.lower(): name for name in SVG_NAMES}
+SVG_NAME_PATTERN = re.compile(r'(?<=[<\s/])(' + '|'.join(SVG_CASE) + r')(?=[\s=/>])')
+
+warned = set()
+
+def warn_once(message):
+    """Print a warning the first time it comes up in this process"""
+    if message not in warned:
+        warned.add(message)
+        print(f"✗ {message}")
+
+def image_source(node, base_dir):
+    """Return (bytes, is_svg) for an image node, or None if it cannot be read locally
+    
+    Local files are only read when the document has a base directory, so
+    HTML posted to the conversion service cannot pull files off the host.
+    """
+    if node.get('svg'):
+        return node['svg'].encode('utf-8'), True
+    
+    src = (node.get('src') or '').strip()
+    match = DATA_URI.fullmatch(src)
+    if match:
+        mime, params, payload = match.groups()
+        if ';base64' in params.lower():
+            data = base64.b64decode(payload + '=' * (-len(payload) % 4))
+        else:
+            data = unquote_to_bytes(payload)
+        return data, mime.strip().lower() == 'image/svg+xml'
+    
+    path = local_path(src, base_dir)
+    if path is None or not os.path.isfile(path):
+        return None
+    with open(path, 'rb') as f:
+        return f.read(), path.lower().endswith('.svg')
+
+def local_path(src, base_dir):
+    """Return the local file an image src points at, or None for data URIs and remote images"""
+    url = urlsplit(src)
+    if not src or base_dir is None or url.scheme not in ('', 'file'):
+        return None  # Remote images are not fetched
+    return os.path.join(base_dir, unquote(url.path))
+
+def local_images(html_file, chunk_size=1024 * 1024):
+    """Return the local files the <img> tags of an HTML file load, in order of first use
+    
+    The file is scanned in chunks, so this is safe on inputs too large to
+    read whole; a tag cut by a chunk boundary is carried over to the next.
+    """
+    base_dir = os.path.dirname(os.path.abspath(html_file))
+    paths = {}
+    
+    def scan(text):
+        for match in IMG_SRC.finditer(text):
+            src = next(group for group in match.groups() if group is not None)
+            path = local_path(html.unescape(src.decode('utf-8', 'replace')).strip(), base_dir)
+            if path is not None:
+                paths.setdefault(os.path.normpath(path), None)
+    
+    tail = b''
+    with open(html_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            text = tail + chunk
+            cut = max(text.rfind(b'<'), 0)
+            scan(text[:cut])
+            tail = text[cut:]
+    scan(tail)
+    return list(paths)
+
+def svg_document(markup, css=None):
+    """Turn inline SVG markup from an HTML page into a standalone SVG document
+    
+    Name case lost to the HTML parser is restored, and the page's stylesheets
+    are embedded so class-styled shapes keep their look.
+    """
+    text = markup.decode('utf-8')
+    text = SVG_NAME_PATTERN.sub(lambda m: SVG_CASE[m.group(1)], text)
+    open_end = text.index('>') + 1
+    head = text[:open_end]
+    if 'xmlns=' not in head:
+        head = head.replace('<svg', '<svg xmlns="http://www.w3.org/2000/svg"', 1)
+    if css:
+        style = ''.join(css).replace(']]>', ']]]]><![CDATA[>')
+        head += f"<style><![CDATA[{style}]]></style>"
+    return (head + text[open_end:]).encode('utf-8')
+
+def css_length(value):
+    """Parse a CSS pixel length such as '120' or '120px', or None"""
+    match = re.fullmatch(r'\s*([0-9.]+)\s*(px)?\s*', value or '')
+    return float(match.group(1)) if match else None
+
+def svg_size(data):
+    """Return the natural size of an SVG document in CSS pixels"""
+    root = ElementTree.fromstring(data)
+    width, height = css_length(root.get('width')), css_length(root.get('height'))
+    view_box = (root.get('viewBox') or '').replace(',', ' ').split()
+    if len(view_box) == 4:
+        box_width, box_height = float(view_box[2]), float(view_box[3])
+        if width is None and height is None:
+            return box_width, box_height
+        if width is None:
+            return height * box_width / box_height, height
+        if height is None:
+            return width, width * box_height / box_width
+    return width or 300.0, height or 150.0  # The CSS default size of replaced elements
+
+def fit_size(width, height, max_width, max_height):
+    """Scale a size in inches down, keeping its aspect ratio, until it fits the slot"""
+    scale = min(1.0, max_width / width, max_height / height)
+    return width * scale, height * scale
+
+def display_size(node, natural_width, natural_height, max_width, max_height):
+    """Return the size in inches an image is shown at, from its attributes or natural size"""
+    width, height = css_length(node.get('width')), css_length(node.get('height'))
+    if width and height:
+        natural_width, natural_height = width, height
+    elif width:
+        natural_width, natural_height = width, natural_height * width / natural_width
+    elif height:
+        natural_width, natural_height = natural_width * height / natural_height, height
+    return fit_size(natural_width / CSS_PX_PER_INCH, natural_height / CSS_PX_PER_INCH,
+                    max_width, max_height)
+
+def rasterize(data, is_svg, target_width, target_height):
+    """Render image bytes at no more than the target pixel size, returning (bytes, extension)"""
+    if is_svg:
+        png = cairosvg.svg2png(bytestring=data, output_width=target_width, output_height=target_height)
+        return png, 'png'
+    
+    image = Image.open(io.BytesIO(data))
+    source_format = image.format
+    if image.width <= target_width and image.height <= target_height and source_format in EMBEDDABLE_FORMATS:
+        return data, EMBEDDABLE_FORMATS[source_format]
+    
+    image.thumbnail((target_width, target_height), Image.LANCZOS)
+    buffer = io.BytesIO()
+    if source_format == 'JPEG':
+        image.save(buffer, 'JPEG', quality=90, optimize=True)
+        return buffer.getvalue(), 'jpg'
+    if image.mode not in ('RGB', 'RGBA', 'L', 'LA', 'P'):
+        image = image.convert('RGBA')
+    image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue(), 'png'
+
+def read_cached(key):
+    """Return (bytes, extension) of a cached image, or None"""
+    for extension in ('png', 'jpg', 'gif', 'bmp'):
+        path = os.path.join(MEDIA_DIR, f"{key}.{extension}")
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            continue
+        try:
+            os.utime(path)  # Recently used, so pruning keeps it
+        except OSError:
+            pass
+        return data, extension
+    return None
+
+def write_cached(key, data, extension):
+    """Store an image in the on-disk cache, then prune it back to MAX_BYTES"""
+    os.makedirs(MEDIA_DIR, exist_ok=True)
+    path = os.path.join(MEDIA_DIR, f"{key}.{extension}")
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+    build_cache.prune_files(MEDIA_DIR, MAX_BYTES)
+
+def load_image(node, base_dir, max_width, max_height, css=None):
+    """Load an image node sized for a slot of max_width x max_height inches
+    
+    Returns {'data', 'width', 'height'} with the size in inches, or None if
+    the image cannot be read or rasterized. The same source shown at the same
+    size always gives the same bytes, so the output packages store it once.
+    """
+    try:
+        source = image_source(node, base_dir)
+        if source is None:
+            count('images.missing')
+            return None
+        data, is_svg = source
+        if is_svg:
+            if cairosvg is None:
+                warn_once("Skipping SVG images: install cairosvg and the cairo library "
+                          "(pip install -r requirements_converter_svg.txt) to rasterize them")
+                count('images.missing')
+                return None
+            if node.get('svg'):
+                data = svg_document(data, css)
+            natural_width, natural_height = svg_size(data)
+        else:
+            natural_width, natural_height = Image.open(io.BytesIO(data)).size
+        
+        width, height = display_size(node, natural_width, natural_height, max_width, max_height)
+        target_width = max(1, round(width * IMAGE_DPI))
+        target_height = max(1, round(height * IMAGE_DPI))
+        key = build_cache.hash_bytes(json.dumps([
+            MEDIA_VERSION, build_cache.hash_bytes(data), target_width, target_height,
+        ]).encode('utf-8'))
+        
+        cached = MEMORY.pop(key, None) or read_cached(key)
+        if cached is None:
+            cached = rasterize(data, is_svg, target_width, target_height)
+            write_cached(key, *cached)
+            count('images.rendered')
+        else:
+            count('images.reused')
+    except (OSError, ValueError, SyntaxError, Image.DecompressionBombError) as e:
+        warn_once(f"Skipping unreadable image: {e}")
+        count('images.missing')
+        return None
+    
+    MEMORY[key] = cached
+    while len(MEMORY) > MEMORY_LIMIT:
+        del MEMORY[next(iter(MEMORY))]
+    return {'data': cached[0], 'width': width, 'height': height}
@@ -0,0 +1,68 @@
+"""
+Native Charts
+Builds editable Office charts from 'chart' nodes of the document model, for
+PowerPoint slides and, through the same DrawingML chart parts, Word documents
+"""
+
+from pptx.chart.chart import Chart
+from pptx.chart.data import CategoryChartData
+from pptx.enum.chart import XL_CHART_TYPE, XL_LEGEND_POSITION
+from pptx.oxml import parse_xml
+
+# Chart node kinds and the Office chart type each is drawn as
+CHART_TYPES = {
+    'bar': XL_CHART_TYPE.BAR_CLUSTERED,
+    'column': XL_CHART_TYPE.COLUMN_CLUSTERED,
+    'line': XL_CHART_TYPE.LINE_MARKERS,
+}
+
+def chart_node(kind, title, categories, series, number_format='#,##0'):
+    """Create a chart node for the document model
+    
+    series is a list of (name, values) pairs, one value per category.
+    """
+    return {
+        'tag': 'chart',
+        'type': 'chart',
+        'classes': [],
+        'children': [],
+        'kind': kind,
+        'title': title,
+        'categories': [str(category) for category in categories],
+        'series': [{'name': name, 'values': list(values)} for name, values in series],
+        'number_format': number_format,
+    }
+
+def chart_data(node):
+    """Return the python-pptx chart data of a chart node"""
+    data = CategoryChartData(number_format=node['number_format'])
+    data.categories = node['categories']
+    for series in node['series']:
+        data.add_series(series['name'], series['values'])
+    return data
+
+def style_chart(chart, node):
+    """Give a chart its title, a legend when it has several series, and the node's number format"""
+    chart.has_title = True
+    chart.chart_title.text_frame.text = node['title']
+    chart.has_legend = len(node['series']) > 1
+    if chart.has_legend:
+        chart.legend.position = XL_LEGEND_POSITION.BOTTOM
+        chart.legend.include_in_layout = False
+    
+    tick_labels = chart.value_axis.tick_labels
+    tick_labels.number_format = node['number_format']
+    tick_labels.number_format_is_linked = False
+
+def chart_space(node):
+    """Build the styled <c:chartSpace> element of a chart node, for packages other than PowerPoint
+    
+    The element has no link to a workbook yet; see workbook_blob().
+    """
+    element = parse_xml(chart_data(node).xml_bytes(CHART_TYPES[node['kind']]))
+    style_chart(Chart(element, None), node)
+    return element
+
+def workbook_blob(node):
+    """Return the embedded Excel workbook holding a chart node's data"""
+    return chart_data(node).xlsx_blob
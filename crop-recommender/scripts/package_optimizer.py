@@ -0,0 +1,202 @@
+"""
+Package Optimizer
+Shrinks rendered Word/PowerPoint packages before they are saved: drops the
+template parts and styles a document does not use, merges identical media
+parts and writes the zip with a chosen compression level and strategy
+"""
+
+import hashlib
+import re
+import zipfile
+
+from conversion_metrics import count
+
+# Template parts no converter output needs, by relationship type
+UNUSED_RELTYPES = {
+    'http://schemas.microsoft.com/office/2007/relationships/stylesWithEffects',
+    'http://schemas.openxmlformats.org/officeDocument/2006/relationships/customXml',
+    'http://schemas.openxmlformats.org/officeDocument/2006/relationships/printerSettings',
+    'http://schemas.openxmlformats.org/package/2006/relationships/metadata/thumbnail',
+}
+
+SLIDE_LAYOUT_RELTYPE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/slideLayout'
+
+W_NS = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
+STYLE_ID = f"{{{W_NS['w']}}}styleId"
+DEFAULT = f"{{{W_NS['w']}}}default"
+
+# Attributes that refer to a style from the document body, headers, footers and numbering
+STYLE_REFERENCES = ('.//w:pStyle/@w:val | .//w:rStyle/@w:val | .//w:tblStyle/@w:val'
+                    ' | .//w:numStyleLink/@w:val | .//w:styleLink/@w:val')
+
+# The same references in body XML written as text, which has no element to query
+STYLE_REFERENCE_TEXT = re.compile(r'<w:(?:pStyle|rStyle|tblStyle) w:val="([^"]*)"')
+
+# Zip strategies: which parts are deflated and which are stored as they are
+COMPRESSION_STRATEGIES = {
+    'deflate': "deflate every part",
+    'store-media': "store already-compressed media, deflate the XML",
+    'store': "store every part uncompressed (fastest to write and open)",
+}
+COMPRESSED_MEDIA = ('.png', '.jpg', '.jpeg', '.gif')
+
+DEFAULT_COMPRESSION = {'level': 9, 'strategy': 'store-media'}
+
+CONTENT_TYPES_NS = 'http://schemas.openxmlformats.org/package/2006/content-types'
+RELS_CONTENT_TYPE = 'application/vnd.openxmlformats-package.relationships+xml'
+XML_DECLARATION = "<?xml version='1.0' encoding='UTF-8' standalone='yes'?>\n"
+
+def drop_rels(rels, reltypes):
+    """Remove the relationships of the given types, so their parts are not saved"""
+    for rId in [rId for rId, rel in rels.items() if rel.reltype in reltypes]:
+        rels.pop(rId)
+        count('package.parts_dropped')
+
+def dedupe_media(package):
+    """Point every relationship to a media part at the first part with the same bytes"""
+    canonical = {}
+    for rel in package.iter_rels():
+        if rel.is_external or '/media/' not in str(rel.target_part.partname):
+            continue
+        part = rel.target_part
+        digest = hashlib.sha256(part.blob).hexdigest()
+        first = canonical.setdefault(digest, part)
+        if first is not part:
+            rel._target = first
+            count('package.media_merged')
+
+def referenced_style_ids(xml):
+    """Collect the style IDs referenced from a WordprocessingML string"""
+    return set(STYLE_REFERENCE_TEXT.findall(xml))
+
+def used_style_ids(package, styles_element, referenced=()):
+    """Collect the IDs of the styles a Word document uses, with every style they build on
+    
+    referenced adds the style IDs of XML that is not in the package's parts,
+    such as a body streamed straight to the output file.
+    """
+    used = set(referenced)
+    for part in package.iter_parts():
+        element = getattr(part, '_element', None)
+        if element is not None and element is not styles_element:
+            used.update(element.xpath(STYLE_REFERENCES))
+    
+    by_id = {style.get(STYLE_ID): style for style in styles_element.xpath('w:style')}
+    used.update(style_id for style_id, style in by_id.items() if style.get(DEFAULT) == '1')
+    
+    # Follow basedOn/next/link chains to everything the used styles depend on
+    pending = list(used)
+    while pending:
+        style = by_id.get(pending.pop())
+        if style is None:
+            continue
+        for style_id in style.xpath('w:basedOn/@w:val | w:next/@w:val | w:link/@w:val'):
+            if style_id not in used:
+                used.add(style_id)
+                pending.append(style_id)
+    return used
+
+def optimize_docx(doc, referenced=()):
+    """Drop the styles and template parts a Word document does not use
+    
+    referenced is passed on to used_style_ids().
+    """
+    styles_element = doc.styles.element
+    used = used_style_ids(doc.part.package, styles_element, referenced)
+    for style in styles_element.xpath('w:style'):
+        if style.get(STYLE_ID) not in used:
+            styles_element.remove(style)
+            count('package.styles_dropped')
+    
+    drop_rels(doc.part.rels, UNUSED_RELTYPES)
+    drop_rels(doc.part.package.rels, UNUSED_RELTYPES)
+    dedupe_media(doc.part.package)
+    return doc
+
+def optimize_pptx(prs):
+    """Drop the slide layouts and template parts a presentation does not use
+    
+    The layouts in use are collected in one pass over the slides; asking each
+    layout for its slides (as SlideLayouts.remove() does) walks the whole deck
+    once per layout.
+    """
+    used = {slide.part.part_related_by(SLIDE_LAYOUT_RELTYPE) for slide in prs.slides}
+    for master in prs.slide_masters:
+        sld_layout_id_lst = master._element.get_or_add_sldLayoutIdLst()
+        for sld_layout_id in list(sld_layout_id_lst):
+            if master.part.related_part(sld_layout_id.rId) not in used:
+                sld_layout_id_lst.remove(sld_layout_id)
+                master.part.drop_rel(sld_layout_id.rId)
+                count('package.layouts_dropped')
+    
+    drop_rels(prs.part.rels, UNUSED_RELTYPES)
+    drop_rels(prs.part.package._rels, UNUSED_RELTYPES)
+    dedupe_media(prs.part.package)
+    return prs
+
+def resolve_compression(compression=None):
+    """Fill in a compression setting from DEFAULT_COMPRESSION and check its strategy
+    
+    compression is a dict with a zlib 'level' (0-9) and a 'strategy' from
+    COMPRESSION_STRATEGIES; missing keys fall back to DEFAULT_COMPRESSION.
+    """
+    compression = dict(DEFAULT_COMPRESSION, **(compression or {}))
+    if compression['strategy'] not in COMPRESSION_STRATEGIES:
+        raise ValueError(f"Unknown zip strategy '{compression['strategy']}' "
+                         f"(choose from {', '.join(COMPRESSION_STRATEGIES)})")
+    return compression
+
+def open_package(output_file, compression):
+    """Open a package zip for writing; parts opened by name are written with the strategy's XML compression"""
+    method = zipfile.ZIP_STORED if compression['strategy'] == 'store' else zipfile.ZIP_DEFLATED
+    return zipfile.ZipFile(output_file, 'w', method, compresslevel=compression['level'])
+
+def package_rels(package):
+    """Return the package-level relationships of a python-docx or python-pptx package"""
+    return package.rels if hasattr(package, 'rels') else package._rels
+
+def content_types_xml(parts):
+    """Build [Content_Types].xml: a default content type per extension, overridden for parts that differ"""
+    defaults = {'rels': RELS_CONTENT_TYPE, 'xml': 'application/xml'}
+    overrides = {}
+    for part in parts:
+        ext = part.partname.ext
+        if defaults.setdefault(ext, part.content_type) == part.content_type:
+            continue
+        overrides[str(part.partname)] = part.content_type
+    items = [f'<Default Extension="{ext}" ContentType="{content_type}"/>'
+             for ext, content_type in sorted(defaults.items())]
+    items += [f'<Override PartName="{partname}" ContentType="{content_type}"/>'
+              for partname, content_type in sorted(overrides.items())]
+    return f'{XML_DECLARATION}<Types xmlns="{CONTENT_TYPES_NS}">{"".join(items)}</Types>'.encode('utf-8')
+
+def write_package(package_obj, target, compression, skip=()):
+    """Write the parts of a Document/Presentation into an open package zip, except the names in skip
+    
+    Each part is serialized once, straight into its zip member, with the
+    compression the strategy picks for it; skipped parts are not serialized.
+    """
+    package = package_obj.part.package
+    parts = list(package.iter_parts())
+    
+    def write(name, data):
+        stored = compression['strategy'] == 'store' or (
+            compression['strategy'] == 'store-media' and name.lower().endswith(COMPRESSED_MEDIA))
+        target.writestr(name, data, zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED)
+    
+    write('[Content_Types].xml', content_types_xml(parts))
+    write('_rels/.rels', package_rels(package).xml)
+    for part in parts:
+        if part.partname.membername not in skip:
+            write(part.partname.membername, part.blob)
+        if len(part.rels):
+            write(part.partname.rels_uri.membername, part.rels.xml)
+
+def save_package(package_obj, output_file, compression=None):
+    """Save a Document/Presentation, rewriting its zip with the chosen level and strategy
+    
+    compression is as for resolve_compression().
+    """
+    compression = resolve_compression(compression)
+    with open_package(output_file, compression) as target:
+        write_package(package_obj, target, compression)
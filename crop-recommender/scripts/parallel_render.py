@@ -0,0 +1,56 @@
+"""
+Parallel Rendering
+Renders the independent sections of one large document in forked worker
+processes, so the converters can stitch the results back in document order
+"""
+
+import gc
+import multiprocessing
+import os
+
+# Documents with fewer sections render faster in-process than the workers start
+MIN_UNITS = 64
+
+# Batches handed to each worker, so sections of uneven size still balance out
+BATCHES_PER_WORKER = 4
+
+# The render function and units of the running render_parallel() call. Forked
+# workers inherit them, and the whole document behind them, instead of having
+# them pickled over; only the rendered results travel back.
+ACTIVE = None
+
+def resolve_jobs(jobs=None):
+    """Return the number of processes to render with, all cores by default"""
+    return jobs or os.cpu_count() or 1
+
+def render_range(start, stop):
+    """Render a range of the active units in a worker process"""
+    render_unit, units = ACTIVE
+    return [render_unit(unit) for unit in units[start:stop]]
+
+def render_parallel(render_unit, units, jobs):
+    """Render units in worker processes, returning [render_unit(unit)] in order, or None
+    
+    None means the work is better done in-process: one job, too few units,
+    or no fork on this platform. render_unit and the units reach the workers
+    through fork, so they need not be picklable; the results must be. If
+    the wait is interrupted (say by a conversion timeout), the workers are
+    terminated rather than left to finish their batches.
+    """
+    global ACTIVE
+    if jobs <= 1 or len(units) < MIN_UNITS or 'fork' not in multiprocessing.get_all_start_methods():
+        return None
+    
+    batch_size = -(-len(units) // (jobs * BATCHES_PER_WORKER))
+    starts = range(0, len(units), batch_size)
+    ACTIVE = (render_unit, units)
+    # Keep the workers' collector off the inherited objects, so it does not copy their pages
+    gc.freeze()
+    try:
+        # Leaving the pool terminates its workers instead of waiting on them
+        with multiprocessing.get_context('fork').Pool(jobs) as pool:
+            batches = pool.starmap(render_range, [(start, start + batch_size) for start in starts], chunksize=1)
+        return [result for batch in batches for result in batch]
+    finally:
+        ACTIVE = None
+        gc.unfreeze()
@@ -0,0 +1,86 @@
+"""
+Synthetic HTML Corpus
+Generates large HTML documents shaped like our papers for converter
+benchmarks and scale tests
+"""
+
+import os
+
+def page(title, body):
+    """Wrap body markup in a minimal HTML page"""
+    return (
+        f"<!DOCTYPE html><html><head><title>{title}</title>"
+        f"<style>body {{ font-family: serif; }}</style></head>"
+        f"<body><div class=\"meta-info\"><p>Synthetic benchmark corpus</p></div>{body}</body></html>"
+    )
+
+def sentence(i):
+    """Return a deterministic sentence of filler text"""
+    return (f"Paragraph {i} discusses soil nitrogen, rainfall and crop yield trends "
+            f"observed across {i % 37 + 1} districts during the kharif season.")
+
+def paragraphs_html(count=10000, section_every=50):
+    """A long report of plain paragraphs split into h2 sections"""
+    parts = []
+    for i in range(count):
+        if i % section_every == 0:
+            parts.append(f"<h2>Section {i // section_every + 1}</h2>")
+        parts.append(f"<p>{sentence(i)}</p>")
+    return page(f"{count} Paragraphs", ''.join(parts))
+
+def table_html(rows=1000, cols=6):
+    """A single large statistics table"""
+    header = ''.join(f"<th>Column {c + 1}</th>" for c in range(cols))
+    body = ''.join(
+        "<tr>" + ''.join(f"<td>{r * cols + c}</td>" for c in range(cols)) + "</tr>"
+        for r in range(rows)
+    )
+    return page(f"{rows} Row Table", f"<h1>Crop Statistics</h1><h2>Table</h2><table><tr>{header}</tr>{body}</table>")
+
+def paper_summaries_html(count=500):
+    """Many paper-summary blocks with section boxes, like RESEARCH_PAPERS_SUMMARY.html"""
+    parts = ['<h1>Research Papers Summary</h1>']
+    for i in range(count):
+        if i % 10 == 0:
+            parts.append(f"<h2>Group {i // 10 + 1}</h2>")
+        boxes = ''.join(
+            f"<div class=\"section-box {kind}-box\"><div class=\"section-title\">{kind.title()}</div>"
+            f"<p>{sentence(i)}</p><ul><li>{kind} finding one</li><li>{kind} finding two</li></ul></div>"
+            for kind in ('objective', 'methodology', 'results', 'conclusion')
+        )
+        parts.append(
+            f"<div class=\"paper-summary\"><div class=\"paper-title\">Paper {i + 1}</div>"
+            f"<div class=\"paper-authors\">Author {i}, Author {i + 1}</div>{boxes}</div>"
+        )
+    return page(f"{count} Paper Summaries", ''.join(parts))
+
+def deep_nesting_html(depth=200, sections=20):
+    """Content buried under many levels of nested divs"""
+    parts = []
+    for s in range(sections):
+        inner = f"<h2>Nested Section {s + 1}</h2><p>{sentence(s)}</p><ul><li>Nested item</li></ul>"
+        parts.append("<div>" * depth + inner + "</div>" * depth)
+    return page(f"Depth {depth} Nesting", ''.join(parts))
+
+def synthetic_cases(scale=1.0):
+    """Map each synthetic case name to its HTML, with sizes multiplied by scale"""
+    def scaled(n):
+        return max(1, int(n * scale))
+    
+    return {
+        'synthetic-paragraphs': paragraphs_html(scaled(10000)),
+        'synthetic-table': table_html(scaled(1000)),
+        'synthetic-papers': paper_summaries_html(scaled(500)),
+        'synthetic-deep-nesting': deep_nesting_html(200, scaled(20)),
+    }
+
+def write_corpus(directory, scale=1.0):
+    """Write the synthetic corpus to a directory and return the file paths"""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for name, html in synthetic_cases(scale).items():
+        path = os.path.join(directory, f"{name}.html")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(html)
+        paths.append(path)
+    return paths
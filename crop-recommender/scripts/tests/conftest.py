@@ -0,0 +1,21 @@
+"""
+Shared pytest setup for the converter scripts
+"""
+
+import os
+import sys
+
+import pytest
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_DIR = os.path.dirname(SCRIPTS_DIR)
+
+# The converters are run as scripts, so import them from the scripts directory
+sys.path.insert(0, SCRIPTS_DIR)
+
+import document_cache
+
+@pytest.fixture(autouse=True)
+def document_dir(tmp_path, monkeypatch):
+    """Give each test its own document cache, so every first load parses"""
+    monkeypatch.setattr(document_cache, 'DOCUMENT_DIR', str(tmp_path / 'documents'))
@@ -0,0 +1,36 @@
+"""
+Tests for the benchmark suite's corpus generator and regression check
+"""
+
+import sys
+
+import benchmark_converters
+from benchmark_converters import compare, run_phases
+from synthetic_corpus import write_corpus
+
+def result(seconds, peak_mb, input_bytes=1000):
+    return {'seconds': seconds, 'peak_mb': peak_mb, 'input_bytes': input_bytes}
+
+def test_compare_flags_slowdown_and_memory_growth():
+    baseline = {'case': {'docx': result(1.0, 10.0)}}
+    current = {'case': {'docx': result(1.5, 20.0)}}
+    regressions = compare(current, baseline, threshold=0.25)
+    assert len(regressions) == 2
+
+def test_compare_ignores_noise_and_rescaled_cases():
+    baseline = {'case': {'docx': result(0.01, 0.5)}, 'scaled': {'pptx': result(1.0, 10.0)}}
+    current = {'case': {'docx': result(0.04, 1.2)}, 'scaled': {'pptx': result(9.0, 90.0, input_bytes=5000)}}
+    assert compare(current, baseline, threshold=0.25) == []
+
+def test_synthetic_corpus_converts(tmp_path):
+    for html_file in write_corpus(str(tmp_path), scale=0.01):
+        for fmt in ('docx', 'pptx'):
+            phases, output_bytes = run_phases(html_file, fmt)
+            assert set(phases) == {'read', 'parse', 'render', 'optimize', 'save'}
+            assert output_bytes > 0
+
+def test_missing_baseline_fails_the_gate(tmp_path, monkeypatch, capsys):
+    baseline_file = str(tmp_path / 'baseline.json')
+    monkeypatch.setattr(sys, 'argv', ['benchmark_converters.py', '--baseline', baseline_file])
+    assert benchmark_converters.main() == 1
+    assert "No baseline" in capsys.readouterr().out
@@ -0,0 +1,127 @@
+"""
+Tests for the incremental build manifest
+"""
+
+import json
+import os
+import shutil
+import sys
+
+import pytest
+from PIL import Image
+
+import build_cache
+import convert_html
+from build_cache import converter_fingerprint, load_manifest, make_entry, rebuild_reason, save_manifest
+from convert_html import convert_job
+from synthetic_corpus import paper_summaries_html
+
+@pytest.fixture
+def sources(tmp_path, monkeypatch):
+    """Fingerprint a copy of the converter sources, so a test can edit them"""
+    sources_dir = tmp_path / 'sources'
+    sources_dir.mkdir()
+    for name in build_cache.CONVERTER_SOURCES:
+        shutil.copy(os.path.join(build_cache.SCRIPTS_DIR, name), sources_dir)
+    monkeypatch.setattr(build_cache, 'SCRIPTS_DIR', str(sources_dir))
+    build_cache.source_fingerprint.cache_clear()
+    yield sources_dir
+    build_cache.source_fingerprint.cache_clear()
+
+def built_output(tmp_path):
+    """An output file with the manifest entry of a build that just wrote it"""
+    html_file = tmp_path / 'papers.html'
+    output_file = tmp_path / 'papers.docx'
+    output_file.write_bytes(b'docx')
+    fingerprint = converter_fingerprint('docx')
+    return str(output_file), make_entry(str(html_file), str(output_file), 'abc', fingerprint), fingerprint
+
+def test_rebuild_reasons(tmp_path):
+    output_file, entry, fingerprint = built_output(tmp_path)
+    
+    assert rebuild_reason(entry, output_file, 'abc', fingerprint) is None
+    assert rebuild_reason(entry, output_file, 'abc', fingerprint, force=True) == "forced rebuild"
+    assert rebuild_reason(None, output_file, 'abc', fingerprint) == "not in build manifest"
+    assert rebuild_reason(entry, output_file, 'def', fingerprint) == "input content changed"
+    assert rebuild_reason(entry, output_file, 'abc', converter_fingerprint('docx', {'stream': True})) \
+        == "converter code or options changed"
+    
+    with open(output_file, 'ab') as f:
+        f.write(b' edited')
+    assert rebuild_reason(entry, output_file, 'abc', fingerprint) == "output file was modified outside the build"
+    os.remove(output_file)
+    assert rebuild_reason(entry, output_file, 'abc', fingerprint) == "output file is missing"
+
+def test_source_edits_invalidate_the_fingerprint(tmp_path, sources):
+    output_file, entry, fingerprint = built_output(tmp_path)
+    assert converter_fingerprint('docx') == fingerprint
+    
+    with open(sources / 'text_layout.py', 'a', encoding='utf-8') as f:
+        f.write("\n# Tweaked line breaking\n")
+    build_cache.source_fingerprint.cache_clear()
+    assert rebuild_reason(entry, output_file, 'abc', converter_fingerprint('docx')) \
+        == "converter code or options changed"
+
+def test_manifest_round_trip(tmp_path):
+    _, entry, _ = built_output(tmp_path)
+    manifest_file = str(tmp_path / 'cache' / 'manifest.json')
+    entries = {build_cache.manifest_key(str(tmp_path / 'papers.docx')): entry}
+    
+    save_manifest(entries, manifest_file)
+    assert load_manifest(manifest_file) == entries
+    assert os.listdir(tmp_path / 'cache') == ['manifest.json']
+
+@pytest.mark.parametrize('content', [None, '', '{"version": 1, "outputs"', '[]',
+                                     json.dumps({'version': build_cache.CACHE_VERSION + 1, 'outputs': {'a': {}}})])
+def test_unreadable_manifest_starts_fresh(tmp_path, content):
+    manifest_file = tmp_path / 'manifest.json'
+    if content is not None:
+        manifest_file.write_text(content, encoding='utf-8')
+    assert load_manifest(str(manifest_file)) == {}
+
+def test_unchanged_outputs_are_skipped(tmp_path):
+    html_file = tmp_path / 'papers.html'
+    html_file.write_text(paper_summaries_html(3), encoding='utf-8')
+    docx_file, pptx_file = str(tmp_path / 'papers.docx'), str(tmp_path / 'papers.pptx')
+    
+    first = convert_job(str(html_file), ['docx', 'pptx'], str(tmp_path), cache_entries={})
+    assert first['reasons'] == {docx_file: "not in build manifest", pptx_file: "not in build manifest"}
+    second = convert_job(str(html_file), ['docx', 'pptx'], str(tmp_path), cache_entries=first['entries'])
+    assert second['outputs'] == [] and second['skipped'] == [docx_file, pptx_file]
+    assert second['reasons'] == {docx_file: "up to date", pptx_file: "up to date"}
+    
+    html_file.write_text(paper_summaries_html(4), encoding='utf-8')
+    third = convert_job(str(html_file), ['docx'], str(tmp_path), cache_entries=first['entries'])
+    assert third['outputs'] == [docx_file]
+    assert third['reasons'] == {docx_file: "input content changed"}
+
+def test_edited_image_rebuilds_its_page(tmp_path):
+    html_file = tmp_path / 'papers.html'
+    html_file.write_text("<html><body><h1>Trial</h1><p>Yield map</p><img src='figures/yield.png'></body></html>",
+                         encoding='utf-8')
+    (tmp_path / 'figures').mkdir()
+    Image.new('RGB', (40, 30), 'green').save(tmp_path / 'figures' / 'yield.png')
+    docx_file = str(tmp_path / 'papers.docx')
+    
+    first = convert_job(str(html_file), ['docx'], str(tmp_path), cache_entries={})
+    assert first['outputs'] == [docx_file]
+    assert convert_job(str(html_file), ['docx'], str(tmp_path), cache_entries=first['entries'])['outputs'] == []
+    
+    Image.new('RGB', (40, 30), 'brown').save(tmp_path / 'figures' / 'yield.png')
+    second = convert_job(str(html_file), ['docx'], str(tmp_path), cache_entries=first['entries'])
+    assert second['outputs'] == [docx_file]
+    assert second['reasons'] == {docx_file: "input content changed"}
+
+def test_explain_prints_each_reason(tmp_path, monkeypatch, capsys):
+    html_file = tmp_path / 'papers.html'
+    html_file.write_text(paper_summaries_html(3), encoding='utf-8')
+    manifest_file = tmp_path / 'manifest.json'
+    monkeypatch.setattr(sys, 'argv', ['convert_html.py', str(html_file), '--formats', 'docx', '-j', '1',
+                                      '--manifest', str(manifest_file), '--explain'])
+    
+    assert convert_html.main() == 0
+    assert "papers.docx: not in build manifest" in capsys.readouterr().out
+    assert manifest_file.exists()
+    assert convert_html.main() == 0
+    out = capsys.readouterr().out
+    assert "(up to date)" in out and "papers.docx: up to date" in out
@@ -0,0 +1,46 @@
+"""
+Tests for the class rule table and the node index
+"""
+
+import html_document_model
+from html_document_model import find_nodes, iter_nodes, parse_document
+from html_to_pptx_converter import build_pptx
+from synthetic_corpus import paper_summaries_html
+
+def test_indexed_queries_match_subtree_walks():
+    document = parse_document(paper_summaries_html(20))
+    queries = [
+        {'classes': {'section-box'}},
+        {'classes': {'section-box', 'results-box'}},
+        {'node_type': 'item'},
+        {'node_type': 'paragraph'},
+        {'role': 'box'},
+        {'classes': {'section-box'}, 'node_type': 'container'},
+    ]
+    for node in iter_nodes(document['blocks']):
+        for query in queries:
+            indexed = list(find_nodes(node, index=document['index'], **query))
+            walked = list(find_nodes(node, **query))
+            assert [id(found) for found in indexed] == [id(found) for found in walked]
+
+def test_new_class_rules_reach_the_slides(monkeypatch):
+    trials = ''.join(
+        f"<h2>Field Trial {i}</h2>"
+        f"<div class='paper-entry'><h3 class='paper-title'>Trial {i}</h3>"
+        f"<div class='field-notes'><div class='note-title'>Notes {i}</div>"
+        f"<ul><li>Sown after rain {i}</li></ul></div></div>"
+        for i in range(3))
+    html = f"<html><head><title>Trials</title></head><body>{trials}</body></html>"
+    
+    def slide_text():
+        prs = build_pptx(parse_document(html))
+        return [shape.text_frame.text for slide in prs.slides for shape in slide.shapes if shape.has_text_frame]
+    
+    assert not any('Sown after rain' in text for text in slide_text())
+    
+    monkeypatch.setitem(html_document_model.CLASS_RULES, 'field-notes', {'role': 'box'})
+    monkeypatch.setitem(html_document_model.CLASS_RULES, 'note-title', {'fills': ('box', 'title')})
+    text = '\n'.join(slide_text())
+    assert 'Trial 2' in text
+    assert 'Notes 2' in text
+    assert 'Sown after rain 2' in text
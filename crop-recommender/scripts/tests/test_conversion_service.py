@@ -0,0 +1,90 @@
+"""
+Tests for the warm-worker conversion service
+"""
+
+import asyncio
+import io
+import json
+import os
+import zipfile
+
+from conftest import PROJECT_DIR
+from conversion_service import make_service, start_server
+
+HTML_FILE = os.path.join(PROJECT_DIR, 'papers', 'RESEARCH_PAPER.html')
+
+async def request(port, method, target, body=b''):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    head = f"{method} {target} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+    writer.write(head.encode('latin-1') + body)
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), payload
+
+async def exercise_service(html):
+    service = make_service(workers=1, queue_size=0)
+    server = await start_server(service, port=0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        async with server:
+            results = {
+                'docx': await request(port, 'POST', '/convert?format=docx', html),
+                'pptx': await request(port, 'POST', '/convert?format=pptx', html),
+                'bad-format': await request(port, 'POST', '/convert?format=pdf', html),
+                'bad-encoding': await request(port, 'POST', '/convert?format=docx', b'\xff\xfe<p>Yield</p>'),
+                'busy': await asyncio.gather(*[request(port, 'POST', '/convert?format=docx', html)
+                                               for _ in range(3)]),
+                'health': await request(port, 'GET', '/health'),
+            }
+    finally:
+        service['executor'].shutdown()
+    return results
+
+def test_service_converts_and_applies_backpressure():
+    with open(HTML_FILE, 'rb') as f:
+        html = f.read()
+    results = asyncio.run(exercise_service(html))
+    
+    for fmt, part in (('docx', 'word/document.xml'), ('pptx', 'ppt/slides/slide1.xml')):
+        status, payload = results[fmt]
+        assert status == 200
+        assert part in zipfile.ZipFile(io.BytesIO(payload)).namelist()
+    
+    assert results['bad-format'][0] == 400
+    status, payload = results['bad-encoding']
+    assert status == 400 and b'UTF-8' in payload
+    # One worker and no queue: concurrent requests beyond the first are turned away
+    statuses = sorted(status for status, _ in results['busy'])
+    assert statuses[0] == 200 and 503 in statuses
+    assert results['health'][0] == 200
+    assert json.loads(results['health'][1])['failed'] == 0
+
+async def exercise_dead_worker(html):
+    service = make_service(workers=1)
+    server = await start_server(service, port=0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        async with server:
+            results = {'before': await request(port, 'POST', '/convert?format=docx', html)}
+            # As if the OOM killer took the worker
+            for process in list(service['executor']._processes.values()):
+                process.kill()
+                process.join()
+            results['died'] = await request(port, 'POST', '/convert?format=docx', html)
+            await service['warming']
+            results['after'] = await request(port, 'POST', '/convert?format=docx', html)
+            results['health'] = await request(port, 'GET', '/health')
+    finally:
+        service['executor'].shutdown()
+    return results
+
+def test_dead_worker_is_replaced():
+    with open(HTML_FILE, 'rb') as f:
+        html = f.read()
+    results = asyncio.run(exercise_dead_worker(html))
+    
+    assert results['before'][0] == 200
+    assert results['died'][0] == 503
+    assert results['after'][0] == 200
+    assert json.loads(results['health'][1])['restarts'] == 1
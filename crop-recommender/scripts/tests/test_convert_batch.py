@@ -0,0 +1,72 @@
+"""
+Tests for converting batches of files with per-job limits
+"""
+
+import multiprocessing
+import os
+import signal
+import time
+
+import pytest
+
+import convert_html
+from convert_html import convert_batch, convert_job
+from synthetic_corpus import paper_summaries_html
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+def write_papers(tmp_path, counts):
+    """Write one synthetic summary per count, returning their paths"""
+    html_files = []
+    for i, count in enumerate(counts):
+        html_file = tmp_path / f'papers_{i}.html'
+        html_file.write_text(paper_summaries_html(count), encoding='utf-8')
+        html_files.append(str(html_file))
+    return html_files
+
+def test_results_come_back_in_input_order(tmp_path):
+    html_files = write_papers(tmp_path, [30, 2, 10])
+    results = list(convert_batch(html_files, ['docx'], str(tmp_path / 'out'), jobs=2))
+    
+    assert [result['file'] for result in results] == html_files
+    assert [result['status'] for result in results] == ['ok'] * 3
+    assert all(os.path.exists(result['outputs'][0]) for result in results)
+
+def test_slow_job_times_out(tmp_path):
+    html_file, = write_papers(tmp_path, [300])
+    result = convert_job(html_file, ['docx', 'pptx'], str(tmp_path), timeout=0.05)
+    
+    assert result['status'] == 'timeout'
+    assert result['error'] == 'Timed out after 0.05s'
+    assert signal.getitimer(signal.ITIMER_REAL) == (0.0, 0.0)
+
+def test_single_file_with_a_timeout_stops_promptly(tmp_path):
+    html_file, = write_papers(tmp_path, [1000])
+    start = time.perf_counter()
+    results = list(convert_batch([html_file], ['docx', 'pptx'], str(tmp_path), jobs=2, timeout=0.2))
+    
+    assert results[0]['status'] == 'timeout'
+    assert time.perf_counter() - start < 3
+    assert signal.getitimer(signal.ITIMER_REAL) == (0.0, 0.0)
+
+@pytest.mark.skipif(resource is None, reason="Memory limits need the resource module")
+def test_memory_limit_does_not_outlive_the_job(tmp_path):
+    html_file, = write_papers(tmp_path, [2])
+    previous = resource.getrlimit(resource.RLIMIT_AS)
+    for jobs in (1, 2):
+        results = list(convert_batch([html_file], ['docx'], str(tmp_path), jobs=jobs, memory_limit_mb=64 * 1024))
+        assert results[0]['status'] == 'ok'
+        assert resource.getrlimit(resource.RLIMIT_AS) == previous
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork', reason="The patched converter reaches workers through fork")
+def test_dead_worker_is_reported_as_crashed(tmp_path, monkeypatch):
+    monkeypatch.setattr(convert_html, 'convert_html', lambda *args, **kwargs: os._exit(1))
+    html_files = write_papers(tmp_path, [2, 2])
+    results = list(convert_batch(html_files, ['docx'], str(tmp_path), jobs=2))
+    
+    assert [result['file'] for result in results] == html_files
+    assert [result['status'] for result in results] == ['crashed', 'crashed']
+    assert all(result['error'] for result in results)
@@ -0,0 +1,55 @@
+"""
+Tests for the dataset report
+"""
+
+import zipfile
+
+from docx import Document
+from pptx import Presentation
+
+from conversion_metrics import start_metrics, stop_metrics
+from dataset_report import aggregate_dataset, generate_report
+
+DATASET = (
+    "Crop\tCrop\tCrop\tCrop\tArea\tProduction\tAnnual_Rainfall\tFertilizer\tPesticide\tYield\n"
+    "Rice\t2000\tKharif     \tAssam\t100\t250\t2000.5\t9000\t30\t2.5\n"
+    "Rice\t2001\tKharif     \tAssam\t100\t300\t1900.0\t9500\t32\t3.0\n"
+    "Wheat\t2001\tRabi       \tPunjab\t200\t800\t650.2\t30000\t60\t4.0\n"
+    "Wheat\t2001\tRabi\n"
+    "Maize\t2001\tKharif     \tPunjab\tn/a\t10\t650.2\t100\t1\t0.1\n"
+)
+
+def write_dataset(tmp_path):
+    dataset_file = tmp_path / 'crops.csv'
+    dataset_file.write_text(DATASET, encoding='utf-8')
+    return str(dataset_file)
+
+def test_groups_are_totalled_in_one_pass(tmp_path):
+    start_metrics('crops.csv')
+    summary = aggregate_dataset(write_dataset(tmp_path))
+    counters = stop_metrics()['counters']
+    
+    assert summary['rows'] == 3
+    assert counters['dataset.rows_skipped'] == 2
+    groups = summary['groups']
+    assert groups['state']['Assam'] == [200.0, 550.0, 18500.0, 62.0, 2]
+    assert set(groups['season']) == {'Kharif', 'Rabi'}
+    assert groups['year']['2001'][1] == 1100.0
+    assert groups['crop']['Wheat'][:2] == [200.0, 800.0]
+
+def test_report_renders_tables_and_native_charts(tmp_path):
+    outputs = generate_report(write_dataset(tmp_path), ['docx', 'pptx'], str(tmp_path))
+    docx_file, pptx_file = outputs
+    
+    doc = Document(docx_file)
+    assert len(doc.tables) == 4
+    assert doc.tables[0].rows[1].cells[0].text == 'Punjab'
+    with zipfile.ZipFile(docx_file) as package:
+        names = package.namelist()
+    assert sum(name.startswith('word/charts/chart') and name.endswith('.xml') for name in names) == 5
+    assert any(name.startswith('word/embeddings/') for name in names)
+    
+    prs = Presentation(pptx_file)
+    charts = [shape.chart for slide in prs.slides for shape in slide.shapes if shape.has_chart]
+    assert len(charts) == 5
+    assert list(charts[0].plots[0].categories) == ['Punjab', 'Assam']
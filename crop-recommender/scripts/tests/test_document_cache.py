@@ -0,0 +1,91 @@
+"""
+Tests for the on-disk cache of extracted document models
+"""
+
+import os
+import time
+
+import document_cache
+import html_document_model
+from conversion_metrics import start_metrics, stop_metrics
+from html_document_model import find_nodes, iter_nodes, load_document
+from html_to_pptx_converter import build_pptx
+from synthetic_corpus import paper_summaries_html
+
+def load_counted(html_file):
+    """Load a document, returning it with the counters of the load"""
+    start_metrics(str(html_file))
+    document = load_document(str(html_file))
+    return document, stop_metrics()['counters']
+
+def slide_text(document):
+    prs = build_pptx(document)
+    return [shape.text_frame.text for slide in prs.slides for shape in slide.shapes if shape.has_text_frame]
+
+def test_unchanged_file_is_loaded_from_the_cache(tmp_path):
+    html_file = tmp_path / 'papers.html'
+    html_file.write_text(paper_summaries_html(10).replace(
+        '<body>', "<body><div class='abstract'><p>Rainfall drives yield</p></div>"), encoding='utf-8')
+    
+    parsed, counters = load_counted(html_file)
+    assert counters['documents.parsed'] == 1
+    cached, counters = load_counted(html_file)
+    assert counters == {'documents.reused': 1}
+    
+    assert cached['base_dir'] == str(tmp_path)
+    assert slide_text(cached) == slide_text(parsed)
+    papers = [block for block in cached['blocks'] if block.get('role') == 'paper']
+    assert [paper['title'] for paper in papers] == [f"Paper {i}" for i in range(1, 11)]
+    for paper in papers:
+        # The index is rebuilt for the loaded nodes, so it answers queries on them
+        assert id(paper) in cached['index']['spans']
+        indexed = list(find_nodes(paper, role='box', index=cached['index']))
+        assert indexed and [id(box) for box in indexed] == [id(box) for box in find_nodes(paper, role='box')]
+    # The abstract is still the node in the block tree, not a copy of it
+    assert any(node is cached['abstract'] for node in iter_nodes(cached['blocks']))
+
+def test_edits_and_new_class_rules_parse_again(tmp_path, monkeypatch):
+    html_file = tmp_path / 'papers.html'
+    html_file.write_text(paper_summaries_html(3), encoding='utf-8')
+    load_counted(html_file)
+    
+    monkeypatch.setitem(html_document_model.CLASS_RULES, 'paper-notes', {'role': 'box'})
+    _, counters = load_counted(html_file)
+    assert counters['documents.parsed'] == 1
+    
+    html_file.write_text(paper_summaries_html(4), encoding='utf-8')
+    document, counters = load_counted(html_file)
+    assert counters['documents.parsed'] == 1
+    assert document['title'] == '4 Paper Summaries'
+
+def test_stale_and_least_recently_used_models_are_pruned(tmp_path, monkeypatch):
+    cache_dir = tmp_path / 'documents'
+    stale_dir = cache_dir / '0123456789abcdef'
+    stale_dir.mkdir(parents=True)
+    (stale_dir / 'old.pickle').write_bytes(b'model of older code')
+    (cache_dir / 'flat.pickle').write_bytes(b'model of the flat layout')
+    
+    html_files = []
+    for copy in range(3):
+        # Only a comment differs, so the models are the same size
+        html_file = tmp_path / f'papers_{copy}.html'
+        html_file.write_text(f"{paper_summaries_html(4)}<!-- copy {copy} -->", encoding='utf-8')
+        html_files.append(html_file)
+    load_counted(html_files[0])
+    assert os.listdir(cache_dir) == [os.path.basename(document_cache.model_dir())]
+    
+    # Room for two models: loading the first again keeps it over the second
+    first_model, = os.scandir(document_cache.model_dir())
+    model_size = first_model.stat().st_size
+    monkeypatch.setattr(document_cache, 'MAX_BYTES', model_size * 2 + model_size // 2)
+    load_counted(html_files[1])
+    for entry in os.scandir(document_cache.model_dir()):
+        past = time.time() - (120 if entry.path == first_model.path else 60)
+        os.utime(entry.path, (past, past))
+    assert load_counted(html_files[0])[1] == {'documents.reused': 1}
+    load_counted(html_files[2])
+    
+    assert len(os.listdir(document_cache.model_dir())) == 2
+    assert load_counted(html_files[0])[1] == {'documents.reused': 1}
+    assert load_counted(html_files[2])[1] == {'documents.reused': 1}
+    assert load_counted(html_files[1])[1]['documents.parsed'] == 1
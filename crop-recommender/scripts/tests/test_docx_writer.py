@@ -0,0 +1,35 @@
+"""
+Tests for writing the Word document body straight into the package
+"""
+
+import zipfile
+
+from docx import Document
+from docx.opc.oxml import serialize_part_xml
+
+from html_document_model import parse_document
+from html_to_word_converter import build_docx, render_docx
+from synthetic_corpus import paper_summaries_html, table_html
+
+def test_streamed_body_matches_the_in_memory_document(tmp_path):
+    for name, html in (('papers', paper_summaries_html(15)), ('tables', table_html(20, 3))):
+        output_file = tmp_path / f'{name}.docx'
+        paragraphs = render_docx(parse_document(html), str(output_file))
+        
+        expected = build_docx(parse_document(html))
+        with zipfile.ZipFile(output_file) as package:
+            assert package.read('word/document.xml') == serialize_part_xml(expected.element)
+        assert paragraphs == len(expected.paragraphs)
+
+def test_styles_used_only_by_the_streamed_body_are_kept(tmp_path):
+    output_file = tmp_path / 'papers.docx'
+    html = paper_summaries_html(3).replace(
+        '</body>', "<table><tr><th>Crop</th></tr><tr><td>Rice</td></tr></table></body>")
+    render_docx(parse_document(html), str(output_file), compression={'strategy': 'store'})
+    
+    with zipfile.ZipFile(output_file) as package:
+        assert all(info.compress_type == zipfile.ZIP_STORED for info in package.infolist())
+    doc = Document(str(output_file))
+    style_names = {style.name for style in doc.styles}
+    assert {'Paper Meta', 'List Bullet', 'Light Grid Accent 1'} <= style_names
+    assert doc.tables[0].style.name == 'Light Grid Accent 1'
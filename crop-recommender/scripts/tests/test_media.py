@@ -0,0 +1,101 @@
+"""
+Tests for embedded images and the media cache
+"""
+
+import base64
+import io
+import os
+import time
+import zipfile
+
+import pytest
+from PIL import Image
+
+import media_cache
+from conversion_metrics import start_metrics, stop_metrics
+from html_document_model import load_document, parse_document
+from html_to_word_converter import render_docx
+from html_to_pptx_converter import render_pptx
+
+@pytest.fixture(autouse=True)
+def media_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(media_cache, 'MEDIA_DIR', str(tmp_path / 'media'))
+    monkeypatch.setattr(media_cache, 'MEMORY', {})
+
+def png_data_uri(size, color):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+def write_page(tmp_path, body):
+    Image.new('RGB', (3000, 1500), (40, 120, 40)).save(tmp_path / 'field.jpg')
+    html_file = tmp_path / 'page.html'
+    html_file.write_text(f"<html><head><title>Field Photos</title></head><body>{body}</body></html>",
+                         encoding='utf-8')
+    return str(html_file)
+
+def package_media(path):
+    with zipfile.ZipFile(path) as package:
+        return {name: package.read(name) for name in package.namelist() if '/media/' in name}
+
+def test_images_are_embedded_once_and_downscaled(tmp_path):
+    html_file = write_page(tmp_path, "<h1>Plots</h1><p>Rice plots photographed at noon.</p>"
+                                     "<img src='field.jpg' alt='Rice plots'>"
+                                     f"<img src='{png_data_uri((20, 10), 'blue')}'>"
+                                     "<h2>Again</h2><img src='field.jpg'>")
+    
+    for fmt, render in (('docx', render_docx), ('pptx', render_pptx)):
+        output_file = str(tmp_path / f'page.{fmt}')
+        render(load_document(html_file), output_file)
+        media = package_media(output_file)
+        assert len(media) == 2  # The repeated photo is stored once
+        
+        photo = Image.open(io.BytesIO(next(data for name, data in media.items() if name.endswith('.jpg'))))
+        assert photo.width < 3000 and photo.width <= 9 * media_cache.IMAGE_DPI
+
+def test_repeat_builds_reuse_the_disk_cache(tmp_path, monkeypatch):
+    html_file = write_page(tmp_path, "<img src='field.jpg'>")
+    render_docx(load_document(html_file), str(tmp_path / 'first.docx'))
+    
+    monkeypatch.setattr(media_cache, 'MEMORY', {})
+    start_metrics(html_file)
+    render_docx(load_document(html_file), str(tmp_path / 'second.docx'))
+    counters = stop_metrics()['counters']
+    assert counters['images.reused'] == 1 and 'images.rendered' not in counters
+
+def test_local_files_need_a_base_directory(tmp_path):
+    html_file = write_page(tmp_path, f"<img src='{tmp_path / 'field.jpg'}'>")
+    with open(html_file, encoding='utf-8') as f:
+        document = parse_document(f.read())
+    render_docx(document, str(tmp_path / 'posted.docx'))
+    assert package_media(str(tmp_path / 'posted.docx')) == {}
+
+def test_decompression_bombs_are_skipped(tmp_path, monkeypatch):
+    html_file = write_page(tmp_path, f"<p>Plots</p><img src='field.jpg'><img src='{png_data_uri((20, 10), 'blue')}'>")
+    monkeypatch.setattr(Image, 'MAX_IMAGE_PIXELS', 1000)  # The photo is over twice this
+    render_docx(load_document(html_file), str(tmp_path / 'page.docx'))
+    
+    media = package_media(str(tmp_path / 'page.docx'))
+    assert [name.rsplit('.', 1)[1] for name in media] == ['png']
+
+def test_disk_cache_keeps_the_most_recently_used_images(tmp_path, monkeypatch):
+    for age, key in enumerate(['recent', 'old']):
+        media_cache.write_cached(key, b'x' * 100, 'png')
+        past = time.time() - 60 * (age + 1)
+        os.utime(os.path.join(media_cache.MEDIA_DIR, f'{key}.png'), (past, past))
+    assert media_cache.read_cached('old') is not None  # Reading marks it as used
+    
+    monkeypatch.setattr(media_cache, 'MAX_BYTES', 250)
+    media_cache.write_cached('new', b'x' * 100, 'png')
+    assert sorted(os.listdir(media_cache.MEDIA_DIR)) == ['new.png', 'old.png']
+
+@pytest.mark.skipif(media_cache.cairosvg is None, reason="cairosvg is not installed")
+def test_inline_svg_is_rasterized_with_page_styles(tmp_path):
+    html_file = write_page(tmp_path, "<style>.plot { fill: #ff0000; }</style>"
+                                     "<svg viewBox='0 0 200 100'><rect class='plot' width='200' height='100'/></svg>")
+    render_docx(load_document(html_file), str(tmp_path / 'page.docx'))
+    
+    media = list(package_media(str(tmp_path / 'page.docx')).values())
+    assert len(media) == 1
+    image = Image.open(io.BytesIO(media[0])).convert('RGB')
+    assert image.getpixel((image.width // 2, image.height // 2)) == (255, 0, 0)
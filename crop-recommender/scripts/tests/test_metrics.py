@@ -0,0 +1,34 @@
+"""
+Tests for per-stage conversion metrics
+"""
+
+import json
+import os
+
+from conftest import PROJECT_DIR
+from conversion_metrics import write_metrics
+from convert_html import convert_job
+
+HTML_FILE = os.path.join(PROJECT_DIR, 'papers', 'RESEARCH_PAPERS_SUMMARY.html')
+
+def test_convert_job_records_stages_and_counters(tmp_path):
+    result = convert_job(HTML_FILE, ['docx', 'pptx'], str(tmp_path), metrics=True)
+    assert result['status'] == 'ok'
+    
+    metrics = result['metrics']
+    assert set(metrics['stages']) == {'hash', 'read', 'parse', 'extract', 'save.model', 'render.docx',
+                                      'optimize.docx', 'save.docx', 'render.pptx', 'optimize.pptx', 'save.pptx'}
+    counters = metrics['counters']
+    assert counters['nodes_visited'] > 0 and counters['text_nodes'] > 0
+    assert counters['docx.tables'] == 3
+    assert counters['docx.bytes'] == os.path.getsize(tmp_path / 'RESEARCH_PAPERS_SUMMARY.docx')
+    assert counters['pptx.slides'] > 1
+    
+    metrics_file = tmp_path / 'metrics.jsonl'
+    write_metrics([metrics, metrics], str(metrics_file))
+    lines = metrics_file.read_text(encoding='utf-8').splitlines()
+    assert [json.loads(line)['file'] for line in lines] == [HTML_FILE, HTML_FILE]
+
+def test_metrics_are_off_by_default(tmp_path):
+    result = convert_job(HTML_FILE, ['docx'], str(tmp_path))
+    assert result['metrics'] is None
@@ -0,0 +1,64 @@
+"""
+Tests for pruning and recompressing the output packages
+"""
+
+import io
+import zipfile
+
+import pytest
+from docx import Document
+from pptx import Presentation
+
+from html_document_model import parse_document
+from html_to_word_converter import render_docx
+from html_to_pptx_converter import render_pptx
+from package_optimizer import save_package
+
+HTML = ("<html><head><title>Soil Report</title></head><body>"
+        "<h1>Nutrients</h1><p>Nitrogen levels by field.</p>"
+        "<ul><li>North field</li><li>South field</li></ul>"
+        "</body></html>")
+
+def test_docx_drops_unused_styles_and_template_parts(tmp_path):
+    output_file = tmp_path / 'report.docx'
+    render_docx(parse_document(HTML), str(output_file))
+    
+    with zipfile.ZipFile(output_file) as package:
+        names = package.namelist()
+    assert not any('stylesWithEffects' in name or 'thumbnail' in name for name in names)
+    
+    doc = Document(str(output_file))
+    style_names = {style.name for style in doc.styles}
+    assert {'Normal', 'Title', 'Heading 1'} <= style_names
+    assert 'Intense Quote' not in style_names
+    assert len(style_names) < len(Document().styles)
+
+def test_pptx_keeps_only_used_layouts(tmp_path):
+    output_file = tmp_path / 'report.pptx'
+    render_pptx(parse_document(HTML), str(output_file))
+    
+    prs = Presentation(str(output_file))
+    layouts = list(prs.slide_layouts)
+    assert len(layouts) < len(Presentation().slide_layouts)
+    assert all(layout.used_by_slides for layout in layouts)
+
+def test_store_strategy_writes_uncompressed_parts(tmp_path):
+    output_file = tmp_path / 'stored.docx'
+    save_package(Document(), str(output_file), {'strategy': 'store'})
+    with zipfile.ZipFile(output_file) as package:
+        assert {info.compress_type for info in package.infolist()} == {zipfile.ZIP_STORED}
+    
+    with pytest.raises(ValueError):
+        save_package(Document(), str(tmp_path / 'bad.docx'), {'strategy': 'zstd'})
+
+@pytest.mark.parametrize('new_package', [Document, Presentation])
+def test_parts_are_written_as_the_library_saves_them(tmp_path, new_package):
+    package_obj = new_package()
+    buffer = io.BytesIO()
+    package_obj.save(buffer)
+    output_file = tmp_path / 'package.zip'
+    save_package(package_obj, str(output_file), {'strategy': 'deflate'})
+    
+    with zipfile.ZipFile(buffer) as expected, zipfile.ZipFile(output_file) as written:
+        assert written.namelist() == expected.namelist()
+        assert all(written.read(name) == expected.read(name) for name in expected.namelist())
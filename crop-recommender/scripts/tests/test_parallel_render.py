@@ -0,0 +1,79 @@
+"""
+Tests for rendering the sections of one document in worker processes
+"""
+
+import base64
+import io
+import multiprocessing
+import signal
+import time
+import zipfile
+
+import pytest
+from PIL import Image
+
+import media_cache
+import parallel_render
+from conversion_metrics import start_metrics, stop_metrics
+from html_document_model import parse_document
+from html_to_word_converter import render_docx
+from html_to_pptx_converter import render_pptx
+from synthetic_corpus import paper_summaries_html
+
+pytestmark = pytest.mark.skipif('fork' not in parallel_render.multiprocessing.get_all_start_methods(),
+                                reason="Parallel rendering needs fork")
+
+def figure_html():
+    """A paragraph holding an embedded PNG, which adds a part wherever it is rendered"""
+    buffer = io.BytesIO()
+    Image.new('RGB', (40, 30), 'green').save(buffer, 'PNG')
+    data = base64.b64encode(buffer.getvalue()).decode('ascii')
+    return f"<p>Yield map of the trial plots</p><img src='data:image/png;base64,{data}'>"
+
+def package_content(path):
+    with zipfile.ZipFile(path) as package:
+        return {name: package.read(name) for name in package.namelist()
+                if not name.startswith('docProps/') and not name.endswith('.xlsx')}
+
+@pytest.mark.parametrize('render, fmt', [(render_docx, 'docx'), (render_pptx, 'pptx')])
+def test_parallel_render_matches_serial(render, fmt, tmp_path, monkeypatch):
+    monkeypatch.setattr(parallel_render, 'MIN_UNITS', 2)
+    monkeypatch.setattr(media_cache, 'MEDIA_DIR', str(tmp_path / 'media'))
+    html = paper_summaries_html(40).replace('<h2>Group 2</h2>', f"<h2>Group 2</h2>{figure_html()}")
+    document = parse_document(html)
+    
+    render(document, str(tmp_path / f'serial.{fmt}'))
+    start_metrics('parallel')
+    render(document, str(tmp_path / f'parallel.{fmt}'), jobs=2)
+    counters = stop_metrics()['counters']
+    
+    content = package_content(tmp_path / f'parallel.{fmt}')
+    assert counters['sections.parallel'] > 1
+    assert any('/media/' in name for name in content)  # The figure's section was rendered in-process
+    assert content == package_content(tmp_path / f'serial.{fmt}')
+
+def test_small_jobs_stay_in_process():
+    units = list(range(parallel_render.MIN_UNITS))
+    assert parallel_render.render_parallel(str, units, 1) is None
+    assert parallel_render.render_parallel(str, units[:-1], 4) is None
+    assert parallel_render.render_parallel(str, units, 2) == [str(unit) for unit in units]
+
+def slow_unit(unit):
+    time.sleep(1)
+    return unit
+
+def test_interrupted_render_terminates_the_workers():
+    def interrupt(signum, frame):
+        raise TimeoutError
+    previous = signal.signal(signal.SIGALRM, interrupt)
+    signal.setitimer(signal.ITIMER_REAL, 0.3)
+    start = time.perf_counter()
+    try:
+        with pytest.raises(TimeoutError):
+            parallel_render.render_parallel(slow_unit, list(range(parallel_render.MIN_UNITS)), 2)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+    
+    assert time.perf_counter() - start < 2
+    assert multiprocessing.active_children() == []
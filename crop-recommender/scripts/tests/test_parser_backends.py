@@ -0,0 +1,96 @@
+"""
+Conformance tests: every HTML parser backend must produce the same
+Word and PowerPoint output as the reference html.parser backend
+"""
+
+import glob
+import os
+import zipfile
+
+import pytest
+
+from conftest import PROJECT_DIR
+from html_document_model import build_document, clean_text, index_text, load_document, parse_document
+from html_parsers import PARSER_BACKENDS, available_parsers, select_parser, strip_markup
+from html_to_word_converter import render_docx
+from html_to_pptx_converter import render_pptx
+
+HTML_FILES = sorted(
+    glob.glob(os.path.join(PROJECT_DIR, 'papers', '*.html')) +
+    glob.glob(os.path.join(PROJECT_DIR, 'Algorithm_Documentation', '*.html'))
+)
+
+REFERENCE_PARSER = 'html.parser'
+
+def package_content(path):
+    """Read the body parts of a .docx/.pptx package"""
+    with zipfile.ZipFile(path) as package:
+        return {
+            name: package.read(name)
+            for name in package.namelist()
+            if name == 'word/document.xml' or name.startswith('ppt/slides/slide')
+        }
+
+def render(html_file, parser, fmt, tmp_path):
+    """Render an HTML file with one parser backend and return its body parts"""
+    output_file = str(tmp_path / f"{parser}.{fmt}")
+    renderer = render_docx if fmt == 'docx' else render_pptx
+    renderer(load_document(html_file, parser), output_file)
+    return package_content(output_file)
+
+@pytest.mark.parametrize('fmt', ['docx', 'pptx'])
+@pytest.mark.parametrize('parser', [name for name in available_parsers() if name != REFERENCE_PARSER])
+@pytest.mark.parametrize('html_file', HTML_FILES, ids=os.path.basename)
+def test_backend_matches_reference(html_file, parser, fmt, tmp_path):
+    expected = render(html_file, REFERENCE_PARSER, fmt, tmp_path)
+    assert render(html_file, parser, fmt, tmp_path) == expected
+
+def test_default_parser_prefers_lxml():
+    expected = 'lxml' if 'lxml' in available_parsers() else 'html.parser'
+    assert select_parser() == expected
+
+def test_unknown_parser_is_rejected():
+    with pytest.raises(ValueError):
+        select_parser('no-such-parser')
+
+@pytest.mark.parametrize('parser', available_parsers())
+def test_indexed_text_matches_get_text(parser):
+    html = ("<html><body><div class='abstract'><p>Soil <b> nitrogen</b>and\n\t<i>rain</i> "
+            "<!-- note --><span> </span> levels<script>var x = 1;</script></p>"
+            "<ul><li> Rice <ul><li>Kharif </li></ul></li></ul></div></body></html>")
+    backend = PARSER_BACKENDS[parser]
+    root = backend['parse'](html)
+    tree = backend['tree']
+    text_of = index_text(root, tree)
+    
+    elements = [root]
+    for element in elements:
+        elements.extend(tree['children'](element))
+        if tree['name'](element) != 'script':
+            assert text_of(element) == clean_text(tree['text'](element))
+
+def test_strip_markup_cuts_only_unused_subtrees():
+    html = ("<title>a <!-- b --> c</title><style>/* <script>x</script> */ p { }</style>"
+            "<p>one<!-- two --> <SCRIPT type='module'>if (a < b) {}</Script >three</p>"
+            "<svg><!-- kept --><script>draw()</script></svg><script>unterminated")
+    assert strip_markup(html, {'script'}) == (
+        "<title>a <!-- b --> c</title><style>/* <script>x</script> */ p { }</style>"
+        "<p>one three</p><svg><!-- kept --><script>draw()</script></svg><script>unterminated")
+    assert strip_markup(html, {'script', 'style'}).startswith("<title>a <!-- b --> c</title><p>")
+
+@pytest.mark.parametrize('parser', available_parsers())
+def test_filtered_parse_builds_the_same_model(parser):
+    html = ("<html><head><title>Trials</title><script>var config = {};</script>"
+            "<style>.box { color: red; }</style></head><body><!-- generated -->"
+            "<div class='section-box'><div class='section-title'>Notes<script>x()</script></div>"
+            "<p>Sown <!-- late -->after<script>track()</script> rain</p>"
+            "<ul><li>Rice<!-- kharif --></li></ul></div></body></html>")
+    backend = PARSER_BACKENDS[parser]
+    expected = build_document(backend['parse'](html), backend['tree'])
+    document = parse_document(html, parser)
+    
+    assert document['blocks'] == expected['blocks']
+    assert document['blocks'][0]['title'] == 'Notes'
+    assert document['css'] == []  # Only inline SVG reads the stylesheets
+    with_svg = parse_document(html.replace('</body>', "<svg width='10'></svg></body>"), parser)
+    assert with_svg['css'] == ['.box { color: red; }']
@@ -0,0 +1,48 @@
+"""
+Tests for reusing rendered sections between builds (watch mode)
+"""
+
+from lxml import etree
+
+from conversion_metrics import start_metrics, stop_metrics
+from html_document_model import parse_document
+from html_to_word_converter import build_docx
+from html_to_pptx_converter import build_pptx
+
+def sectioned_html(revised=''):
+    sections = ''.join(
+        f"<h2>Section {i}{revised if i == 2 else ''}</h2>"
+        f"<p>Section {i} summarises rainfall and soil readings for the season.</p>"
+        f"<ul><li>Finding {i}a</li><li>Finding {i}b</li></ul>"
+        for i in range(1, 5)
+    )
+    return f"<html><head><title>Field Report</title></head><body>{sections}</body></html>"
+
+def docx_xml(doc):
+    return etree.tostring(doc.element.body)
+
+def pptx_xml(prs):
+    return [(slide.slide_layout.name, etree.tostring(slide.shapes._spTree)) for slide in prs.slides]
+
+def build_counted(build, html, section_cache):
+    start_metrics('page.html')
+    output = build(parse_document(html), section_cache)
+    return output, stop_metrics()['counters']
+
+def test_only_edited_sections_are_rendered_again():
+    html = sectioned_html()
+    edited = sectioned_html(' (revised)')
+    
+    for build, serialize in ((build_docx, docx_xml), (build_pptx, pptx_xml)):
+        cache = {}
+        first, counters = build_counted(build, html, cache)
+        assert counters.get('sections.reused', 0) == 0
+        
+        again, counters = build_counted(build, html, cache)
+        assert counters.get('sections.rendered', 0) == 0
+        assert serialize(again) == serialize(first)
+        
+        revised, counters = build_counted(build, edited, cache)
+        assert counters['sections.rendered'] == 1
+        assert counters['sections.reused'] > 0
+        assert serialize(revised) == serialize(build(parse_document(edited)))
@@ -0,0 +1,41 @@
+"""
+Tests for stamping slides out of compiled layouts
+"""
+
+from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from pptx.util import Pt
+
+from html_document_model import parse_document
+from html_to_pptx_converter import add_two_column_slides, deck_writer, flush_slides, render_pptx
+from synthetic_corpus import paper_summaries_html
+
+def test_large_deck_reopens_with_every_slide_registered(tmp_path):
+    output_file = tmp_path / 'papers.pptx'
+    render_pptx(parse_document(paper_summaries_html(200)), str(output_file))
+    
+    prs = Presentation(str(output_file))
+    slides = list(prs.slides)
+    assert len(slides) > 200
+    assert [slide.slide_id for slide in slides] == list(range(256, 256 + len(slides)))
+    assert [slide.part.partname for slide in slides] == [f'/ppt/slides/slide{i}.xml'
+                                                         for i in range(1, len(slides) + 1)]
+    assert slides[0].shapes.title.text == '200 Paper Summaries'
+    assert slides[-1].placeholders[1].text == 'Questions & Discussion'
+
+def test_two_column_slides_fill_both_columns():
+    prs = Presentation()
+    deck = deck_writer(prs)
+    items = [f"Observation {i} on soil moisture and rainfall" for i in range(40)]
+    add_two_column_slides(deck, 'Field Notes', items)
+    flush_slides(deck)
+    
+    slides = list(prs.slides)
+    assert slides[0].shapes.title.text == 'Field Notes'
+    assert all(slide.shapes.title.text == 'Field Notes (cont.)' for slide in slides[1:])
+    columns = [shape for slide in slides for shape in slide.shapes
+               if shape.shape_type == MSO_SHAPE_TYPE.TEXT_BOX]
+    assert all(column.text_frame.word_wrap for column in columns)
+    assert [p.text for column in columns for p in column.text_frame.paragraphs if p.text] == \
+        [f"• {item}" for item in items]
+    assert columns[0]._element.xpath('.//a:lvl1pPr/a:defRPr/@sz') == [str(Pt(14).centipoints)]
@@ -0,0 +1,55 @@
+"""
+Tests for the incremental (streaming) HTML reader
+"""
+
+import os
+
+import pytest
+
+from conftest import PROJECT_DIR
+from html_document_model import load_document, stream_document
+from html_parsers import available_parsers
+from html_to_word_converter import build_docx
+from synthetic_corpus import paper_summaries_html, table_html
+
+pytestmark = pytest.mark.skipif('lxml-tree' not in available_parsers(), reason="lxml is not installed")
+
+def rendered_text(doc):
+    paragraphs = [(p.style.name, p.text) for p in doc.paragraphs]
+    tables = [[cell.text for cell in row.cells] for table in doc.tables for row in table.rows]
+    return paragraphs, tables
+
+HEADING_FIRST_HTML = ("<html><head><title>Field Report</title></head><body><h1>Soil Trial Results</h1>"
+                      "<div class='document-header'><p>Field team</p></div>"
+                      "<h2>Intro</h2><p>Soil readings were collected weekly.</p></body></html>")
+
+@pytest.mark.parametrize('html', [paper_summaries_html(12), table_html(30, 4), HEADING_FIRST_HTML])
+def test_streamed_document_renders_like_in_memory(tmp_path, html):
+    html_file = tmp_path / 'page.html'
+    html_file.write_text(html, encoding='utf-8')
+    
+    expected = build_docx(load_document(str(html_file), 'lxml-tree'))
+    streamed = build_docx(stream_document(str(html_file)))
+    assert rendered_text(streamed) == rendered_text(expected)
+
+def test_meta_is_filled_in_as_blocks_are_read(tmp_path):
+    html_file = tmp_path / 'page.html'
+    html_file.write_text("<html><head><title> Streamed  Report </title></head><body>"
+                         "<div class='wrapper'><h2>Intro</h2><div class='meta-info'>Field team</div>"
+                         "<p>Soil readings were collected weekly.</p></div></body></html>", encoding='utf-8')
+    
+    document = stream_document(str(html_file))
+    assert document['title'] == 'Streamed Report'
+    assert document['meta'] is None
+    
+    blocks = list(document['blocks'])
+    assert [block['type'] for block in blocks] == ['heading', 'container', 'paragraph']
+    assert document['meta'] == 'Field team'
+
+def test_streamed_shipped_summary_renders_like_in_memory():
+    # Its <h1> comes before the header holding the meta info
+    html_file = os.path.join(PROJECT_DIR, 'papers', 'RESEARCH_PAPERS_SUMMARY.html')
+    expected = build_docx(load_document(html_file, 'lxml-tree'))
+    streamed = build_docx(stream_document(html_file))
+    assert rendered_text(streamed) == rendered_text(expected)
+    assert [p.style.name for p in streamed.paragraphs[:2]] == ['Title', 'Document Meta']
@@ -0,0 +1,29 @@
+"""
+Tests for the named style registry: formatting lives in styles, not runs
+"""
+
+from html_document_model import parse_document
+from html_to_word_converter import build_docx
+
+STYLED_PAGE = """<html><head><title>Styles</title></head><body>
+<div class="meta-info"><p>Prepared by the agronomy team</p></div>
+<h2>Findings</h2>
+<p><strong>Nitrogen levels predict yield better than rainfall.</strong></p>
+<p>Plain body paragraphs take their justification from Normal.</p>
+<div class="paper-summary"><div class="paper-title">Paper One</div>
+<div class="paper-authors">A. Author, B. Author</div></div>
+</body></html>"""
+
+def test_paragraphs_are_formatted_by_named_styles():
+    doc = build_docx(parse_document(STYLED_PAGE))
+    styles = {}
+    for p in doc.paragraphs:
+        styles.setdefault(p.text, p.style.name)
+    assert styles['Prepared by the agronomy team'] == 'Document Meta'
+    assert styles['Nitrogen levels predict yield better than rainfall.'] == 'Bold Text'
+    assert styles['Plain body paragraphs take their justification from Normal.'] == 'Normal'
+    assert styles['A. Author, B. Author'] == 'Paper Meta'
+    
+    assert not any(p.paragraph_format.alignment is not None for p in doc.paragraphs)
+    assert not any(run.font.size or run.bold or run.italic
+                   for p in doc.paragraphs for run in p.runs)
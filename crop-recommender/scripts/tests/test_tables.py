@@ -0,0 +1,63 @@
+"""
+Tests for HTML table extraction and the bulk Word/PowerPoint table writers
+"""
+
+import docx
+
+from html_document_model import parse_document
+from html_to_word_converter import render_docx
+from html_to_pptx_converter import build_pptx
+from synthetic_corpus import table_html
+
+SPANNED_TABLE = """<html><head><title>Tables</title></head><body><table>
+<thead>
+  <tr><th rowspan="2">Crop</th><th colspan="2">Yield</th></tr>
+  <tr><th>2020</th><th>2021</th></tr>
+</thead>
+<tbody>
+  <tr><td rowspan="2">Rice</td><td>1</td><td>2</td></tr>
+  <tr><td>3</td><td>4</td></tr>
+  <tr><td colspan="3">Total</td></tr>
+</tbody>
+</table></body></html>"""
+
+def table_node(html):
+    return next(node for node in parse_document(html)['blocks'] if node['type'] == 'table')
+
+def test_extract_table_expands_spans():
+    table = table_node(SPANNED_TABLE)
+    assert table['headers'] == ['Crop', 'Yield / 2020', 'Yield / 2021']
+    assert table['header_grid'] == [['Crop', 'Yield', ''], ['', '2020', '2021']]
+    assert table['rows'] == [['Rice', '1', '2'], ['', '3', '4'], ['Total', '', '']]
+    assert table['merges'] == [(0, 0, 2, 1), (0, 1, 1, 2), (2, 0, 2, 1), (4, 0, 1, 3)]
+
+def test_first_row_with_th_is_header_without_thead():
+    table = table_node("<table><tr><th>A</th><td>B</td></tr><tr><td>1</td><td>2</td></tr></table>")
+    assert table['headers'] == ['A', 'B']
+    assert table['rows'] == [['1', '2']]
+
+def test_word_table_merges_cells_and_styles_rows(tmp_path):
+    output_file = str(tmp_path / 'tables.docx')
+    render_docx(parse_document(SPANNED_TABLE), output_file)
+    
+    table = docx.Document(output_file).tables[0]
+    assert [[cell.text for cell in row.cells] for row in table.rows] == [
+        ['Crop', 'Yield', 'Yield'],
+        ['Crop', '2020', '2021'],
+        ['Rice', '1', '2'],
+        ['Rice', '3', '4'],
+        ['Total', 'Total', 'Total'],
+    ]
+    assert table.rows[0].cells[0].paragraphs[0].style.name == 'Table Header'
+    assert table.rows[2].cells[1].paragraphs[0].style.name == 'Table Text'
+    assert not any(run.font.size or run.bold for row in table.rows for cell in row.cells
+                   for paragraph in cell.paragraphs for run in paragraph.runs)
+
+
+def test_long_tables_continue_over_slides():
+    prs = build_pptx(parse_document(table_html(rows=25, cols=3)))
+    tables = [shape.table for slide in prs.slides for shape in slide.shapes if shape.has_table]
+    assert [len(table.rows) for table in tables] == [11, 11, 6]
+    assert all(table.cell(0, 0).text == 'Column 1' for table in tables)
+    assert [table.cell(row, 0).text for table in tables for row in range(1, len(table.rows))] == \
+        [str(r * 3) for r in range(25)]
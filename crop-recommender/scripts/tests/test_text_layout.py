@@ -0,0 +1,41 @@
+"""
+Tests for the font-metric text layout of slides
+"""
+
+from html_document_model import parse_document
+from html_to_pptx_converter import build_pptx
+from text_layout import line_starts, pack_paragraphs, text_width
+
+FRAME = {'width': 4.0, 'height': 2.0, 'size': 18, 'space_before': 0.2}
+
+def test_wide_letters_wrap_sooner_than_narrow_ones():
+    assert text_width('WWWW', 18) > 2 * text_width('iiii', 18)
+    assert len(line_starts('W' * 60, 18, 4.0)) > len(line_starts('i' * 60, 18, 4.0))
+    
+    text = "Rice grows best in clay soils that hold water through the season"
+    starts = line_starts(text, 18, 2.0)
+    assert starts[0] == 0 and all(text[start - 1] == ' ' for start in starts[1:])
+
+def test_paragraphs_are_packed_whole_and_long_ones_continue():
+    short = ["Nitrogen", "Phosphorus", "Potassium"]
+    assert pack_paragraphs(short, FRAME) == [short]
+    
+    long_text = ' '.join(f"word{i}" for i in range(200))
+    pages = pack_paragraphs(["Intro", long_text], FRAME)
+    assert len(pages) > 2
+    assert ' '.join(item for page in pages for item in page) == "Intro " + long_text
+
+def test_every_section_and_bullet_reaches_the_deck():
+    sections = ''.join(
+        f"<h2>Field {i}</h2><ul>" + ''.join(f"<li>Plot {i}-{j} yield notes</li>" for j in range(20)) + "</ul>"
+        for i in range(40))
+    long_text = "Soil moisture was logged hourly at every station. " * 12
+    html = (f"<html><head><title>Survey</title></head><body>{sections}"
+            f"<h2>Method</h2><p>{long_text}</p></body></html>")
+    prs = build_pptx(parse_document(html))
+    
+    text = '\n'.join(shape.text_frame.text for slide in prs.slides
+                     for shape in slide.shapes if shape.has_text_frame)
+    assert "Plot 39-19 yield notes" in text
+    assert "..." not in text
+    assert ' '.join(text.split()).count("logged hourly") == 12
@@ -0,0 +1,139 @@
+"""
+Text Layout
+Estimates how much room text takes on a slide from precomputed font metrics,
+and packs paragraphs into text frames without rendering anything
+"""
+
+from functools import lru_cache
+import math
+import re
+import unicodedata
+
+from pptx.util import Emu
+
+# Advance widths of Calibri, the theme font of the default template, in font units
+UNITS_PER_EM = 2048
+CHAR_WIDTHS = {
+    ' ': 463, '!': 544, '"': 821, '#': 1038, '$': 1038, '%': 1463, '&': 1397, "'": 452,
+    '(': 621, ')': 621, '*': 1038, '+': 1038, ',': 511, '-': 627, '.': 517, '/': 791,
+    ':': 548, ';': 548, '<': 1038, '=': 1038, '>': 1038, '?': 941, '@': 1823,
+    'A': 1185, 'B': 1114, 'C': 1092, 'D': 1260, 'E': 1000, 'F': 941, 'G': 1292, 'H': 1276,
+    'I': 516, 'J': 653, 'K': 1064, 'L': 861, 'M': 1751, 'N': 1322, 'O': 1356, 'P': 1058,
+    'Q': 1378, 'R': 1112, 'S': 941, 'T': 998, 'U': 1314, 'V': 1162, 'W': 1822, 'X': 1063,
+    'Y': 998, 'Z': 959, '[': 628, '\\': 791, ']': 628, '^': 1038, '_': 1022, '`': 588,
+    'a': 981, 'b': 1076, 'c': 866, 'd': 1076, 'e': 1019, 'f': 625, 'g': 964, 'h': 1076,
+    'i': 470, 'j': 490, 'k': 931, 'l': 470, 'm': 1636, 'n': 1076, 'o': 1080, 'p': 1076,
+    'q': 1076, 'r': 714, 's': 801, 't': 686, 'u': 1076, 'v': 925, 'w': 1464, 'x': 887,
+    'y': 927, 'z': 809, '{': 644, '|': 943, '}': 644, '~': 1038,
+    '•': 1022, '–': 1024, '—': 2048, '‘': 511, '’': 511, '“': 852, '”': 852, '…': 1530,
+    '°': 702, '±': 1038, '×': 1038, '÷': 1038, '≤': 1038, '≥': 1038, '→': 2048,
+}
+CHAR_WIDTHS.update((digit, 1038) for digit in '0123456789')
+DEFAULT_WIDTH = 1038  # Digit width, a little above the average letter
+WIDE_WIDTH = UNITS_PER_EM  # Full-width (CJK) characters take a whole em
+
+# Distance between baselines, as a multiple of the font size (Calibri ascent + descent + gap)
+LINE_SPACING = 1.22
+
+# Share of the frame width used, leaving room for differences from the real renderer
+WIDTH_MARGIN = 0.97
+
+WORD = re.compile(r'\S+')
+
+def char_units(char):
+    """Return the advance width of a character in font units"""
+    width = CHAR_WIDTHS.get(char)
+    if width is None:
+        width = WIDE_WIDTH if unicodedata.east_asian_width(char) in 'WF' else DEFAULT_WIDTH
+    return width
+
+@lru_cache(maxsize=65536)
+def word_units(word):
+    """Return the width of a word in font units"""
+    return sum(char_units(char) for char in word)
+
+def text_width(text, size):
+    """Estimate the width of a single line of text at a font size, in inches"""
+    return word_units(text) * size / UNITS_PER_EM / 72
+
+def line_height(size):
+    """Return the height of one line of text at a font size, in inches"""
+    return size * LINE_SPACING / 72
+
+def line_starts(text, size, width):
+    """Wrap text into lines no wider than width inches, returning the offset each line starts at
+    
+    Words wider than a whole line are broken between characters, the way
+    PowerPoint breaks them.
+    """
+    max_units = width * WIDTH_MARGIN * 72 / size * UNITS_PER_EM
+    space = CHAR_WIDTHS[' ']
+    starts = [0]
+    used = 0
+    for match in WORD.finditer(text):
+        word = match.group()
+        units = word_units(word)
+        if used and used + space + units > max_units:
+            starts.append(match.start())
+            used = 0
+        elif used:
+            used += space
+        
+        if units <= max_units:
+            used += units
+            continue
+        for i, char in enumerate(word):
+            char_width = char_units(char)
+            if used and used + char_width > max_units:
+                starts.append(match.start() + i)
+                used = 0
+            used += char_width
+    return starts
+
+def frame_area(shape, indent=0):
+    """Return the (width, height) in inches that text can fill inside a shape or placeholder
+    
+    indent is the left margin of the paragraphs, such as the bullet indent of
+    a body placeholder, in EMU.
+    """
+    text_frame = shape.text_frame
+    width = shape.width - text_frame.margin_left - text_frame.margin_right - indent
+    height = shape.height - text_frame.margin_top - text_frame.margin_bottom
+    return Emu(width).inches, Emu(height).inches
+
+def pack_paragraphs(items, frame):
+    """Pack paragraphs into pages that each fit one text frame
+    
+    frame is a dict with the text 'width' and 'height' in inches, the font
+    'size' in points and the 'space_before' each paragraph in lines. A
+    paragraph that fits on an empty page is never split; longer ones are cut
+    at line breaks and continue on the following pages.
+    """
+    line = line_height(frame['size'])
+    capacity = frame['height'] / line  # Lines per page
+    pages = []
+    page, used = [], 0.0
+    for text in items:
+        starts = line_starts(text, frame['size'], frame['width'])
+        while starts:
+            needed = frame['space_before'] + len(starts)
+            if used + needed <= capacity:
+                page.append(text[starts[0]:].strip())
+                used += needed
+                break
+            
+            room = math.floor(capacity - used - frame['space_before'] + 1e-9)
+            if page and (needed <= capacity or room < 1):
+                pages.append(page)
+                page, used = [], 0.0
+                continue
+            
+            # Longer than a page: fill this one and carry the rest over
+            room = max(room, 1)
+            page.append(text[starts[0]:starts[room]].strip())
+            pages.append(page)
+            page, used = [], 0.0
+            starts = starts[room:]
+    if page:
+        pages.append(page)
+    return pages